@@ -6,6 +6,10 @@ project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
+# 啟動分析模式（AIVI_PROFILE_IMPORTS=1）需在其他 import 之前安裝
+from src.utils import import_profiler
+import_profiler.install_from_env()
+
 # 載入 .env 檔案中的環境變數
 from dotenv import load_dotenv
 load_dotenv()
@@ -14,18 +18,31 @@ load_dotenv()
 
 這是 LINE Bot 的核心入口，負責接收 LINE 平台的事件通知，
 驗證簽章並將事件分派給對應的處理器。
+
+為了縮短冷啟動時間，line-bot-sdk、httpx、selectolax 等較重的模組
+延遲到第一次處理 webhook 時才載入（或在服務啟動後於背景預先載入），
+健康檢查 `/` 只需要 Flask 即可回應。
 """
 
-from flask import Flask, request, abort
-from linebot.v3 import WebhookHandler
-from linebot.v3.exceptions import InvalidSignatureError
-from linebot.v3.messaging import Configuration, ApiClient, MessagingApi
-from linebot.v3.webhooks import MessageEvent, TextMessageContent
+from flask import Flask, request, abort, send_file
 import os
+import hmac
 import logging
 import asyncio
-
-from src.handlers.command_handler import handle_aivi_command
+import threading
+from contextlib import nullcontext
+
+from src.handlers.news_cache import news_cache
+from src.scrapers.parse_cache import parse_cache
+from src.scrapers.parse_pool import parse_pool
+from src.utils.admission import LoadLevel, admission_controller
+from src.utils.cache_backend import MemoryCacheBackend, describe_backend
+from src.utils.coalesce import ReplyCoalescer, chat_key
+from src.utils.corpus import corpus_recorder
+from src.utils.dedup import EventDeduplicator
+from src.utils.memory_budget import memory_budget
+from src.utils.request_profiler import request_profiler
+from src.utils.snapshot import SnapshotManager
 
 # 設定日誌
 logging.basicConfig(
@@ -40,17 +57,146 @@ app = Flask(__name__)
 LINE_CHANNEL_ACCESS_TOKEN = os.getenv('LINE_CHANNEL_ACCESS_TOKEN')
 LINE_CHANNEL_SECRET = os.getenv('LINE_CHANNEL_SECRET')
 
-# 檢查環境變數是否存在
-if not LINE_CHANNEL_ACCESS_TOKEN:
-    logger.warning("警告：未設定 LINE_CHANNEL_ACCESS_TOKEN 環境變數")
-if not LINE_CHANNEL_SECRET:
-    logger.warning("警告：未設定 LINE_CHANNEL_SECRET 環境變數")
+# 管理端點（/admin/*）的 Bearer token；未設定時管理端點停用
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+# 同一台機器上的 worker 數量（gunicorn 的 WEB_CONCURRENCY），用來檢查快取後端是否共用
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+
+# 服務啟動後是否於背景預先載入 webhook 相關模組
+PRELOAD_WEBHOOK = os.getenv('PRELOAD_WEBHOOK', '1').lower() in ('1', 'true', 'yes')
+
+# 暖啟動快照：第一次讀取快取時才載入，並定期及關閉時寫入（create_app 時啟動）
+snapshot_manager = SnapshotManager()
+
+# webhook 事件去重（LINE 重新傳送的事件不重複處理）
+event_deduplicator = EventDeduplicator()
+
+# 群組 / 聊天室中短時間內重複的指令只回覆一次
+reply_coalescer = ReplyCoalescer()
+
+_services_started = False
+_services_lock = threading.Lock()
+
+
+def _check_cache_backend_shared() -> None:
+    """memory:// 只在單一程序內有效：多個 worker 時租約無法互斥，每個 worker 都會各自爬取"""
+    if not isinstance(news_cache.backend, MemoryCacheBackend):
+        return
+    if WEB_CONCURRENCY > 1:
+        logger.warning(
+            f"警告：{WEB_CONCURRENCY} 個 worker 使用 memory:// 快取後端，爬取租約與文章快取不會共用，"
+            "請將 CACHE_BACKEND_URL 設為 sqlite:// 或 redis://"
+        )
+    else:
+        logger.info("使用 memory:// 快取後端：爬取租約只在單一程序內有效")
+
+
+def create_app(start_services: bool = True) -> Flask:
+    """啟動背景服務（快照、記憶體預算）並返回 Flask app；重複呼叫只會啟動一次
+
+    這些副作用不在 import 時執行：解析子程序（spawn / forkserver）會以
+    __mp_main__ 的名稱重新載入 `python src/app.py` 的主程式檔，
+    子程序不應啟動背景執行緒或註冊 SIGTERM / atexit 處理。
+
+    參數：
+        start_services: False 時只返回 app，不啟動背景服務、不讀寫快照
+            （離線重播等工具使用；之後仍可再以 True 呼叫啟動服務）
+    """
+    global _services_started
+    if not start_services:
+        return app
+    with _services_lock:
+        if _services_started:
+            return app
+        _services_started = True
+
+        # 檢查環境變數是否存在
+        if not LINE_CHANNEL_ACCESS_TOKEN:
+            logger.warning("警告：未設定 LINE_CHANNEL_ACCESS_TOKEN 環境變數")
+        if not LINE_CHANNEL_SECRET:
+            logger.warning("警告：未設定 LINE_CHANNEL_SECRET 環境變數")
+
+        _check_cache_backend_shared()
+
+        snapshot_manager.register("news", news_cache.dump, news_cache.load)
+        news_cache.set_loader(snapshot_manager.ensure_loaded)
+        snapshot_manager.start()
+
+        # 記憶體預算：超過 MEMORY_BUDGET_MB 時依優先順序（數值小的先）釋放
+        # 解析結果可以重建，最先釋放；去重記錄影響正確性，最後釋放
+        memory_budget.register("parse_cache", parse_cache.size_bytes, parse_cache.evict, priority=10)
+        memory_budget.register("reply_coalescer", reply_coalescer.size_bytes, reply_coalescer.evict, priority=40)
+        # SQLite / Redis 後端由所有 worker 共用，資料不在程序內，只列入報告、不釋放
+        news_cache_evict = news_cache.clear if isinstance(news_cache.backend, MemoryCacheBackend) else None
+        memory_budget.register("news_cache", news_cache.size_bytes, news_cache_evict, priority=50)
+        memory_budget.register("event_deduplicator", event_deduplicator.size_bytes, event_deduplicator.evict,
+                               priority=60)
+        memory_budget.start()
+    return app
+
+
+class _WebhookRuntime:
+    """延遲建立的 webhook 執行環境
+
+    第一次使用時才載入 line-bot-sdk 與指令處理器，
+    並建立共用的 LINE API 客戶端與 WebhookHandler。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+
+    def ensure_ready(self) -> "_WebhookRuntime":
+        if self.ready:
+            return self
+        with self._lock:
+            if self.ready:
+                return self
+
+            from linebot.v3 import WebhookHandler
+            from linebot.v3.exceptions import InvalidSignatureError
+            from linebot.v3.webhooks import MessageEvent, TextMessageContent
+
+            from src.handlers.command_handler import handle_aivi_command, reply_busy
+            from src.handlers.line_client import get_api_client
+            from src.scrapers.enrichment import article_enricher
+            from src.scrapers.fetcher import (
+                export_http_cache, http_cache_size_bytes, import_http_cache, reset_http_cache,
+            )
+
+            self.InvalidSignatureError = InvalidSignatureError
+            self.handle_aivi_command = handle_aivi_command
+            self.reply_busy = reply_busy
+
+            # 整個程序共用的 LINE API 客戶端（連線池在多次回覆之間重複使用）
+            self.get_api_client = get_api_client
+            get_api_client()
+
+            # 建立 Webhook Handler
+            self.handler = WebhookHandler(LINE_CHANNEL_SECRET or '')
+            self.handler.add(MessageEvent, message=TextMessageContent)(handle_message)
 
-# 建立 LINE Bot API 設定
-configuration = Configuration(access_token=LINE_CHANNEL_ACCESS_TOKEN or '')
+            snapshot_manager.register("http", export_http_cache, import_http_cache)
+            snapshot_manager.register("enrichment", article_enricher.dump, article_enricher.load)
+            memory_budget.register("http_cache", http_cache_size_bytes, reset_http_cache, priority=20)
+            memory_budget.register("article_enricher", article_enricher.size_bytes, article_enricher.evict, priority=30)
 
-# 建立 Webhook Handler
-handler = WebhookHandler(LINE_CHANNEL_SECRET or '')
+            self.ready = True
+            import_profiler.report("webhook 模組延遲載入")
+            return self
+
+
+runtime = _WebhookRuntime()
+
+
+def _preload_runtime():
+    """於背景預先載入 webhook 相關模組，讓第一次 webhook 不必等待"""
+    try:
+        runtime.ensure_ready()
+        logger.info("webhook 模組已預先載入")
+    except Exception as e:
+        logger.error(f"預先載入 webhook 模組時發生錯誤：{e}")
 
 
 @app.route("/", methods=['GET'])
@@ -67,7 +213,8 @@ def index():
         "service": "AIVI LINE Bot",
         "description": "LINE Bot Webhook 服務正常運行中",
         "endpoints": {
-            "webhook": "/webhook (POST)"
+            "webhook": "/webhook (POST)",
+            "metrics": "/metrics (GET)"
         },
         "config": {
             "line_token_set": bool(LINE_CHANNEL_ACCESS_TOKEN),
@@ -77,6 +224,23 @@ def index():
     return status
 
 
+@app.route("/metrics", methods=['GET'])
+def metrics():
+    """服務統計資訊
+
+    Returns:
+        dict: JSON 格式的統計資訊（webhook 事件去重、解析快取等）
+    """
+    return {
+        "dedup": event_deduplicator.stats(),
+        "coalesce": reply_coalescer.stats(),
+        "parse_cache": parse_cache.stats(),
+        "parse_pool": parse_pool.stats(),
+        "admission": admission_controller.stats(),
+        "cache_backend": describe_backend(news_cache.backend)
+    }
+
+
 @app.route("/webhook", methods=['POST'])
 def webhook():
     """LINE Bot webhook endpoint
@@ -100,29 +264,126 @@ def webhook():
     body = request.get_data(as_text=True)
     logger.info(f"收到 webhook 請求：{body}")
 
-    # 驗證簽章並處理事件
+    # 驗證簽章並處理事件（抽樣的請求以 request_profiler 分析）
+    rt = runtime.ensure_ready()
+    forced = request.headers.get('X-Aivi-Profile') == '1' and _is_admin_request()
+    profiling = request_profiler.profile("webhook") if request_profiler.should_profile(forced) else nullcontext()
     try:
-        handler.handle(body, signature)
-    except InvalidSignatureError:
+        with profiling:
+            rt.handler.handle(body, signature)
+    except rt.InvalidSignatureError:
         logger.error("簽章驗證失敗")
         abort(400)
     except Exception as e:
         logger.error(f"處理事件時發生錯誤：{e}")
         abort(500)
 
+    # 錄製模式：保存遮蔽後的 webhook（供離線重播）
+    corpus_recorder.record_webhook(body)
     return 'OK'
 
 
-@handler.add(MessageEvent, message=TextMessageContent)
+def _is_admin_request() -> bool:
+    """檢查請求是否帶有正確的管理者 Bearer token"""
+    if not ADMIN_TOKEN:
+        return False
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def _require_admin() -> None:
+    """管理端點的驗證：未設定 ADMIN_TOKEN 時回應 404，token 錯誤時回應 401"""
+    if not ADMIN_TOKEN:
+        abort(404)
+    if not _is_admin_request():
+        abort(401)
+
+
+@app.route("/admin/profiles", methods=['GET'])
+def list_profiles():
+    """列出效能分析結果與目前的抽樣率（需要管理者 token）"""
+    _require_admin()
+    return {
+        "sample_rate": request_profiler.sample_rate,
+        "profiles": request_profiler.list_profiles()
+    }
+
+
+@app.route("/admin/profiles/sampling", methods=['POST'])
+def update_profile_sampling():
+    """調整抽樣率，不需重新部署（需要管理者 token）
+
+    Body: {"sample_rate": N}，每 N 個請求分析一個，0 表示停用
+    """
+    _require_admin()
+    payload = request.get_json(silent=True) or {}
+    try:
+        request_profiler.set_sample_rate(int(payload.get('sample_rate')))
+    except (TypeError, ValueError):
+        abort(400)
+    return {"sample_rate": request_profiler.sample_rate}
+
+
+@app.route("/admin/profiles/<name>", methods=['GET'])
+def download_profile(name):
+    """下載單一效能分析結果（需要管理者 token）"""
+    _require_admin()
+    path = request_profiler.resolve(name)
+    if path is None:
+        abort(404)
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=name)
+
+
+@app.route("/admin/memory", methods=['GET'])
+def memory_report():
+    """各元件的估計記憶體用量與 RSS（需要管理者 token）
+
+    Query: top=N，tracemalloc 追蹤中（MEMORY_TRACEMALLOC=1）時附上配置最多的前 N 個位置
+    """
+    _require_admin()
+    try:
+        top = int(request.args.get('top', 0))
+    except ValueError:
+        abort(400)
+    return memory_budget.report(top=max(top, 0))
+
+
+def _is_duplicate_event(event) -> bool:
+    """檢查並標記 webhook 事件，重複的事件返回 True"""
+    event_id = getattr(event, 'webhook_event_id', None)
+    if not event_id:
+        return False
+
+    delivery_context = getattr(event, 'delivery_context', None)
+    is_redelivery = bool(delivery_context and delivery_context.is_redelivery)
+    if not event_deduplicator.check_and_mark(event_id, is_redelivery):
+        return False
+
+    stats = event_deduplicator.stats()
+    logger.info(
+        f"略過重複的 webhook 事件 {event_id}（redelivery={is_redelivery}，"
+        f"累計略過 {stats['hits']} 次，命中率 {stats['hit_rate']:.1%}）"
+    )
+    return True
+
+
 def handle_message(event):
     """處理文字訊息事件
 
     檢查訊息是否為 /aivi 指令，若是則呼叫指令處理器。
-    指令匹配不區分大小寫。
+    指令匹配不區分大小寫。已處理過的事件（相同 webhookEventId）直接略過；
+    負載過高時依 admission_controller 的等級降級：只用快取、回覆忙碌訊息或直接略過。
+    會回覆的指令在群組中短時間內重複時由 reply_coalescer 合併為一則回覆；
+    略過（SHED）或處理失敗的指令不佔用合併視窗。
+
+    此函式在 runtime 初始化時註冊到 WebhookHandler。
 
     Args:
         event: LINE MessageEvent 物件，包含訊息內容和來源資訊
     """
+    if _is_duplicate_event(event):
+        return
+
     message_text = event.message.text.strip().lower()
     user_id = event.source.user_id
     logger.info(f"收到來自使用者 {user_id} 的訊息：{event.message.text}")
@@ -130,16 +391,34 @@ def handle_message(event):
     # 檢查是否為 /aivi 指令
     if message_text == "/aivi":
         logger.info("偵測到 /aivi 指令，開始處理")
-        # 使用 asyncio 執行非同步指令處理
-        with ApiClient(configuration) as api_client:
-            asyncio.run(handle_aivi_command(event, api_client))
+        level = admission_controller.admit()
+        if level == LoadLevel.SHED:
+            logger.warning("負載過高，略過 /aivi 指令")
+            return
+        key = chat_key(event.source)
+        if not reply_coalescer.should_reply(key, message_text):
+            return
+        try:
+            if level == LoadLevel.BUSY:
+                runtime.reply_busy(event, runtime.get_api_client())
+                return
+            # 使用 asyncio 執行非同步指令處理
+            with admission_controller.track():
+                asyncio.run(runtime.handle_aivi_command(
+                    event, runtime.get_api_client(), cache_only=level == LoadLevel.CACHE_ONLY
+                ))
+        except Exception:
+            # 沒有回覆成功：取消記錄，群組中的下一則指令仍會回覆
+            reply_coalescer.release(key, message_text)
+            raise
     else:
         # 其他訊息不處理
         logger.debug(f"非指令訊息，不處理: {message_text}")
         pass
 
 
-if __name__ == "__main__":
+def main() -> None:
+    """以 Flask 內建伺服器啟動服務"""
     port = int(os.getenv('PORT', 5000))
     logger.info(f"啟動 Flask 服務，監聽 port {port}")
 
@@ -151,4 +430,17 @@ if __name__ == "__main__":
             "  - LINE_CHANNEL_SECRET"
         )
 
-    app.run(host='0.0.0.0', port=port, debug=True)
+    flask_app = create_app()
+    import_profiler.report("服務啟動")
+    if PRELOAD_WEBHOOK:
+        threading.Thread(target=_preload_runtime, name="aivi-preload", daemon=True).start()
+    # 預先建立解析子程序，第一次解析大型頁面時不必等待程序啟動
+    parse_pool.start()
+
+    # debug 模式會啟用 reloader，使啟動時間加倍，只在本機開發時透過 FLASK_DEBUG=1 開啟
+    debug = os.getenv('FLASK_DEBUG', '0').lower() in ('1', 'true', 'yes')
+    flask_app.run(host='0.0.0.0', port=port, debug=debug)
+
+
+if __name__ == "__main__":
+    main()
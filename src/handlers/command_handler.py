@@ -4,31 +4,64 @@
 並透過 LINE Bot API 回覆使用者。
 """
 
+import asyncio
 import logging
-from typing import List, Dict
+import os
+import threading
+import time
+from typing import Optional, Sequence, Tuple
 
-from linebot.v3.messaging import ApiClient, MessagingApi, TextMessage, ReplyMessageRequest
+from linebot.v3.messaging import (
+    ApiClient, MessagingApi, ReplyMessageRequest, ShowLoadingAnimationRequest, TextMessage,
+)
 from linebot.v3.webhooks import MessageEvent
 
-from src.scrapers.aivi_scraper import scrape_aivi_news
+from src.handlers.line_client import get_api_client
+from src.handlers.news_cache import news_cache
+from src.scrapers.aivi_scraper import AIVI_SOURCE_NAME
+from src.scrapers.enrichment import ENRICHMENT_ENABLED, article_enricher
+from src.scrapers.feed_scraper import AIVI_FEED_SOURCE_NAME
+from src.scrapers.models import Article, ArticleList
+from src.scrapers.registry import freshness_ttl, scrape_sources
+from src.utils.background import run_in_background
+from src.utils.lease import Lease
+
+# 設定常數
+AIVI_CACHE_KEY = "aivi"
+# /aivi 指令使用的爬蟲來源（依優先順序）；預設使用 feed，失敗時改用 HTML 首頁
+AIVI_FEED_ENABLED = os.getenv('AIVI_FEED_ENABLED', '1').lower() in ('1', 'true', 'yes')
+AIVI_SOURCES = (AIVI_FEED_SOURCE_NAME,) if AIVI_FEED_ENABLED else (AIVI_SOURCE_NAME,)
+# 過載時回覆的簡短訊息
+BUSY_MESSAGE = "⏳ 目前使用人數較多，請稍後再試。"
+# 其他程序正在爬取時，等待其發布結果的時間上限與輪詢間隔（秒）
+SCRAPE_WAIT_TIMEOUT = float(os.getenv('SCRAPE_WAIT_TIMEOUT', 10))
+SCRAPE_POLL_INTERVAL = 0.2
+# 需要實際爬取時顯示的載入動畫秒數（5 的倍數，5～60；0 表示停用）
+LOADING_ANIMATION_SECONDS = int(os.getenv('LOADING_ANIMATION_SECONDS', 20))
+# 回覆前等待載入動畫請求完成的時間上限（秒）
+LOADING_ANIMATION_WAIT = 1.0
 
 # 設定日誌記錄器
 logger = logging.getLogger(__name__)
 
+# 正在背景更新的快取 key，避免重複排程
+_refreshing: set = set()
+_refreshing_lock = threading.Lock()
+
 
-def format_news_message(articles: List[Dict[str, str]]) -> str:
+def format_news_message(articles: Sequence[Article]) -> str:
     """格式化文章清單為 LINE 訊息
 
     參數：
-        articles: 文章清單，每個元素包含 title 和 url
+        articles: 文章清單，經過補充的文章另外包含 date 與 excerpt
 
     返回：
         格式化的訊息字串
 
     範例：
         >>> articles = [
-        ...     {'title': '測試文章', 'url': 'https://www.aivi.fyi/test'},
-        ...     {'title': 'AI 新聞', 'url': 'https://www.aivi.fyi/ai-news'}
+        ...     Article('測試文章', 'https://www.aivi.fyi/test'),
+        ...     Article('AI 新聞', 'https://www.aivi.fyi/ai-news')
         ... ]
         >>> message = format_news_message(articles)
         >>> '📰 AIVI 最新文章' in message
@@ -42,23 +75,194 @@ def format_news_message(articles: List[Dict[str, str]]) -> str:
     message = "📰 AIVI 最新文章\n\n"
 
     for i, article in enumerate(articles[:5], 1):
-        title = article.get('title', '無標題')
-        url = article.get('url', '')
-        message += f"{i}. {title}\n"
-        message += f"   🔗 {url}\n\n"
+        message += f"{i}. {article.title or '無標題'}\n"
+        if article.date:
+            message += f"   📅 {article.date[:10]}\n"
+        if article.excerpt:
+            message += f"   📝 {article.excerpt}\n"
+        message += f"   🔗 {article.url}\n\n"
 
     return message.strip()
 
 
-async def handle_aivi_command(event: MessageEvent, api_client: ApiClient):
+def _scrape_lease() -> Lease:
+    """/aivi 爬取的跨程序租約（與文章快取共用同一個後端）"""
+    return Lease(news_cache.backend, f"lease:{AIVI_CACHE_KEY}")
+
+
+async def _scrape_and_publish() -> Tuple[ArticleList, str]:
+    """爬取最新文章並格式化回覆訊息，成功取得文章時發布到共用快取"""
+    articles = await scrape_sources(AIVI_SOURCES, max_articles=5)
+    logger.info(f"爬取到 {len(articles)} 則文章")
+
+    message_text = format_news_message(articles)
+    if articles:
+        news_cache.set(AIVI_CACHE_KEY, articles, message_text, ttl=freshness_ttl(AIVI_SOURCES))
+    return articles, message_text
+
+
+async def _wait_for_published(since: float, lease: Lease):
+    """等待其他程序發布 since 之後爬取的快取項目
+
+    持有者沒有發布結果就釋放租約（例如爬取失敗）時不再等待。
+
+    返回：
+        發布的快取項目；逾時或持有者已釋放租約時返回 None
+    """
+    deadline = time.monotonic() + SCRAPE_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(SCRAPE_POLL_INTERVAL)
+        # 先檢查租約再讀取快取：持有者會先發布再釋放，不會漏掉剛發布的結果
+        released = not lease.locked()
+        cached = news_cache.get(AIVI_CACHE_KEY)
+        if cached is not None and cached.fetched_at >= since:
+            return cached
+        if released:
+            logger.warning("持有租約的程序沒有發布結果即釋放租約，改為自行爬取")
+            return None
+    logger.warning("等待其他程序發布結果逾時，改為自行爬取")
+    return None
+
+
+async def fetch_aivi_reply() -> Tuple[ArticleList, str]:
+    """取得最新文章與回覆訊息
+
+    多個 worker 之間只有取得租約的程序會爬取來源網站並寫入共用快取；
+    其他程序等待其發布結果。持有者失敗或等待逾時（例如持有者當機）時改為自行爬取。
+
+    返回：
+        (文章清單, 回覆訊息)
+    """
+    since = time.time()
+    lease = _scrape_lease()
+    if not lease.acquire():
+        logger.info("其他程序正在爬取，等待其發布結果")
+        cached = await _wait_for_published(since, lease)
+        if cached is not None:
+            return cached.articles, cached.reply_text
+        # 持有者已釋放時接手租約；逾時（持有者可能已當機）時即使取得不到也自行爬取
+        lease.acquire()
+
+    try:
+        # 等待結束到取得租約之間，持有者可能剛好發布了結果
+        cached = news_cache.get(AIVI_CACHE_KEY)
+        if cached is not None and cached.fetched_at >= since:
+            return cached.articles, cached.reply_text
+        return await _scrape_and_publish()
+    finally:
+        lease.release()
+
+
+async def _refresh_aivi_cache() -> None:
+    """背景更新 /aivi 快取；其他程序已在更新時直接略過"""
+    lease = _scrape_lease()
+    try:
+        if not lease.acquire():
+            logger.info("其他程序正在更新快取，略過背景更新")
+            return
+        cached = news_cache.get(AIVI_CACHE_KEY)
+        if cached is not None and news_cache.is_fresh(cached):
+            # 取得租約前，其他程序已經發布了新的結果
+            return
+        await _scrape_and_publish()
+    except Exception as e:
+        logger.error(f"背景更新快取時發生錯誤: {e}", exc_info=True)
+    finally:
+        lease.release()
+        with _refreshing_lock:
+            _refreshing.discard(AIVI_CACHE_KEY)
+
+
+def _schedule_refresh() -> None:
+    """排程背景更新（同一時間只會有一個更新在執行）"""
+    with _refreshing_lock:
+        if AIVI_CACHE_KEY in _refreshing:
+            return
+        _refreshing.add(AIVI_CACHE_KEY)
+    logger.info("快取已過期，先回覆快取內容並於背景更新")
+    run_in_background(_refresh_aivi_cache())
+
+
+def _reply_text(api_client: ApiClient, reply_token: str, text: str) -> None:
+    """以共用的 ApiClient 回覆文字訊息
+
+    不使用 `with api_client:`，讓連線池在多次回覆之間保持開啟。
+    """
+    line_bot_api = MessagingApi(api_client)
+    line_bot_api.reply_message(
+        ReplyMessageRequest(
+            reply_token=reply_token,
+            messages=[TextMessage(text=text)]
+        )
+    )
+
+
+def _loading_chat_id(event: MessageEvent) -> Optional[str]:
+    """載入動畫只適用於一對一聊天；群組與聊天室返回 None"""
+    source = getattr(event, 'source', None)
+    if getattr(source, 'type', None) != 'user':
+        return None
+    return getattr(source, 'user_id', None)
+
+
+async def _show_loading_animation(api_client: ApiClient, chat_id: str) -> None:
+    """呼叫 LINE API 顯示載入動畫（在執行緒中呼叫同步的 SDK）"""
+    request = ShowLoadingAnimationRequest(chat_id=chat_id, loading_seconds=LOADING_ANIMATION_SECONDS)
+    try:
+        await asyncio.to_thread(MessagingApi(api_client).show_loading_animation, request)
+    except Exception as e:
+        logger.warning(f"顯示載入動畫失敗：{e}")
+
+
+def _start_loading_animation(api_client: ApiClient, event: MessageEvent) -> Optional[asyncio.Task]:
+    """開始顯示載入動畫（與爬取同時進行）；不需要顯示時返回 None
+
+    返回的 task 必須在回覆前交給 _finish_loading_animation，
+    否則載入動畫的請求可能在回覆之後才送達，動畫會停留在聊天室中。
+    """
+    if LOADING_ANIMATION_SECONDS <= 0:
+        return None
+    chat_id = _loading_chat_id(event)
+    if chat_id is None:
+        return None
+    return asyncio.ensure_future(_show_loading_animation(api_client, chat_id))
+
+
+async def _finish_loading_animation(loading: Optional[asyncio.Task]) -> None:
+    """回覆前等待載入動畫的請求完成（最多 LOADING_ANIMATION_WAIT 秒）"""
+    if loading is None:
+        return
+    done, _ = await asyncio.wait({loading}, timeout=LOADING_ANIMATION_WAIT)
+    if not done:
+        logger.warning(f"載入動畫請求超過 {LOADING_ANIMATION_WAIT:g} 秒未完成，直接回覆")
+
+
+def reply_busy(event: MessageEvent, api_client: Optional[ApiClient] = None) -> None:
+    """過載時回覆簡短的忙碌訊息（不爬取、不讀取快取）"""
+    try:
+        _reply_text(api_client or get_api_client(), event.reply_token, BUSY_MESSAGE)
+    except Exception as e:
+        logger.error(f"回覆忙碌訊息時失敗: {e}", exc_info=True)
+
+
+async def handle_aivi_command(event: MessageEvent, api_client: Optional[ApiClient] = None,
+                              cache_only: bool = False):
     """處理 /aivi 指令
 
-    呼叫爬蟲模組取得最新文章，格式化訊息後透過 LINE Bot API 回覆使用者。
+    並行抓取 AIVI_SOURCES 設定的所有來源，格式化訊息後透過 LINE Bot API 回覆使用者。
+    若快取中已有回覆訊息則直接使用；快取過期時先回覆舊資料，再於背景更新。
+    負載過高時（cache_only=True）只使用快取，不爬取也不排程背景工作；
+    快取中沒有資料時回覆忙碌訊息。
+    需要實際爬取時，一對一聊天會同時顯示載入動畫；回覆前等待載入動畫的請求完成
+    （最多 LOADING_ANIMATION_WAIT 秒），確保動畫不會在回覆之後才出現。
+    啟用文章補充（ARTICLE_ENRICHMENT=1）時，已補充的文章會附上日期與摘要，
+    尚未補充的文章維持標題 + 連結，補充工作在背景進行。
     若發生錯誤，會回覆錯誤訊息。
 
     參數：
         event: LINE MessageEvent 物件，包含訊息內容和 reply token
-        api_client: LINE Messaging API 客戶端實例
+        api_client: LINE Messaging API 客戶端實例（預設使用程序共用的客戶端）
+        cache_only: 只使用快取回覆（負載控制的降級模式）
 
     錯誤處理：
         - 爬蟲模組拋出異常：記錄日誌，回覆錯誤訊息
@@ -69,25 +273,38 @@ async def handle_aivi_command(event: MessageEvent, api_client: ApiClient):
         >>> # 在實際使用中，event 和 api_client 由 LINE Bot 框架提供
         >>> # await handle_aivi_command(event, api_client)
     """
+    api_client = api_client or get_api_client()
+    loading = None
+
     try:
         logger.info("開始處理 /aivi 指令")
 
-        # 呼叫爬蟲模組取得最新文章
-        articles = await scrape_aivi_news(max_articles=5)
-        logger.info(f"爬取到 {len(articles)} 則文章")
+        cached = news_cache.get(AIVI_CACHE_KEY)
+        if cached is not None:
+            # 使用快取的回覆訊息
+            articles, message_text = cached.articles, cached.reply_text
+            if not news_cache.is_fresh(cached) and not cache_only:
+                _schedule_refresh()
+        elif cache_only:
+            logger.info("負載過高且沒有快取，回覆忙碌訊息")
+            _reply_text(api_client, event.reply_token, BUSY_MESSAGE)
+            return
+        else:
+            # 沒有快取可以立即回覆：爬取期間顯示載入動畫
+            loading = _start_loading_animation(api_client, event)
+            # 呼叫爬蟲模組取得最新文章並格式化訊息
+            articles, message_text = await fetch_aivi_reply()
 
-        # 格式化訊息
-        message_text = format_news_message(articles)
+        if ENRICHMENT_ENABLED and articles and not cache_only:
+            # 使用已補充的資料重新格式化，缺少的部分於背景補充（不等待）
+            enriched = article_enricher.apply(articles)
+            if enriched != articles:
+                message_text = format_news_message(enriched)
+            article_enricher.schedule(articles)
 
         # 回覆訊息
-        with api_client:
-            line_bot_api = MessagingApi(api_client)
-            line_bot_api.reply_message(
-                ReplyMessageRequest(
-                    reply_token=event.reply_token,
-                    messages=[TextMessage(text=message_text)]
-                )
-            )
+        await _finish_loading_animation(loading)
+        _reply_text(api_client, event.reply_token, message_text)
 
         logger.info(f"成功回覆 {len(articles)} 則新聞")
 
@@ -98,14 +315,8 @@ async def handle_aivi_command(event: MessageEvent, api_client: ApiClient):
         error_message = "❌ 抱歉，目前無法取得新聞。請稍後再試。"
 
         try:
-            with api_client:
-                line_bot_api = MessagingApi(api_client)
-                line_bot_api.reply_message(
-                    ReplyMessageRequest(
-                        reply_token=event.reply_token,
-                        messages=[TextMessage(text=error_message)]
-                    )
-                )
+            await _finish_loading_animation(loading)
+            _reply_text(api_client, event.reply_token, error_message)
             logger.info("已回覆錯誤訊息")
 
         except Exception as reply_error:
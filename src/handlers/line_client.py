@@ -0,0 +1,64 @@
+"""共用的 LINE Messaging API 客戶端
+
+整個程序共用一個 ApiClient，底層的 urllib3 連線池（含 TLS 連線）
+在多次回覆之間重複使用，不必每則訊息都重新建立連線到 api.line.me。
+urllib3 的 PoolManager 是執行緒安全的，可供 Flask 的多個執行緒同時使用。
+"""
+
+import atexit
+import logging
+import os
+import threading
+from typing import Optional
+
+from linebot.v3.messaging import ApiClient, Configuration
+
+# 設定常數
+LINE_API_POOL_SIZE = int(os.getenv('LINE_API_POOL_SIZE', 10))
+# 自訂 API 位址（例如本機測試用的替身伺服器）；未設定時使用 SDK 預設的 https://api.line.me
+LINE_API_HOST_ENV = 'LINE_API_HOST'
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+_api_client: Optional[ApiClient] = None
+_lock = threading.Lock()
+
+
+def create_configuration() -> Configuration:
+    """依環境變數建立 LINE Bot API 設定"""
+    configuration = Configuration(
+        host=os.getenv(LINE_API_HOST_ENV) or None,
+        access_token=os.getenv('LINE_CHANNEL_ACCESS_TOKEN') or '',
+    )
+    configuration.connection_pool_maxsize = LINE_API_POOL_SIZE
+    return configuration
+
+
+def get_api_client() -> ApiClient:
+    """取得整個程序共用的 ApiClient（第一次呼叫時建立）
+
+    範例：
+        >>> get_api_client() is get_api_client()
+        True
+    """
+    global _api_client
+    if _api_client is not None:
+        return _api_client
+    with _lock:
+        if _api_client is None:
+            _api_client = ApiClient(create_configuration())
+            logger.info(f"已建立共用的 LINE API 客戶端（連線池大小 {LINE_API_POOL_SIZE}）")
+        return _api_client
+
+
+def close_api_client() -> None:
+    """關閉共用的 ApiClient 並釋放連線池"""
+    global _api_client
+    with _lock:
+        client, _api_client = _api_client, None
+    if client is not None:
+        client.close()
+
+
+atexit.register(close_api_client)
@@ -0,0 +1,218 @@
+"""最新文章快取
+
+保存每個指令最近一次爬取的文章清單與已格式化的回覆訊息，
+讓重複的指令可以直接回覆，不必每次都爬取來源網站。
+
+快取項目分為兩種狀態：
+- 新鮮（fresh）：存在時間小於 ttl，直接回覆
+- 過期（stale）：存在時間小於 max_stale，先回覆舊資料再於背景更新
+超過 max_stale 的項目視為不存在。
+
+快取內容存放在可替換的後端（見 src.utils.cache_backend），設定
+CACHE_BACKEND_URL 後多個 worker / replica 共用同一份資料，
+不會各自爬取來源網站。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from src.scrapers.models import Article, ArticleList
+from src.utils.cache_backend import CacheBackend, CacheBackendError, create_cache_backend
+
+# 設定常數
+NEWS_CACHE_TTL = float(os.getenv('NEWS_CACHE_TTL', 300))  # 秒
+NEWS_CACHE_MAX_STALE = float(os.getenv('NEWS_CACHE_MAX_STALE', 7 * 24 * 3600))  # 秒
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class NewsCacheEntry:
+    """單一指令的快取內容
+
+    屬性：
+        articles: 文章清單
+        reply_text: 已格式化的回覆訊息
+        fetched_at: 爬取時間（epoch 秒）
+        ttl: 此項目的新鮮期（秒），None 表示使用快取的預設值
+    """
+
+    articles: ArticleList
+    reply_text: str
+    fetched_at: float
+    ttl: Optional[float] = None
+
+    def age(self, now: Optional[float] = None) -> float:
+        """快取存在的秒數"""
+        return (now if now is not None else time.time()) - self.fetched_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉為可 JSON 序列化的資料"""
+        return {
+            'articles': self.articles.to_dicts(),
+            'reply_text': self.reply_text,
+            'fetched_at': self.fetched_at,
+            'ttl': self.ttl,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'NewsCacheEntry':
+        """從 to_dict() 的資料還原"""
+        return cls(
+            articles=ArticleList.from_dicts(data['articles']),
+            reply_text=data['reply_text'],
+            fetched_at=data['fetched_at'],
+            ttl=data.get('ttl'),
+        )
+
+
+class NewsCache:
+    """執行緒安全的最新文章快取
+
+    參數：
+        ttl: 新鮮期（秒）
+        max_stale: 可使用的最長存在時間（秒）
+        backend: 快取後端（預設依 CACHE_BACKEND_URL 建立）
+
+    範例：
+        >>> cache = NewsCache(ttl=60)
+        >>> cache.set('aivi', [Article('T', 'https://www.aivi.fyi/t')], '1. T')
+        >>> entry = cache.get('aivi')
+        >>> entry.reply_text, cache.is_fresh(entry)
+        ('1. T', True)
+    """
+
+    KEY_PREFIX = 'news:'
+
+    def __init__(self, ttl: float = NEWS_CACHE_TTL, max_stale: float = NEWS_CACHE_MAX_STALE,
+                 backend: Optional[CacheBackend] = None):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.backend = backend if backend is not None else create_cache_backend()
+        self._keys: set = set()
+        self._lock = threading.RLock()
+        self._loader: Optional[Callable[[], Any]] = None
+
+    def set_loader(self, loader: Optional[Callable[[], Any]]) -> None:
+        """設定延遲載入函式，於第一次讀取快取時呼叫一次（例如從快照還原）"""
+        with self._lock:
+            self._loader = loader
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            loader, self._loader = self._loader, None
+        if loader is not None:
+            try:
+                loader()
+            except Exception as e:
+                logger.error(f"載入快取時發生錯誤：{e}")
+
+    def _read(self, key: str) -> Optional[NewsCacheEntry]:
+        """從後端讀取項目；後端失敗或資料損壞時視為不存在"""
+        try:
+            raw = self.backend.get(self.KEY_PREFIX + key)
+        except CacheBackendError as e:
+            logger.error(f"讀取快取後端時發生錯誤：{e}")
+            return None
+        if raw is None:
+            return None
+        try:
+            return NewsCacheEntry.from_dict(json.loads(raw))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"快取項目 {key} 格式錯誤，略過：{e}")
+            return None
+
+    def _write(self, key: str, entry: NewsCacheEntry) -> None:
+        remaining = self.max_stale - entry.age()
+        if remaining <= 0:
+            return
+        data = json.dumps(entry.to_dict(), ensure_ascii=False).encode('utf-8')
+        try:
+            self.backend.set(self.KEY_PREFIX + key, data,
+                             ttl=remaining if remaining != float('inf') else None)
+        except CacheBackendError as e:
+            logger.error(f"寫入快取後端時發生錯誤：{e}")
+            return
+        with self._lock:
+            self._keys.add(key)
+
+    def get(self, key: str) -> Optional[NewsCacheEntry]:
+        """取得快取項目；不存在或超過 max_stale 時返回 None"""
+        self._ensure_loaded()
+        entry = self._read(key)
+        if entry is not None and entry.age() > self.max_stale:
+            return None
+        if entry is not None:
+            with self._lock:
+                self._keys.add(key)
+        return entry
+
+    def set(self, key: str, articles: Iterable[Article], reply_text: str,
+            fetched_at: Optional[float] = None, ttl: Optional[float] = None) -> None:
+        """寫入快取項目
+
+        參數：
+            key: 快取 key（通常是指令名稱）
+            articles: 文章清單
+            reply_text: 已格式化的回覆訊息
+            fetched_at: 爬取時間（預設為現在）
+            ttl: 此項目的新鮮期（預設使用快取的 ttl）
+        """
+        entry = NewsCacheEntry(
+            articles=ArticleList(articles),
+            reply_text=reply_text,
+            fetched_at=fetched_at if fetched_at is not None else time.time(),
+            ttl=ttl,
+        )
+        self._write(key, entry)
+
+    def is_fresh(self, entry: NewsCacheEntry) -> bool:
+        """判斷快取項目是否仍在新鮮期內"""
+        return entry.age() <= (entry.ttl if entry.ttl is not None else self.ttl)
+
+    def clear(self) -> None:
+        """清除此程序寫入或讀取過的快取項目"""
+        with self._lock:
+            keys, self._keys = self._keys, set()
+        for key in keys:
+            try:
+                self.backend.delete(self.KEY_PREFIX + key)
+            except CacheBackendError as e:
+                logger.error(f"清除快取後端時發生錯誤：{e}")
+
+    def size_bytes(self) -> int:
+        """估算快取在此程序中佔用的記憶體（SQLite / Redis 後端的資料不在程序內，返回 0）"""
+        size_bytes = getattr(self.backend, 'size_bytes', None)
+        return size_bytes() if size_bytes is not None else 0
+
+    def dump(self) -> Dict[str, Any]:
+        """匯出為可 JSON 序列化的資料（供快照使用）"""
+        with self._lock:
+            keys = sorted(self._keys)
+        data = {}
+        for key in keys:
+            entry = self._read(key)
+            if entry is not None:
+                data[key] = entry.to_dict()
+        return data
+
+    def load(self, data: Dict[str, Any]) -> None:
+        """從快照資料還原；後端中較新的項目不會被覆蓋"""
+        for key, item in data.items():
+            current = self._read(key)
+            if current is not None and current.fetched_at >= item['fetched_at']:
+                with self._lock:
+                    self._keys.add(key)
+                continue
+            self._write(key, NewsCacheEntry.from_dict(item))
+        logger.info(f"已從快照還原 {len(data)} 筆文章快取")
+
+
+# 全域共用的文章快取
+news_cache = NewsCache()
@@ -4,24 +4,40 @@
 """
 
 import logging
-from typing import List, Dict
+import os
+from typing import Optional
 from urllib.parse import urljoin
 
-import httpx
 from selectolax.parser import HTMLParser
 
+from src.scrapers.fetcher import fetch_page
+from src.scrapers.models import Article, ArticleList
+from src.scrapers.parse_cache import parse_cache
+from src.scrapers.registry import ScraperSource, register_source
+from src.scrapers.retry_policy import RetryPolicy
+
 # 設定常數
 AIVI_BASE_URL = "https://www.aivi.fyi"
 AIVI_HOMEPAGE_URL = "https://www.aivi.fyi/"
-REQUEST_TIMEOUT = 5  # 秒
+REQUEST_TIMEOUT = 5  # 秒（讀取 timeout）
+CONNECT_TIMEOUT = 3  # 秒（連線 timeout）
 MAX_RETRIES = 2
 CSS_SELECTOR = "h2.archive__item-title > a"
+AIVI_SOURCE_NAME = "aivi"
+AIVI_FRESHNESS_TTL = float(os.getenv('AIVI_FRESHNESS_TTL', 300))  # 秒
+
+# 預設重試策略
+DEFAULT_RETRY_POLICY = RetryPolicy(
+    max_retries=MAX_RETRIES,
+    connect_timeout=CONNECT_TIMEOUT,
+    read_timeout=REQUEST_TIMEOUT,
+)
 
 # 設定日誌記錄器
 logger = logging.getLogger(__name__)
 
 
-def parse_articles(html: str, max_articles: int = 5) -> List[Dict[str, str]]:
+def parse_articles(html: str, max_articles: int = 5) -> ArticleList:
     """解析 AIVI 首頁 HTML，提取文章資訊
 
     參數：
@@ -29,12 +45,12 @@ def parse_articles(html: str, max_articles: int = 5) -> List[Dict[str, str]]:
         max_articles: 最多返回幾則文章（預設 5）
 
     返回：
-        文章清單，每個元素包含 title 和 url
+        文章清單（ArticleList）
 
     範例：
         >>> html = '<h2 class="archive__item-title"><a href="/llms/test">測試</a></h2>'
         >>> parse_articles(html, max_articles=1)
-        [{'title': '測試', 'url': 'https://www.aivi.fyi/llms/test'}]
+        ArticleList([Article(title='測試', url='https://www.aivi.fyi/llms/test')])
     """
     try:
         tree = HTMLParser(html)
@@ -42,7 +58,7 @@ def parse_articles(html: str, max_articles: int = 5) -> List[Dict[str, str]]:
 
         if not article_links:
             logger.warning("找不到文章連結，HTML 結構可能已變更")
-            return []
+            return ArticleList()
 
         articles = []
         for link in article_links[:max_articles]:
@@ -56,32 +72,33 @@ def parse_articles(html: str, max_articles: int = 5) -> List[Dict[str, str]]:
             # 處理相對路徑，加上 base URL
             absolute_url = urljoin(AIVI_BASE_URL, relative_url)
 
-            articles.append({
-                "title": title,
-                "url": absolute_url
-            })
+            articles.append(Article(title=title, url=absolute_url))
 
         logger.info(f"成功解析 {len(articles)} 則文章")
-        return articles
+        return ArticleList(articles)
 
     except Exception as e:
         logger.error(f"解析 HTML 時發生錯誤：{e}")
         logger.warning("HTML 結構可能已變更")
-        return []
+        return ArticleList()
 
 
-async def scrape_aivi_news(max_articles: int = 5) -> List[Dict[str, str]]:
+async def scrape_aivi_news(
+    max_articles: int = 5,
+    policy: Optional[RetryPolicy] = None
+) -> ArticleList:
     """爬取 AIVI 最新文章
 
+    透過 fetch_page 抓取首頁（含重試、條件式請求與 hedged request），
+    再以 parse_articles 解析；首頁內容與上次相同時沿用先前的解析結果，
+    大型頁面交給解析子程序（見 parse_pool）。
+
     參數：
         max_articles: 最多返回幾則文章（預設 5）
+        policy: 重試策略（預設使用 DEFAULT_RETRY_POLICY）
 
     返回：
-        文章清單，每個元素包含 title 和 url
-
-    異常：
-        httpx.TimeoutException: 請求超時
-        httpx.HTTPError: HTTP 錯誤
+        文章清單（ArticleList）；抓取失敗時返回空清單
 
     範例：
         >>> import asyncio
@@ -89,40 +106,17 @@ async def scrape_aivi_news(max_articles: int = 5) -> List[Dict[str, str]]:
         >>> len(articles) <= 3
         True
     """
-    retry_count = 0
-
-    while retry_count <= MAX_RETRIES:
-        try:
-            async with httpx.AsyncClient() as client:
-                logger.info(f"正在爬取 AIVI 首頁... (嘗試 {retry_count + 1}/{MAX_RETRIES + 1})")
-                response = await client.get(
-                    AIVI_HOMEPAGE_URL,
-                    timeout=REQUEST_TIMEOUT,
-                    follow_redirects=True
-                )
-                response.raise_for_status()
-
-                logger.info(f"成功取得 AIVI 首頁 (HTTP {response.status_code})")
-                return parse_articles(response.text, max_articles)
-
-        except httpx.TimeoutException as e:
-            retry_count += 1
-            logger.warning(f"請求超時 (嘗試 {retry_count}/{MAX_RETRIES + 1})：{e}")
-
-            if retry_count > MAX_RETRIES:
-                logger.error(f"已達最大重試次數 ({MAX_RETRIES})，放棄爬取")
-                return []
-
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP 錯誤 (狀態碼 {e.response.status_code})：{e}")
-            return []
-
-        except httpx.HTTPError as e:
-            logger.error(f"HTTP 請求失敗：{e}")
-            return []
-
-        except Exception as e:
-            logger.error(f"爬取時發生未預期的錯誤：{e}")
-            return []
-
-    return []
+    html = await fetch_page(AIVI_HOMEPAGE_URL, policy or DEFAULT_RETRY_POLICY, raw=True)
+    if html is None:
+        return ArticleList()
+    return await parse_cache.get_or_parse_async(AIVI_SOURCE_NAME, html, max_articles, parse_articles)
+
+
+# 註冊為爬蟲來源
+register_source(ScraperSource(
+    name=AIVI_SOURCE_NAME,
+    url=AIVI_HOMEPAGE_URL,
+    parser=parse_articles,
+    freshness_ttl=AIVI_FRESHNESS_TTL,
+    policy=DEFAULT_RETRY_POLICY,
+))
@@ -0,0 +1,205 @@
+"""文章內容補充（enrichment）
+
+為文章清單補上發布日期、摘要與縮圖（og:image）。每篇文章的內頁
+在背景並行抓取（以 semaphore 限制同時請求數），結果依 URL 永久快取，
+因為已發布的文章幾乎不會變動。
+
+補充資料絕不阻塞回覆：apply() 只讀取快取，尚未補充的文章維持
+標題 + 連結，缺少的部分由 schedule() 交給背景事件迴圈處理。
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from selectolax.parser import HTMLParser
+
+from src.scrapers.fetcher import fetch_page
+from src.scrapers.models import Article, ArticleList, truncate_excerpt
+from src.scrapers.retry_policy import RetryPolicy
+from src.utils.background import run_in_background
+from src.utils.memory_budget import deep_sizeof
+
+# 設定常數
+ENRICHMENT_ENABLED = os.getenv('ARTICLE_ENRICHMENT', '0').lower() in ('1', 'true', 'yes')
+ENRICHMENT_CONCURRENCY = int(os.getenv('ARTICLE_ENRICHMENT_CONCURRENCY', 4))
+ENRICHMENT_CACHE_SIZE = int(os.getenv('ARTICLE_ENRICHMENT_CACHE_SIZE', 500))  # 最多保留幾篇文章的補充資料
+
+# 內頁請求不重試太多次，避免背景工作佔用過久
+ENRICHMENT_RETRY_POLICY = RetryPolicy(max_retries=1)
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+def _meta_content(tree: HTMLParser, selector: str) -> str:
+    node = tree.css_first(selector)
+    if node is None:
+        return ''
+    return (node.attributes.get('content') or node.attributes.get('datetime') or '').strip()
+
+
+def extract_metadata(html: str) -> Dict[str, str]:
+    """從文章內頁擷取發布日期、摘要與縮圖
+
+    參數：
+        html: 文章內頁 HTML
+
+    返回：
+        包含 date、excerpt、image 的字典（找不到的欄位不會出現）
+
+    範例：
+        >>> html = '''
+        ... <meta property="article:published_time" content="2024-05-01T10:00:00+08:00">
+        ... <meta property="og:description" content="文章摘要">
+        ... <meta property="og:image" content="https://www.aivi.fyi/cover.png">
+        ... '''
+        >>> extract_metadata(html)
+        {'date': '2024-05-01T10:00:00+08:00', 'excerpt': '文章摘要', 'image': 'https://www.aivi.fyi/cover.png'}
+    """
+    try:
+        tree = HTMLParser(html)
+    except Exception as e:
+        logger.error(f"解析文章內頁時發生錯誤：{e}")
+        return {}
+
+    date = (
+        _meta_content(tree, 'meta[property="article:published_time"]')
+        or _meta_content(tree, '[itemprop="datePublished"]')
+        or _meta_content(tree, 'time[datetime]')
+    )
+
+    excerpt = (
+        _meta_content(tree, 'meta[property="og:description"]')
+        or _meta_content(tree, 'meta[name="description"]')
+    )
+    if not excerpt:
+        paragraph = tree.css_first('article p') or tree.css_first('p')
+        excerpt = paragraph.text(strip=True) if paragraph is not None else ''
+    excerpt = truncate_excerpt(excerpt)
+
+    image = _meta_content(tree, 'meta[property="og:image"]')
+
+    metadata = {'date': date, 'excerpt': excerpt, 'image': image}
+    return {key: value for key, value in metadata.items() if value}
+
+
+class ArticleEnricher:
+    """依 URL 快取的文章補充器
+
+    參數：
+        concurrency: 同時抓取的內頁數量上限
+        policy: 內頁請求的重試策略
+        max_entries: 最多保留幾篇文章的補充資料（超過時淘汰最早補充的）
+
+    範例：
+        >>> enricher = ArticleEnricher()
+        >>> articles = ArticleList([Article('T', 'https://www.aivi.fyi/t')])
+        >>> enricher.apply(articles) == articles
+        True
+        >>> enricher.missing(articles)
+        ['https://www.aivi.fyi/t']
+    """
+
+    def __init__(self, concurrency: int = ENRICHMENT_CONCURRENCY,
+                 policy: RetryPolicy = ENRICHMENT_RETRY_POLICY,
+                 max_entries: int = ENRICHMENT_CACHE_SIZE):
+        self.concurrency = concurrency
+        self.policy = policy
+        self.max_entries = max_entries
+        self._cache: Dict[str, Dict[str, str]] = {}
+        self._pending: set = set()
+        self._lock = threading.Lock()
+
+    def apply(self, articles: Iterable[Article]) -> ArticleList:
+        """以快取中的資料補充文章（不進行任何網路請求）"""
+        with self._lock:
+            return ArticleList(
+                article.with_metadata(self._cache[article.url]) if article.url in self._cache else article
+                for article in articles
+            )
+
+    def missing(self, articles: Iterable[Article]) -> List[str]:
+        """返回尚未補充、也沒有正在處理中的文章 URL"""
+        with self._lock:
+            return [
+                article.url for article in articles
+                if article.url
+                and article.url not in self._cache
+                and article.url not in self._pending
+            ]
+
+    def schedule(self, articles: Iterable[Article]) -> None:
+        """將缺少補充資料的文章交給背景事件迴圈處理（不等待結果）"""
+        urls = self.missing(articles)
+        if not urls:
+            return
+        with self._lock:
+            self._pending.update(urls)
+        logger.info(f"排程補充 {len(urls)} 篇文章的內容")
+        run_in_background(self.enrich_urls(urls))
+
+    async def enrich_urls(self, urls: List[str]) -> None:
+        """並行抓取文章內頁並寫入快取"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def enrich(url: str) -> None:
+            try:
+                async with semaphore:
+                    html = await fetch_page(url, self.policy, conditional=False)
+                if html is None:
+                    return
+                metadata = extract_metadata(html)
+                with self._lock:
+                    self._store(url, metadata)
+            finally:
+                with self._lock:
+                    self._pending.discard(url)
+
+        await asyncio.gather(*(enrich(url) for url in urls), return_exceptions=True)
+
+    def _store(self, url: str, metadata: Dict[str, str]) -> None:
+        """寫入補充資料，超過上限時淘汰最早寫入的（呼叫端需持有鎖）"""
+        self._cache.pop(url, None)
+        self._cache[url] = metadata
+        while len(self._cache) > self.max_entries:
+            del self._cache[next(iter(self._cache))]
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        """取得指定 URL 的補充資料"""
+        with self._lock:
+            return self._cache.get(url)
+
+    def clear(self) -> None:
+        """清除快取"""
+        with self._lock:
+            self._cache.clear()
+            self._pending.clear()
+
+    def size_bytes(self) -> int:
+        """估算補充資料佔用的記憶體"""
+        with self._lock:
+            return deep_sizeof(self._cache)
+
+    def evict(self) -> None:
+        """釋放補充資料（不影響處理中的工作，供記憶體預算使用）"""
+        with self._lock:
+            self._cache.clear()
+
+    def dump(self) -> Dict[str, Any]:
+        """匯出快取（供快照使用）"""
+        with self._lock:
+            return {url: dict(metadata) for url, metadata in self._cache.items()}
+
+    def load(self, data: Dict[str, Any]) -> None:
+        """從快照還原快取"""
+        with self._lock:
+            for url, metadata in data.items():
+                if url not in self._cache:
+                    self._store(url, dict(metadata))
+
+
+# 全域共用的文章補充器
+article_enricher = ArticleEnricher()
@@ -0,0 +1,152 @@
+"""RSS / Atom feed 爬蟲模組
+
+AIVI 是 Jekyll 架構的靜態網站，會發布 Atom feed（jekyll-feed 預設為
+/feed.xml）。相較於解析整個主題化的首頁，feed 較小、結構穩定，
+而且直接帶有發布日期與摘要，不需要另外抓取文章內頁。
+
+parse_feed 以 XMLPullParser 分段餵入內容，取得 N 篇文章後立即停止，
+不必解析整份文件。feed 無法取得時，由註冊表改用 HTML 首頁來源（fallback）。
+"""
+
+import html
+import logging
+import os
+import re
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+from src.scrapers.aivi_scraper import AIVI_FRESHNESS_TTL, AIVI_SOURCE_NAME, DEFAULT_RETRY_POLICY
+from src.scrapers.models import Article, ArticleList, truncate_excerpt
+from src.scrapers.registry import ScraperSource, register_source
+
+# 設定常數
+AIVI_FEED_URL = os.getenv('AIVI_FEED_URL', 'https://www.aivi.fyi/feed.xml')
+AIVI_FEED_SOURCE_NAME = "aivi_feed"
+FEED_CHUNK_SIZE = 8192  # 每次餵給 parser 的字元數
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+_ENTRY_TAGS = ('entry', 'item')
+_FEED_ROOT_TAGS = ('feed', 'rss', 'RDF')
+
+
+def _local_name(tag: str) -> str:
+    """去除 XML namespace，例如 {http://www.w3.org/2005/Atom}entry -> entry"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _normalize_date(value: str) -> Optional[str]:
+    """將 RSS 的 RFC 822 日期轉為 ISO 8601；Atom 已是 ISO 8601，直接使用"""
+    value = value.strip()
+    if not value:
+        return None
+    if value[:4].isdigit():
+        return value
+    try:
+        return parsedate_to_datetime(value).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def _excerpt(value: str) -> Optional[str]:
+    """去除 HTML 標籤並截斷摘要"""
+    text = ' '.join(html.unescape(_TAG_PATTERN.sub(' ', value)).split())
+    if not text:
+        return None
+    return truncate_excerpt(text)
+
+
+def _entry_to_article(entry: Element) -> Optional[Article]:
+    """將 Atom <entry> 或 RSS <item> 轉為 Article"""
+    fields: Dict[str, str] = {}
+    for child in entry:
+        name = _local_name(child.tag)
+        if name == 'link':
+            # Atom：<link rel="alternate" href="..."/>；RSS：<link>...</link>
+            href = child.get('href')
+            if href and child.get('rel', 'alternate') == 'alternate':
+                fields.setdefault('url', href.strip())
+            elif child.text and child.text.strip():
+                fields.setdefault('url', child.text.strip())
+        elif name in ('title', 'published', 'updated', 'pubDate', 'summary', 'description', 'content'):
+            fields.setdefault(name, ''.join(child.itertext()))
+
+    title = ' '.join(fields.get('title', '').split())
+    url = fields.get('url', '')
+    if not title or not url:
+        logger.warning(f"feed 項目資訊不完整：title={title}, url={url}")
+        return None
+
+    date = _normalize_date(fields.get('published') or fields.get('pubDate') or fields.get('updated') or '')
+    summary = fields.get('summary') or fields.get('description') or fields.get('content') or ''
+    return Article(title=title, url=url, date=date, excerpt=_excerpt(summary))
+
+
+def parse_feed(xml: str, max_articles: int = 5) -> ArticleList:
+    """串流解析 RSS / Atom feed，取得 max_articles 篇文章後即停止
+
+    參數：
+        xml: feed 內容
+        max_articles: 最多返回幾則文章
+
+    返回：
+        文章清單（ArticleList），包含發布日期與摘要；解析失敗時返回空清單
+
+    範例：
+        >>> feed = '''<feed xmlns="http://www.w3.org/2005/Atom"><entry>
+        ...   <title>測試</title><link href="https://www.aivi.fyi/test" rel="alternate"/>
+        ...   <published>2024-05-01T10:00:00+08:00</published><summary>摘要</summary>
+        ... </entry></feed>'''
+        >>> parse_feed(feed)
+        ArticleList([Article(title='測試', url='https://www.aivi.fyi/test', date='2024-05-01T10:00:00+08:00', excerpt='摘要')])
+    """
+    parser = XMLPullParser(events=('start', 'end'))
+    articles = []
+    root: Optional[Element] = None
+    try:
+        for offset in range(0, len(xml), FEED_CHUNK_SIZE):
+            parser.feed(xml[offset:offset + FEED_CHUNK_SIZE])
+            for event, element in parser.read_events():
+                if event == 'start':
+                    if root is None:
+                        # 收集項目前先確認根元素，不是 feed 的 XML 不論含有幾個 <item> 都不接受
+                        root = element
+                        if _local_name(root.tag) not in _FEED_ROOT_TAGS:
+                            logger.warning("內容不是 RSS / Atom feed")
+                            return ArticleList()
+                    continue
+                if _local_name(element.tag) not in _ENTRY_TAGS:
+                    continue
+                article = _entry_to_article(element)
+                if article is not None:
+                    articles.append(article)
+                # 已處理的項目不再需要，釋放記憶體
+                element.clear()
+                if len(articles) >= max_articles:
+                    return ArticleList(articles)
+        parser.close()
+    except ParseError as e:
+        logger.error(f"解析 feed 時發生錯誤：{e}")
+        if not articles:
+            return ArticleList()
+
+    if root is None:
+        logger.warning("內容不是 RSS / Atom feed")
+        return ArticleList()
+
+    logger.info(f"成功解析 feed 中的 {len(articles)} 則文章")
+    return ArticleList(articles)
+
+
+# 註冊為爬蟲來源；feed 無法取得或沒有文章時改用 HTML 首頁
+register_source(ScraperSource(
+    name=AIVI_FEED_SOURCE_NAME,
+    url=AIVI_FEED_URL,
+    parser=parse_feed,
+    freshness_ttl=AIVI_FRESHNESS_TTL,
+    policy=DEFAULT_RETRY_POLICY,
+    fallback=AIVI_SOURCE_NAME,
+))
@@ -0,0 +1,261 @@
+"""HTTP 頁面抓取
+
+所有爬蟲來源共用的抓取邏輯：依照重試策略重試、條件式請求（ETag /
+Last-Modified）以及 hedged request。每個 URL 各自記錄請求延遲。
+"""
+
+import asyncio
+import codecs
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+
+import httpx
+
+from src.scrapers.retry_policy import LatencyTracker, RetryPolicy
+from src.utils.corpus import corpus_recorder
+from src.utils.memory_budget import deep_sizeof
+
+# 預設重試策略
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+# 每個 URL 的請求延遲，供 hedged request 估算 p95
+_latency_trackers: Dict[str, LatencyTracker] = {}
+_latency_lock = threading.Lock()
+
+# 條件式請求快取：URL -> {etag, last_modified, body}（body 為 str 或 UTF-8 bytes）
+_http_cache: Dict[str, Dict[str, Any]] = {}
+_http_cache_lock = threading.Lock()
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+def _get_latency_tracker(url: str) -> LatencyTracker:
+    """取得指定 URL 的延遲記錄器"""
+    with _latency_lock:
+        tracker = _latency_trackers.get(url)
+        if tracker is None:
+            tracker = _latency_trackers[url] = LatencyTracker()
+        return tracker
+
+
+def reset_latency_trackers() -> None:
+    """清除所有延遲記錄"""
+    with _latency_lock:
+        _latency_trackers.clear()
+
+
+def _conditional_headers(url: str) -> Dict[str, str]:
+    """依照上次回應的 validators 建立條件式請求 header"""
+    with _http_cache_lock:
+        cached = _http_cache.get(url)
+    if not cached:
+        return {}
+
+    headers = {}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+    return headers
+
+
+def _body_bytes(response: httpx.Response) -> bytes:
+    """以 UTF-8 bytes 取得回應內容；內容本身就是 UTF-8 時直接使用原始 bytes，不經過解碼"""
+    if codecs.lookup(response.encoding or 'utf-8').name in ('utf-8', 'ascii'):
+        return response.content
+    return response.text.encode('utf-8')
+
+
+def _as_text(body: Union[str, bytes]) -> str:
+    return body if isinstance(body, str) else body.decode('utf-8', 'replace')
+
+
+def _as_bytes(body: Union[str, bytes]) -> bytes:
+    return body if isinstance(body, bytes) else body.encode('utf-8', 'surrogatepass')
+
+
+def _remember_validators(url: str, response: httpx.Response, body: Union[str, bytes]) -> None:
+    """保存回應的 ETag / Last-Modified 與內容，供下次條件式請求使用"""
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if not isinstance(etag, str) and not isinstance(last_modified, str):
+        return
+
+    with _http_cache_lock:
+        _http_cache[url] = {
+            'etag': etag if isinstance(etag, str) else '',
+            'last_modified': last_modified if isinstance(last_modified, str) else '',
+            'body': body,
+        }
+
+
+def _cached_body(url: str) -> Optional[Union[str, bytes]]:
+    """取得條件式請求快取中的內容（收到 304 時使用）"""
+    with _http_cache_lock:
+        cached = _http_cache.get(url)
+    return cached['body'] if cached else None
+
+
+def export_http_cache() -> Dict[str, Any]:
+    """匯出條件式請求快取（供快照使用；bytes 內容轉為字串才能寫入 JSON）"""
+    with _http_cache_lock:
+        items = {url: dict(item) for url, item in _http_cache.items()}
+    for item in items.values():
+        item['body'] = _as_text(item['body'])
+    return items
+
+
+def import_http_cache(data: Dict[str, Any]) -> None:
+    """從快照還原條件式請求快取"""
+    with _http_cache_lock:
+        for url, item in data.items():
+            _http_cache.setdefault(url, dict(item))
+
+
+def http_cache_size_bytes() -> int:
+    """估算條件式請求快取佔用的記憶體"""
+    with _http_cache_lock:
+        return deep_sizeof(_http_cache)
+
+
+def reset_http_cache() -> None:
+    """清除條件式請求快取"""
+    with _http_cache_lock:
+        _http_cache.clear()
+
+
+async def _timed_get(client: httpx.AsyncClient, url: str, policy: RetryPolicy,
+                     conditional: bool = True) -> httpx.Response:
+    """送出 GET 請求並記錄延遲"""
+    started = time.perf_counter()
+    response = await client.get(
+        url,
+        headers=_conditional_headers(url) if conditional else {},
+        timeout=policy.timeout(),
+        follow_redirects=True
+    )
+    if conditional:
+        _get_latency_tracker(url).record(time.perf_counter() - started)
+    return response
+
+
+async def _get_with_hedge(client: httpx.AsyncClient, url: str, policy: RetryPolicy,
+                          conditional: bool = True) -> httpx.Response:
+    """送出 GET 請求，必要時送出 hedged request
+
+    若策略啟用 hedge 且已有足夠的延遲樣本，第一個請求超過 p95 延遲仍未完成時，
+    會再送出第二個請求，採用最先成功的回應並取消另一個。
+    """
+    threshold = None
+    if policy.hedge and conditional:
+        threshold = _get_latency_tracker(url).quantile(policy.hedge_quantile, policy.hedge_min_samples)
+
+    first = asyncio.ensure_future(_timed_get(client, url, policy, conditional))
+    if threshold is None:
+        return await first
+
+    done, _ = await asyncio.wait({first}, timeout=threshold)
+    if done:
+        return first.result()
+
+    logger.info(f"請求超過 p{int(policy.hedge_quantile * 100)} 延遲 ({threshold:.2f} 秒)，送出 hedged request")
+    pending = {first, asyncio.ensure_future(_timed_get(client, url, policy, conditional))}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return task.result()
+            error = task.exception()
+    raise error
+
+
+async def fetch_page(url: str, policy: Optional[RetryPolicy] = None,
+                     conditional: bool = True, raw: bool = False) -> Optional[Union[str, bytes]]:
+    """抓取頁面內容
+
+    請求失敗時依照重試策略處理：timeout、連線錯誤與 5xx/429 狀態碼會以
+    指數退避（full jitter）重試，並遵守 Retry-After header。
+    若上次回應帶有 ETag / Last-Modified，會送出條件式請求，收到 304 時沿用上次內容。
+
+    參數：
+        url: 頁面網址
+        policy: 重試策略（預設使用 DEFAULT_RETRY_POLICY）
+        conditional: 是否使用條件式請求並記錄延遲；只抓一次的大量頁面（例如文章內頁）
+            應關閉，避免保存每個頁面的內容與延遲樣本
+        raw: 返回 UTF-8 bytes 而不是字串；交給 parse_pool 解析的頁面使用，
+            原程序不必先解碼再編碼，只在解析時解碼一次
+
+    返回：
+        頁面內容（raw 時為 bytes）；失敗時返回 None
+    """
+    policy = policy or DEFAULT_RETRY_POLICY
+    attempt = 0
+
+    while attempt <= policy.max_retries:
+        delay = None
+        try:
+            async with httpx.AsyncClient() as client:
+                logger.info(f"正在抓取 {url}... (嘗試 {attempt + 1}/{policy.max_retries + 1})")
+                response = await _get_with_hedge(client, url, policy, conditional)
+
+                if policy.should_retry_status(response.status_code) and attempt < policy.max_retries:
+                    delay = policy.retry_after_delay(response)
+                    if delay is None:
+                        delay = policy.backoff_delay(attempt)
+                    logger.warning(
+                        f"HTTP {response.status_code}，{delay:.2f} 秒後重試 "
+                        f"(嘗試 {attempt + 1}/{policy.max_retries + 1})"
+                    )
+                elif response.status_code == 304 and _cached_body(url) is not None:
+                    logger.info(f"{url} 未變更 (HTTP 304)，使用快取內容")
+                    body = _cached_body(url)
+                    return _as_bytes(body) if raw else _as_text(body)
+                else:
+                    response.raise_for_status()
+
+                    logger.info(f"成功取得 {url} (HTTP {response.status_code})")
+                    body = _body_bytes(response) if raw else response.text
+                    if conditional:
+                        _remember_validators(url, response, body)
+                    if corpus_recorder.enabled:
+                        corpus_recorder.record_page(url, _as_text(body))
+                    return body
+
+        except httpx.TimeoutException as e:
+            logger.warning(f"請求超時 (嘗試 {attempt + 1}/{policy.max_retries + 1})：{e}")
+
+            if attempt >= policy.max_retries:
+                logger.error(f"已達最大重試次數 ({policy.max_retries})，放棄爬取")
+                return None
+            delay = policy.backoff_delay(attempt)
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP 錯誤 (狀態碼 {e.response.status_code})：{e}")
+            return None
+
+        except httpx.TransportError as e:
+            logger.warning(f"連線失敗 (嘗試 {attempt + 1}/{policy.max_retries + 1})：{e}")
+
+            if attempt >= policy.max_retries:
+                logger.error(f"已達最大重試次數 ({policy.max_retries})，放棄爬取")
+                return None
+            delay = policy.backoff_delay(attempt)
+
+        except httpx.HTTPError as e:
+            logger.error(f"HTTP 請求失敗：{e}")
+            return None
+
+        except Exception as e:
+            logger.error(f"爬取時發生未預期的錯誤：{e}")
+            return None
+
+        attempt += 1
+        await asyncio.sleep(delay)
+
+    return None
@@ -0,0 +1,151 @@
+"""文章資料型別
+
+Article 是不可變、使用 __slots__ 的文章記錄，取代原本以字串 key 存取的 dict；
+ArticleList 是以 tuple 為底的不可變文章清單，建立時預先計算內容指紋
+（fingerprint），比較是否變動或作為快取 key 時不必逐篇比對。
+"""
+
+import hashlib
+from dataclasses import dataclass, fields, replace
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+# 補充（enrichment）欄位
+ENRICHMENT_FIELDS = ('date', 'excerpt', 'image')
+# 摘要的最大字數（feed 解析與文章補充共用）
+EXCERPT_MAX_LENGTH = 80
+
+# 計算指紋時的分隔字元（不會出現在標題或網址中）
+_FIELD_SEPARATOR = '\x1f'
+_RECORD_SEPARATOR = '\x1e'
+
+
+def truncate_excerpt(text: str) -> str:
+    """截斷超過 EXCERPT_MAX_LENGTH 的摘要並加上省略號
+
+    範例：
+        >>> truncate_excerpt('短摘要')
+        '短摘要'
+        >>> len(truncate_excerpt('x' * 200))
+        81
+    """
+    if len(text) > EXCERPT_MAX_LENGTH:
+        return text[:EXCERPT_MAX_LENGTH].rstrip() + '…'
+    return text
+
+
+@dataclass(frozen=True, slots=True)
+class Article:
+    """單篇文章
+
+    屬性：
+        title: 標題
+        url: 文章網址（絕對路徑）
+        date: 發布日期（ISO 8601，補充欄位）
+        excerpt: 摘要（補充欄位）
+        image: 縮圖網址（補充欄位）
+
+    範例：
+        >>> article = Article('測試', 'https://www.aivi.fyi/test')
+        >>> article
+        Article(title='測試', url='https://www.aivi.fyi/test')
+        >>> article.with_metadata({'date': '2024-05-01'}).to_dict()
+        {'title': '測試', 'url': 'https://www.aivi.fyi/test', 'date': '2024-05-01'}
+    """
+
+    title: str
+    url: str
+    date: Optional[str] = None
+    excerpt: Optional[str] = None
+    image: Optional[str] = None
+
+    def __repr__(self) -> str:
+        # 只顯示有值的欄位，讓日誌與 doctest 保持簡短
+        parts = [f"{name}={value!r}" for name, value in self._items()]
+        return f"Article({', '.join(parts)})"
+
+    def _items(self):
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if value is not None:
+                yield field.name, value
+
+    def with_metadata(self, metadata: Mapping[str, str]) -> 'Article':
+        """返回加上補充欄位的新文章（未提供的欄位維持原值）"""
+        updates = {key: metadata[key] for key in ENRICHMENT_FIELDS if metadata.get(key)}
+        return replace(self, **updates) if updates else self
+
+    def to_dict(self) -> Dict[str, str]:
+        """轉為 dict（省略沒有值的欄位），供 JSON 序列化"""
+        return dict(self._items())
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'Article':
+        """從 to_dict() 的資料還原（忽略不認得的欄位）"""
+        return cls(
+            title=data['title'],
+            url=data['url'],
+            **{key: data[key] for key in ENRICHMENT_FIELDS if data.get(key)},
+        )
+
+
+class ArticleList(tuple):
+    """不可變的文章清單，附帶預先計算的內容指紋
+
+    範例：
+        >>> a = ArticleList([Article('A', 'https://x/a')])
+        >>> b = ArticleList.from_dicts([{'title': 'A', 'url': 'https://x/a'}])
+        >>> a == b, a.fingerprint == b.fingerprint
+        (True, True)
+        >>> ArticleList().fingerprint == a.fingerprint
+        False
+    """
+
+    def __new__(cls, articles: Iterable[Article] = ()):
+        instance = super().__new__(cls, articles)
+        digest = hashlib.blake2b(digest_size=16)
+        for article in instance:
+            digest.update(_FIELD_SEPARATOR.join(
+                getattr(article, field.name) or '' for field in fields(Article)
+            ).encode('utf-8'))
+            digest.update(_RECORD_SEPARATOR.encode('utf-8'))
+        instance._fingerprint = digest.hexdigest()
+        return instance
+
+    @property
+    def fingerprint(self) -> str:
+        """內容指紋（blake2b hex），內容相同的清單指紋相同"""
+        return self._fingerprint
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ArticleList) and other._fingerprint != self._fingerprint:
+            return False
+        if isinstance(other, list):
+            # 與原本的 list 回傳值相容，例如 `articles == []`
+            other = tuple(other)
+        return super().__eq__(other)
+
+    def __ne__(self, other: object) -> bool:
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self) -> int:
+        return hash(self._fingerprint)
+
+    def __getitem__(self, index):
+        result = super().__getitem__(index)
+        return ArticleList(result) if isinstance(index, slice) else result
+
+    def __add__(self, other):
+        return ArticleList(tuple(self) + tuple(other))
+
+    def __repr__(self) -> str:
+        return f"ArticleList({list(self)!r})"
+
+    def to_dicts(self) -> list:
+        """轉為 dict 清單，供 JSON 序列化"""
+        return [article.to_dict() for article in self]
+
+    @classmethod
+    def from_dicts(cls, data: Iterable[Mapping[str, Any]]) -> 'ArticleList':
+        """從 to_dicts() 的資料還原"""
+        return cls(Article.from_dict(item) for item in data)
@@ -0,0 +1,142 @@
+"""以內容雜湊快取解析結果
+
+來源網站或 CDN 不支援 ETag / Last-Modified 時，每次都會收到完整的頁面；
+若內容與上次相同，就沒有必要再建立一次 selectolax 樹與執行 CSS 查詢。
+ParseCache 以頁面內容的 blake2b 雜湊為 key，保存最近的解析結果（LRU）。
+解析結果是不可變的 ArticleList，可以安全地在多次請求之間共用。
+非同步的 get_or_parse_async 未命中時交給 parse_pool，大型文件在子程序中解析。
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from src.scrapers.models import ArticleList
+from src.scrapers.parse_pool import parse_pool
+from src.utils.memory_budget import deep_sizeof
+
+# 設定常數
+PARSE_CACHE_SIZE = int(os.getenv('PARSE_CACHE_SIZE', 32))
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+def content_digest(html: Union[str, bytes]) -> bytes:
+    """頁面內容的雜湊值（bytes 直接計算，不需要先編碼）
+
+    範例：
+        >>> content_digest('<html>A</html>') == content_digest(b'<html>A</html>')
+        True
+    """
+    data = html if isinstance(html, bytes) else html.encode('utf-8', 'surrogatepass')
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class ParseCache:
+    """內容雜湊 → 解析結果的 LRU 快取
+
+    參數：
+        max_entries: 最多保留幾筆解析結果
+
+    範例：
+        >>> from src.scrapers.models import Article
+        >>> cache = ParseCache(max_entries=4)
+        >>> parse = lambda html, n: ArticleList([Article('A', 'https://x/a')])
+        >>> first = cache.get_or_parse('aivi', '<html>A</html>', 5, parse)
+        >>> cache.get_or_parse('aivi', '<html>A</html>', 5, parse) is first
+        True
+        >>> cache.stats()['hits'], cache.stats()['misses']
+        (1, 1)
+    """
+
+    def __init__(self, max_entries: int = PARSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int, bytes], ArticleList]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _lookup(self, key: Tuple[str, int, bytes]) -> Optional[ArticleList]:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return cached
+            self._misses += 1
+            return None
+
+    def _store(self, key: Tuple[str, int, bytes], articles: ArticleList) -> ArticleList:
+        if not articles:
+            # 空結果可能是暫時的解析失敗，不快取
+            return articles
+        with self._lock:
+            self._entries[key] = articles
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return articles
+
+    def get_or_parse(self, namespace: str, html: str, max_articles: int,
+                     parser: Callable[[str, int], ArticleList]) -> ArticleList:
+        """內容與先前相同時返回快取的結果，否則解析並寫入快取
+
+        參數：
+            namespace: 來源名稱（不同來源的解析方式不同，結果不能共用）
+            html: 頁面內容
+            max_articles: 最多返回幾則文章
+            parser: 解析函式 (html, max_articles) -> ArticleList
+        """
+        key = (namespace, max_articles, content_digest(html))
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        return self._store(key, parser(html, max_articles))
+
+    async def get_or_parse_async(self, namespace: str, html: Union[str, bytes], max_articles: int,
+                                 parser: Callable[[str, int], ArticleList]) -> ArticleList:
+        """同 get_or_parse，但未命中時交給 parse_pool 解析（大型文件不阻塞事件迴圈）
+
+        html 可以是 fetch_page(raw=True) 返回的 UTF-8 bytes：雜湊直接以 bytes 計算，
+        只在解析時解碼一次。
+        """
+        key = (namespace, max_articles, content_digest(html))
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        return self._store(key, await parse_pool.parse(parser, html, max_articles))
+
+    def stats(self) -> Dict[str, float]:
+        """快取統計：命中（hits）、未命中（misses）、命中率與目前筆數"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 4) if total else 0.0,
+                'size': len(self._entries),
+            }
+
+    def size_bytes(self) -> int:
+        """估算快取中解析結果佔用的記憶體"""
+        with self._lock:
+            return deep_sizeof(self._entries)
+
+    def evict(self) -> None:
+        """釋放所有解析結果（保留統計，供記憶體預算使用）"""
+        with self._lock:
+            self._entries.clear()
+
+    def clear(self) -> None:
+        """清除快取與統計"""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+
+# 全域共用的解析結果快取
+parse_cache = ParseCache()
@@ -0,0 +1,172 @@
+"""大型文件的多程序解析
+
+解析 HTML / XML 是 CPU 密集的工作，而且會持有 GIL：在事件迴圈中直接解析
+大型頁面（或同時爬取多個封存頁面）時，其他請求都會被卡住。
+ParsePool 將超過大小門檻的文件交給 ProcessPoolExecutor 解析；
+文件以 UTF-8 bytes 傳給子程序（fetch_page(raw=True) 的原始內容直接傳遞，
+只在子程序中解碼一次），小文件仍在原程序解析，避免程序間傳輸的額外成本。
+子程序異常終止（BrokenProcessPool）或解析函式無法 pickle 時重建子程序；
+解析函式本身拋出的例外不影響子程序，改在原程序重新解析。
+
+子程序以 forkserver（不支援時為 spawn）建立，不會 fork 含有多個執行緒的
+Flask 程序；服務啟動時呼叫 start() 預先建立子程序並載入解析模組。
+
+設定（環境變數）：
+    PARSE_POOL_SIZE: 子程序數量（0 表示停用，全部在原程序解析）
+    PARSE_POOL_THRESHOLD: 交給子程序解析的文件大小門檻（bytes）
+"""
+
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Union
+
+from src.scrapers.models import ArticleList
+
+# 設定常數
+PARSE_POOL_SIZE = int(os.getenv('PARSE_POOL_SIZE', 2))
+PARSE_POOL_THRESHOLD = int(os.getenv('PARSE_POOL_THRESHOLD', 256 * 1024))  # bytes
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+Parser = Callable[[str, int], ArticleList]
+
+
+def _warm_worker() -> None:
+    """子程序初始化：預先載入解析相關模組"""
+    import selectolax.parser  # noqa: F401
+
+    import src.scrapers.aivi_scraper  # noqa: F401
+    import src.scrapers.feed_scraper  # noqa: F401
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def decode_document(data: Union[str, bytes]) -> str:
+    """將 UTF-8 bytes 解碼為字串（與 httpx 相同，無效的位元組以 U+FFFD 取代）"""
+    return data if isinstance(data, str) else data.decode('utf-8', 'replace')
+
+
+def _parse_bytes(parser: Parser, data: bytes, max_articles: int) -> ArticleList:
+    """在子程序中解碼並解析文件"""
+    return parser(decode_document(data), max_articles)
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class ParsePool:
+    """依文件大小決定在原程序或子程序解析
+
+    參數：
+        size: 子程序數量（0 表示停用）
+        threshold: 交給子程序解析的文件大小門檻（bytes）
+
+    範例：
+        >>> pool = ParsePool(size=0)
+        >>> pool.should_offload('x' * 10_000_000)
+        False
+    """
+
+    def __init__(self, size: int = PARSE_POOL_SIZE, threshold: int = PARSE_POOL_THRESHOLD):
+        self.size = size
+        self.threshold = threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._offloaded = 0
+        self._inline = 0
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.size,
+                    mp_context=_mp_context(),
+                    initializer=_warm_worker,
+                )
+            return self._executor
+
+    def start(self) -> List[Future]:
+        """建立子程序並預先載入解析模組（不等待完成）
+
+        返回：
+            每個子程序的暖機工作，需要時可以等待
+        """
+        if self.size <= 0:
+            return []
+        executor = self._ensure_executor()
+        futures = [executor.submit(_ping) for _ in range(self.size)]
+        logger.info(f"解析子程序預先啟動中（{self.size} 個，門檻 {self.threshold} bytes）")
+        return futures
+
+    def should_offload(self, html: Union[str, bytes]) -> bool:
+        """是否交給子程序解析（字串以字元數估算，避免為了判斷而先編碼）"""
+        return self.size > 0 and len(html) >= self.threshold
+
+    async def parse(self, parser: Parser, html: Union[str, bytes], max_articles: int) -> ArticleList:
+        """解析文件；大型文件在子程序中解析，不阻塞事件迴圈
+
+        參數：
+            parser: 模組層級的解析函式（必須可以 pickle）
+            html: 文件內容（字串或 UTF-8 bytes；bytes 直接傳給子程序）
+            max_articles: 最多返回幾則文章
+        """
+        if not self.should_offload(html):
+            self._inline += 1
+            return parser(decode_document(html), max_articles)
+
+        self._offloaded += 1
+        data = html if isinstance(html, bytes) else html.encode('utf-8', 'surrogatepass')
+        loop = asyncio.get_running_loop()
+        try:
+            pickle.dumps(parser)
+            future = loop.run_in_executor(self._ensure_executor(), _parse_bytes, parser, data, max_articles)
+        except (BrokenProcessPool, pickle.PicklingError, AttributeError, TypeError) as e:
+            # 子程序已異常終止，或 parser 無法 pickle（送出前就失敗）
+            logger.error(f"無法交給子程序解析，改在原程序解析：{e}")
+            self._reset_executor()
+            return parser(decode_document(html), max_articles)
+
+        try:
+            return await future
+        except BrokenProcessPool as e:
+            logger.error(f"解析子程序異常終止，改在原程序解析：{e}")
+            self._reset_executor()
+        except Exception as e:
+            # 解析函式本身的錯誤：子程序仍可使用，不需要重建
+            logger.error(f"子程序解析失敗，改在原程序解析：{e}")
+        return parser(decode_document(html), max_articles)
+
+    def _reset_executor(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """解析統計：在子程序與原程序解析的次數"""
+        return {'size': self.size, 'threshold': self.threshold,
+                'offloaded': self._offloaded, 'inline': self._inline}
+
+    def shutdown(self) -> None:
+        """關閉子程序"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# 全域共用的解析程序池
+parse_pool = ParsePool()
+atexit.register(parse_pool.shutdown)
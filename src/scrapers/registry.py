@@ -0,0 +1,292 @@
+"""爬蟲來源註冊表
+
+每個來源宣告自己的網址、解析方式（CSS selector 或自訂 parser）與新鮮度，
+指令只需要列出要使用的來源名稱。scrape_sources 會並行抓取所有來源，
+合併結果、依 URL 去除重複，並依日期排序。
+
+總延遲約等於最慢的來源，而不是所有來源的延遲總和。
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional, Sequence
+from urllib.parse import urldefrag, urljoin
+
+from selectolax.parser import HTMLParser
+
+from src.scrapers.fetcher import fetch_page
+from src.scrapers.models import Article, ArticleList
+from src.scrapers.parse_cache import parse_cache
+from src.scrapers.retry_policy import RetryPolicy
+from src.utils.lease import SCRAPE_LEASE_TTL
+
+# 設定常數
+MAX_CONCURRENT_FETCHES = int(os.getenv('MAX_CONCURRENT_FETCHES', 4))
+DEFAULT_FRESHNESS_TTL = 300.0  # 秒
+# 單一來源（含 fallback）抓取的時間預算，預設為爬取租約存活時間的 80%
+SCRAPE_BUDGET = float(os.getenv('SCRAPE_BUDGET', SCRAPE_LEASE_TTL * 0.8))  # 秒
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+Parser = Callable[[str, int], ArticleList]
+
+
+@dataclass(frozen=True)
+class ScraperSource:
+    """爬蟲來源設定
+
+    屬性：
+        name: 來源名稱（指令設定中引用）
+        url: 要抓取的頁面網址
+        selector: 文章連結的 CSS selector（未提供 parser 時使用）
+        parser: 自訂解析函式 (html, max_articles) -> 文章清單
+        freshness_ttl: 結果的新鮮期（秒），用來決定快取多久後需要更新
+        policy: 重試策略（None 表示使用預設值）
+        fallback: 沒有取得任何文章時改用的來源名稱（例如 feed 失敗時改用 HTML 首頁）
+
+    範例：
+        >>> source = ScraperSource(name='demo', url='https://example.com/', selector='h2 > a')
+        >>> source.parse('<h2><a href="/a">A</a></h2>', 5)
+        ArticleList([Article(title='A', url='https://example.com/a')])
+    """
+
+    name: str
+    url: str
+    selector: Optional[str] = None
+    parser: Optional[Parser] = None
+    freshness_ttl: float = DEFAULT_FRESHNESS_TTL
+    policy: Optional[RetryPolicy] = None
+    fallback: Optional[str] = None
+
+    def __post_init__(self):
+        if self.selector is None and self.parser is None:
+            raise ValueError(f"來源 {self.name} 必須提供 selector 或 parser")
+
+    def parse(self, html: str, max_articles: int) -> ArticleList:
+        """解析頁面內容"""
+        if self.parser is not None:
+            return self.parser(html, max_articles)
+        return parse_by_selector(html, self.selector, self.url, max_articles)
+
+
+def parse_by_selector(html: str, selector: str, base_url: str, max_articles: int) -> ArticleList:
+    """以 CSS selector 擷取文章連結
+
+    參數：
+        html: 頁面 HTML
+        selector: 指向 <a> 元素的 CSS selector
+        base_url: 用來轉換相對路徑的網址
+        max_articles: 最多返回幾則文章
+
+    返回：
+        文章清單（ArticleList）
+    """
+    try:
+        articles = []
+        for link in HTMLParser(html).css(selector):
+            title = link.text(strip=True)
+            href = link.attributes.get("href", "")
+            if not title or not href:
+                continue
+            articles.append(Article(title=title, url=urljoin(base_url, href)))
+            if len(articles) >= max_articles:
+                break
+        return ArticleList(articles)
+
+    except Exception as e:
+        logger.error(f"以 selector 解析時發生錯誤：{e}")
+        return ArticleList()
+
+
+# 已註冊的來源
+_sources: Dict[str, ScraperSource] = {}
+
+
+def register_source(source: ScraperSource) -> ScraperSource:
+    """註冊爬蟲來源（同名來源會被取代）"""
+    _sources[source.name] = source
+    return source
+
+
+def get_source(name: str) -> ScraperSource:
+    """取得已註冊的來源
+
+    異常：
+        KeyError: 來源不存在
+    """
+    try:
+        return _sources[name]
+    except KeyError:
+        raise KeyError(f"未註冊的爬蟲來源：{name}") from None
+
+
+def find_source(url: str) -> Optional[ScraperSource]:
+    """依網址尋找已註冊的來源；找不到時返回 None"""
+    for source in _sources.values():
+        if source.url == url:
+            return source
+    return None
+
+
+def freshness_ttl(names: Iterable[str]) -> float:
+    """多個來源合併結果的新鮮期（取最短者）"""
+    return min((get_source(name).freshness_ttl for name in names), default=DEFAULT_FRESHNESS_TTL)
+
+
+# 整個程序共用的並行上限：每個請求各自以 asyncio.run 建立事件迴圈，
+# asyncio.Semaphore 只能限制單一迴圈，因此改用執行緒的 semaphore
+_fetch_slots = threading.BoundedSemaphore(MAX_CONCURRENT_FETCHES)
+
+
+@contextlib.asynccontextmanager
+async def _fetch_slot(deadline: float) -> AsyncIterator[None]:
+    """取得一個抓取名額；需要等待時在執行緒中等待，不阻塞事件迴圈
+
+    等待的執行緒最多等到 deadline：呼叫端逾時被取消後，執行緒也會隨之結束，
+    asyncio.run 關閉時不會卡在等待名額的執行緒上。
+
+    異常：
+        asyncio.TimeoutError: 期限內沒有取得名額
+    """
+    slots = _fetch_slots
+    if not slots.acquire(blocking=False):
+        timeout = max(deadline - time.monotonic(), 0)
+        waiter = asyncio.ensure_future(asyncio.to_thread(slots.acquire, timeout=timeout))
+        try:
+            acquired = await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # 等待中的執行緒之後仍可能取得名額，取得後立即歸還
+            waiter.add_done_callback(lambda future: future.result() and slots.release())
+            raise
+        if not acquired:
+            raise asyncio.TimeoutError
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+async def _fetch_within(source: ScraperSource, policy: Optional[RetryPolicy], deadline: float) -> Optional[bytes]:
+    """在期限內抓取來源頁面（含等待抓取名額的時間）；逾時返回 None"""
+    async def fetch() -> Optional[bytes]:
+        async with _fetch_slot(deadline):
+            return await fetch_page(source.url, policy, raw=True)
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return None
+    try:
+        return await asyncio.wait_for(fetch(), remaining)
+    except asyncio.TimeoutError:
+        logger.warning(f"來源 {source.name} 超過抓取時間預算")
+        return None
+
+
+async def scrape_source(source: ScraperSource, max_articles: int,
+                        deadline: Optional[float] = None) -> ArticleList:
+    """抓取並解析單一來源；沒有取得文章時改用 fallback 來源，仍失敗則返回空清單
+
+    整個流程（含 fallback）共用 SCRAPE_BUDGET 秒的時間預算，避免超過爬取租約的存活時間。
+    有 fallback 的來源只嘗試一次，重試留給 fallback 來源。
+
+    參數：
+        source: 來源
+        max_articles: 最多返回幾則文章
+        deadline: time.monotonic() 的期限（None 表示從現在起算 SCRAPE_BUDGET 秒）
+    """
+    if deadline is None:
+        deadline = time.monotonic() + SCRAPE_BUDGET
+    policy = source.policy
+    if source.fallback:
+        policy = replace(policy or RetryPolicy(), max_retries=0)
+
+    html = await _fetch_within(source, policy, deadline)
+    if html is None:
+        logger.warning(f"來源 {source.name} 抓取失敗")
+        articles = ArticleList()
+    else:
+        # 內容與上次相同時直接使用快取的解析結果
+        articles = await parse_cache.get_or_parse_async(source.name, html, max_articles, source.parse)
+        logger.info(f"來源 {source.name} 取得 {len(articles)} 則文章")
+
+    if not articles and source.fallback:
+        if time.monotonic() >= deadline:
+            logger.warning(f"來源 {source.name} 已用完時間預算，不再改用 {source.fallback}")
+            return articles
+        logger.info(f"來源 {source.name} 沒有取得文章，改用 {source.fallback}")
+        return await scrape_source(get_source(source.fallback), max_articles, deadline)
+    return articles
+
+
+def _date_key(article: Article) -> float:
+    """排序用的日期（沒有日期的文章排在最後）"""
+    value = article.date
+    if not value:
+        return float('-inf')
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return float('-inf')
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def merge_articles(results: Sequence[Iterable[Article]]) -> ArticleList:
+    """合併多個來源的文章
+
+    依 URL（忽略 fragment）去除重複，先出現的來源優先；
+    再依日期由新到舊排序，沒有日期的文章維持原本順序排在最後。
+
+    範例：
+        >>> merge_articles([
+        ...     [Article('A', 'https://x/a')],
+        ...     [Article('A2', 'https://x/a#top'), Article('B', 'https://x/b', date='2024-01-02')],
+        ... ])
+        ArticleList([Article(title='B', url='https://x/b', date='2024-01-02'), Article(title='A', url='https://x/a')])
+    """
+    seen = set()
+    merged = []
+    for articles in results:
+        for article in articles:
+            key = urldefrag(article.url)[0]
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(article)
+
+    merged.sort(key=_date_key, reverse=True)
+    return ArticleList(merged)
+
+
+async def scrape_sources(names: Sequence[str], max_articles: int = 5) -> ArticleList:
+    """並行抓取多個來源並合併結果
+
+    參數：
+        names: 來源名稱清單（順序即為去除重複時的優先順序）
+        max_articles: 最多返回幾則文章
+
+    返回：
+        合併、去除重複並排序後的文章清單
+    """
+    sources = [get_source(name) for name in names]
+    results = await asyncio.gather(
+        *(scrape_source(source, max_articles) for source in sources),
+        return_exceptions=True,
+    )
+
+    collected = []
+    for source, result in zip(sources, results):
+        if isinstance(result, BaseException):
+            logger.error(f"來源 {source.name} 發生錯誤：{result}")
+            continue
+        collected.append(result)
+
+    return merge_articles(collected)[:max_articles]
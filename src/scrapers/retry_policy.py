@@ -0,0 +1,171 @@
+"""爬蟲重試策略
+
+定義爬蟲 HTTP 請求的重試行為，包括：
+- 指數退避（exponential backoff）搭配 full jitter
+- 連線 timeout 與讀取 timeout 分開設定
+- 對 5xx / 429 狀態碼重試，並遵守 Retry-After header
+- 可選的 hedged request：第一個請求超過 p95 延遲仍未完成時，再送出第二個請求
+
+設定（環境變數）：
+    HEDGE_REQUESTS: 預設策略是否啟用 hedged request
+    HEDGE_QUANTILE: 觸發 hedged request 的延遲分位數
+"""
+
+import os
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Deque, FrozenSet, Optional
+
+import httpx
+
+# 預設值
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BASE_DELAY = 0.5  # 秒
+DEFAULT_MAX_DELAY = 8.0  # 秒
+DEFAULT_CONNECT_TIMEOUT = 3.0  # 秒
+DEFAULT_READ_TIMEOUT = 5.0  # 秒
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def _hedge_requests_from_env() -> bool:
+    """HEDGE_REQUESTS：預設策略是否啟用 hedged request（建立策略時讀取）"""
+    return os.getenv('HEDGE_REQUESTS', '0').lower() in ('1', 'true', 'yes')
+
+
+def _hedge_quantile_from_env() -> float:
+    """HEDGE_QUANTILE：觸發 hedged request 的延遲分位數（建立策略時讀取）"""
+    return float(os.getenv('HEDGE_QUANTILE', 0.95))
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """HTTP 請求重試策略
+
+    屬性：
+        max_retries: 最多重試幾次（不含初次請求）
+        base_delay: 指數退避的基準延遲（秒）
+        max_delay: 單次等待的上限（秒），同時用來限制 Retry-After
+        connect_timeout: 建立連線的 timeout（秒）
+        read_timeout: 讀取回應的 timeout（秒）
+        retry_statuses: 需要重試的 HTTP 狀態碼
+        hedge: 是否啟用 hedged request（預設依建立時的 HEDGE_REQUESTS）
+        hedge_quantile: 觸發 hedged request 的延遲分位數（預設依建立時的 HEDGE_QUANTILE，p95）
+        hedge_min_samples: 延遲樣本數不足時不啟用 hedged request
+
+    範例：
+        >>> policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+        >>> 0 <= policy.backoff_delay(3) <= 4.0
+        True
+        >>> policy.should_retry_status(503)
+        True
+        >>> policy.should_retry_status(404)
+        False
+    """
+
+    max_retries: int = DEFAULT_MAX_RETRIES
+    base_delay: float = DEFAULT_BASE_DELAY
+    max_delay: float = DEFAULT_MAX_DELAY
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    read_timeout: float = DEFAULT_READ_TIMEOUT
+    retry_statuses: FrozenSet[int] = RETRYABLE_STATUS_CODES
+    hedge: bool = field(default_factory=_hedge_requests_from_env)
+    hedge_quantile: float = field(default_factory=_hedge_quantile_from_env)
+    hedge_min_samples: int = 20
+
+    def timeout(self) -> httpx.Timeout:
+        """建立 httpx 使用的 timeout 設定（連線與讀取分開）"""
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def backoff_delay(self, attempt: int, rand: Callable[[], float] = random.random) -> float:
+        """計算第 attempt 次重試前的等待時間（full jitter）
+
+        等待時間為 [0, min(max_delay, base_delay * 2^attempt)] 之間的隨機值，
+        避免多個客戶端同時重試造成來源站負載尖峰。
+
+        參數：
+            attempt: 目前是第幾次重試（從 0 開始）
+            rand: 產生 [0, 1) 隨機數的函式（測試時可替換）
+
+        返回：
+            等待秒數
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return rand() * ceiling
+
+    def should_retry_status(self, status_code: int) -> bool:
+        """判斷 HTTP 狀態碼是否需要重試"""
+        return status_code in self.retry_statuses
+
+    def retry_after_delay(self, response: httpx.Response) -> Optional[float]:
+        """解析 Retry-After header
+
+        支援秒數與 HTTP-date 兩種格式，結果會被限制在 [0, max_delay]。
+
+        參數：
+            response: HTTP 回應
+
+        返回：
+            等待秒數；若沒有或無法解析 Retry-After 則返回 None
+        """
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+
+        value = value.strip()
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            if retry_at.tzinfo is None:
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+
+        return max(0.0, min(delay, self.max_delay))
+
+
+@dataclass
+class LatencyTracker:
+    """記錄最近的請求延遲，用來估算 hedged request 的觸發門檻
+
+    範例：
+        >>> tracker = LatencyTracker(window=10)
+        >>> for i in range(1, 11):
+        ...     tracker.record(i / 10)
+        >>> tracker.quantile(0.95, min_samples=5)
+        1.0
+        >>> LatencyTracker().quantile(0.95, min_samples=5) is None
+        True
+    """
+
+    window: int = 200
+    _samples: Deque[float] = field(init=False, repr=False)
+    _lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self):
+        self._samples = deque(maxlen=self.window)
+
+    def record(self, seconds: float) -> None:
+        """記錄一次成功請求的延遲（秒）"""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """計算延遲分位數；樣本數不足時返回 None"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(q * len(samples)))
+        return samples[index]
+
+    def clear(self) -> None:
+        """清除所有樣本"""
+        with self._lock:
+            self._samples.clear()
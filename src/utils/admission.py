@@ -0,0 +1,183 @@
+"""負載控制（admission control）
+
+尖峰時若接受所有 webhook，延遲會不斷增加，直到 LINE 逾時並重新傳送事件，
+讓過載更嚴重。AdmissionController 依三個訊號判斷目前的負載等級：
+- 正在處理的 /aivi 指令數量（in-flight）
+- 背景事件迴圈中尚未完成的工作數量（queue depth）
+- 背景事件迴圈的延遲（loop lag）
+
+負載等級依序為：
+- NORMAL：正常處理
+- CACHE_ONLY：只使用快取回覆，不爬取來源網站、不排程背景更新
+- BUSY：回覆簡短的「忙碌中」訊息
+- SHED：直接略過（仍回應 LINE 200，避免重新傳送）
+
+門檻以「CACHE_ONLY,BUSY,SHED」格式的環境變數設定，例如
+ADMISSION_INFLIGHT_LIMITS=8,16,32。
+"""
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from src.utils.background import background_loop
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+class LoadLevel(IntEnum):
+    """負載等級（數值越大越嚴重）"""
+
+    NORMAL = 0
+    CACHE_ONLY = 1
+    BUSY = 2
+    SHED = 3
+
+
+@dataclass(frozen=True)
+class Thresholds:
+    """單一訊號的三段門檻（達到門檻即進入該等級）
+
+    範例：
+        >>> limits = Thresholds(8, 16, 32)
+        >>> limits.level(3).name, limits.level(16).name, limits.level(100).name
+        ('NORMAL', 'BUSY', 'SHED')
+    """
+
+    cache_only: float
+    busy: float
+    shed: float
+
+    def level(self, value: float) -> LoadLevel:
+        if value >= self.shed:
+            return LoadLevel.SHED
+        if value >= self.busy:
+            return LoadLevel.BUSY
+        if value >= self.cache_only:
+            return LoadLevel.CACHE_ONLY
+        return LoadLevel.NORMAL
+
+    @classmethod
+    def from_env(cls, name: str, default: Tuple[float, float, float]) -> 'Thresholds':
+        """從「CACHE_ONLY,BUSY,SHED」格式的環境變數讀取"""
+        raw = os.getenv(name)
+        if not raw:
+            return cls(*default)
+        try:
+            values = [float(part) for part in raw.split(',')]
+            if len(values) != 3:
+                raise ValueError("需要三個數值")
+        except ValueError as e:
+            logger.warning(f"{name}={raw!r} 格式錯誤（{e}），使用預設值 {default}")
+            return cls(*default)
+        return cls(*values)
+
+
+# 設定常數
+INFLIGHT_LIMITS = Thresholds.from_env('ADMISSION_INFLIGHT_LIMITS', (8, 16, 32))
+QUEUE_LIMITS = Thresholds.from_env('ADMISSION_QUEUE_LIMITS', (50, 100, 200))
+LAG_LIMITS = Thresholds.from_env('ADMISSION_LAG_LIMITS', (0.5, 1.0, 2.0))  # 秒
+
+
+class AdmissionController:
+    """依負載訊號決定如何處理新的指令
+
+    參數：
+        inflight_limits: 正在處理的指令數量門檻
+        queue_limits: 背景工作數量門檻
+        lag_limits: 事件迴圈延遲門檻（秒）
+        queue_depth: 取得背景工作數量的函式
+        loop_lag: 取得事件迴圈延遲的函式
+
+    範例：
+        >>> controller = AdmissionController(Thresholds(1, 2, 3), queue_depth=lambda: 0, loop_lag=lambda: 0.0)
+        >>> controller.admit().name
+        'NORMAL'
+        >>> with controller.track():
+        ...     controller.admit().name
+        'CACHE_ONLY'
+    """
+
+    def __init__(self, inflight_limits: Thresholds = INFLIGHT_LIMITS,
+                 queue_limits: Thresholds = QUEUE_LIMITS,
+                 lag_limits: Thresholds = LAG_LIMITS,
+                 queue_depth: Optional[Callable[[], int]] = None,
+                 loop_lag: Optional[Callable[[], float]] = None):
+        self.inflight_limits = inflight_limits
+        self.queue_limits = queue_limits
+        self.lag_limits = lag_limits
+        self._queue_depth = queue_depth or background_loop.pending
+        self._loop_lag = loop_lag or background_loop.lag
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._level = LoadLevel.NORMAL
+        self._transitions = 0
+        self._decisions: Dict[LoadLevel, int] = {level: 0 for level in LoadLevel}
+
+    def _signals(self) -> Dict[str, float]:
+        return {
+            'inflight': self._inflight,
+            'queue_depth': self._queue_depth(),
+            'loop_lag': round(self._loop_lag(), 4),
+        }
+
+    def evaluate(self) -> LoadLevel:
+        """依目前的訊號計算負載等級；等級改變時記錄日誌"""
+        with self._lock:
+            signals = self._signals()
+            level = max(
+                self.inflight_limits.level(signals['inflight']),
+                self.queue_limits.level(signals['queue_depth']),
+                self.lag_limits.level(signals['loop_lag']),
+            )
+            previous, self._level = self._level, level
+            if level != previous:
+                self._transitions += 1
+        if level != previous:
+            log = logger.warning if level > previous else logger.info
+            log(f"負載等級 {previous.name} → {level.name}（{signals}）")
+        return level
+
+    def admit(self) -> LoadLevel:
+        """決定新指令的處理方式，並計入統計"""
+        level = self.evaluate()
+        with self._lock:
+            self._decisions[level] += 1
+        return level
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """記錄一個正在處理的指令"""
+        with self._lock:
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def stats(self) -> Dict[str, object]:
+        """負載統計：目前等級、各訊號數值、等級轉換次數與各等級的處理次數"""
+        with self._lock:
+            return {
+                'level': self._level.name,
+                **self._signals(),
+                'transitions': self._transitions,
+                'decisions': {level.name: count for level, count in self._decisions.items()},
+            }
+
+    def reset(self) -> None:
+        """重設統計（不影響正在處理的指令數量）"""
+        with self._lock:
+            self._level = LoadLevel.NORMAL
+            self._transitions = 0
+            self._decisions = {level: 0 for level in LoadLevel}
+
+
+# 全域共用的負載控制器
+admission_controller = AdmissionController()
@@ -0,0 +1,132 @@
+"""背景事件迴圈
+
+Flask 的 webhook 處理是同步的，每個指令以 asyncio.run 執行，
+結束時尚未完成的 task 會被取消。需要在回覆之後繼續執行的工作
+（例如背景更新快取）交給這裡的常駐事件迴圈執行。
+
+事件迴圈另外執行一個心跳 coroutine 量測延遲（loop lag），並記錄
+尚未完成的工作數量，供負載控制（src.utils.admission）判斷是否過載。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Awaitable, Optional
+
+# 設定常數
+LAG_PROBE_INTERVAL = 0.1  # 秒，事件迴圈心跳間隔
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoop:
+    """在獨立 daemon 執行緒中運行的事件迴圈
+
+    範例：
+        >>> async def add(a, b):
+        ...     return a + b
+        >>> loop = BackgroundLoop()
+        >>> loop.submit(add(1, 2)).result(timeout=5)
+        3
+        >>> loop.stop()
+    """
+
+    def __init__(self, name: str = "aivi-background"):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._heartbeat_future: Optional[Future] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_tick = 0.0
+        self._last_lag = 0.0
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name=self._name, daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+                self._last_tick, self._last_lag = time.monotonic(), 0.0
+                self._heartbeat_future = asyncio.run_coroutine_threadsafe(self._heartbeat(), loop)
+            return self._loop
+
+    async def _heartbeat(self) -> None:
+        """定期醒來，記錄實際醒來的時間比預期晚了多久"""
+        while True:
+            self._last_tick = time.monotonic()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self._last_lag = max(0.0, time.monotonic() - self._last_tick - LAG_PROBE_INTERVAL)
+
+    def lag(self) -> float:
+        """事件迴圈延遲（秒）
+
+        取最近一次心跳的延遲，以及目前心跳已逾期的時間中較大者，
+        事件迴圈完全被阻塞時也能反映出來。尚未啟動時返回 0。
+        """
+        if self._loop is None:
+            return 0.0
+        overdue = time.monotonic() - self._last_tick - LAG_PROBE_INTERVAL
+        return max(self._last_lag, overdue, 0.0)
+
+    def pending(self) -> int:
+        """已提交但尚未完成的背景工作數量"""
+        with self._lock:
+            return self._pending
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+        _log_failure(future)
+
+    def submit(self, coro: Awaitable) -> Future:
+        """將 coroutine 排入背景事件迴圈執行
+
+        參數：
+            coro: 要執行的 coroutine
+
+        返回：
+            concurrent.futures.Future，可用來等待結果（通常不需要）
+        """
+        loop = self._ensure_started()
+        with self._lock:
+            self._pending += 1
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def stop(self) -> None:
+        """停止背景事件迴圈"""
+        with self._lock:
+            loop, thread, heartbeat = self._loop, self._thread, self._heartbeat_future
+            self._loop = self._thread = self._heartbeat_future = None
+        if loop is None:
+            return
+        if heartbeat is not None:
+            heartbeat.cancel()
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+        loop.close()
+
+
+def _log_failure(future: Future) -> None:
+    """記錄背景工作中未處理的異常"""
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error(f"背景工作執行失敗：{error}", exc_info=error)
+
+
+# 全域共用的背景事件迴圈
+background_loop = BackgroundLoop()
+
+
+def run_in_background(coro: Awaitable) -> Future:
+    """在全域背景事件迴圈中執行 coroutine（不等待結果）"""
+    return background_loop.submit(coro)
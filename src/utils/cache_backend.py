@@ -0,0 +1,453 @@
+"""可替換的快取後端
+
+提供統一的 key-value 介面（含 TTL 與 compare-and-set），讓多個 gunicorn
+worker 或多個 replica 共用同一份快取，而不是各自爬取來源網站。
+
+實作：
+- MemoryCacheBackend：單一程序內的記憶體快取（預設）
+- SQLiteCacheBackend：以 SQLite 檔案共用，適合同一台機器上的多個 worker
+- RedisCacheBackend：Redis 協定（RESP），適合多個 replica；不需要額外套件
+
+以 CACHE_BACKEND_URL 選擇後端，例如：
+    memory://
+    sqlite:///data/aivi-cache.sqlite
+    redis://:password@localhost:6379/0
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+# 設定常數
+CACHE_BACKEND_URL = os.getenv('CACHE_BACKEND_URL', 'memory://')
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+class CacheBackendError(Exception):
+    """快取後端操作失敗"""
+
+
+class CacheBackend(ABC):
+    """快取後端介面
+
+    所有值都是 bytes；ttl 為秒數，None 表示不過期。
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """取得值；不存在或已過期時返回 None"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """寫入值"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """刪除值"""
+
+    @abstractmethod
+    def compare_and_set(self, key: str, expected: Optional[bytes], value: bytes,
+                        ttl: Optional[float] = None) -> bool:
+        """目前的值等於 expected 時才寫入
+
+        參數：
+            key: 快取 key
+            expected: 預期的目前值；None 表示 key 必須不存在
+            value: 要寫入的值
+            ttl: 新值的存活秒數
+
+        返回：
+            是否寫入成功
+        """
+
+    @abstractmethod
+    def compare_and_delete(self, key: str, expected: bytes) -> bool:
+        """目前的值等於 expected 時才刪除
+
+        返回：
+            是否刪除成功
+        """
+
+    def close(self) -> None:
+        """釋放資源"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """單一程序內的記憶體快取
+
+    範例：
+        >>> backend = MemoryCacheBackend()
+        >>> backend.compare_and_set('k', None, b'v1')
+        True
+        >>> backend.compare_and_set('k', None, b'v2')
+        False
+        >>> backend.compare_and_set('k', b'v1', b'v2'), backend.get('k')
+        (True, b'v2')
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _get_locked(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._get_locked(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl is not None else None)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def compare_and_set(self, key: str, expected: Optional[bytes], value: bytes,
+                        ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if self._get_locked(key) != expected:
+                return False
+            self._data[key] = (value, time.time() + ttl if ttl is not None else None)
+            return True
+
+    def compare_and_delete(self, key: str, expected: bytes) -> bool:
+        with self._lock:
+            if self._get_locked(key) != expected:
+                return False
+            del self._data[key]
+            return True
+
+    def size_bytes(self) -> int:
+        """估算目前保存的資料量（bytes）"""
+        with self._lock:
+            return sum(len(key) + len(value) for key, (value, _) in self._data.items())
+
+    def clear(self) -> None:
+        """清除所有資料"""
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """以 SQLite 檔案共用的快取
+
+    同一台機器上的多個 worker 程序開啟同一個檔案即可共用；
+    compare-and-set 以 BEGIN IMMEDIATE 交易保證原子性。
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+
+    @staticmethod
+    def _expires_at(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl is not None else None
+
+    def _get_locked(self, key: str) -> Optional[bytes]:
+        row = self._conn.execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with self._lock:
+                return self._get_locked(key)
+        except sqlite3.Error as e:
+            raise CacheBackendError(f"SQLite 讀取失敗：{e}") from e
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, self._expires_at(ttl)),
+                )
+        except sqlite3.Error as e:
+            raise CacheBackendError(f"SQLite 寫入失敗：{e}") from e
+
+    def delete(self, key: str) -> None:
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            raise CacheBackendError(f"SQLite 刪除失敗：{e}") from e
+
+    def compare_and_set(self, key: str, expected: Optional[bytes], value: bytes,
+                        ttl: Optional[float] = None) -> bool:
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if self._get_locked(key) != expected:
+                        self._conn.execute("ROLLBACK")
+                        return False
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, self._expires_at(ttl)),
+                    )
+                    self._conn.execute("COMMIT")
+                    return True
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            raise CacheBackendError(f"SQLite compare-and-set 失敗：{e}") from e
+
+    def compare_and_delete(self, key: str, expected: bytes) -> bool:
+        try:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "DELETE FROM cache WHERE key = ? AND value = ? "
+                    "AND (expires_at IS NULL OR expires_at > ?)",
+                    (key, expected, time.time()),
+                )
+                return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            raise CacheBackendError(f"SQLite compare-and-delete 失敗：{e}") from e
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# compare-and-set 的 Lua script：ARGV = [expect_absent, expected, value, ttl_ms]
+_REDIS_CAS_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if ARGV[1] == '1' then
+  if current then return 0 end
+elseif current ~= ARGV[2] then
+  return 0
+end
+if tonumber(ARGV[4]) > 0 then
+  redis.call('SET', KEYS[1], ARGV[3], 'PX', ARGV[4])
+else
+  redis.call('SET', KEYS[1], ARGV[3])
+end
+return 1
+"""
+
+# compare-and-delete 的 Lua script：ARGV = [expected]
+_REDIS_CAD_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# 送出後失敗時不重送的指令（非冪等）
+_REDIS_NO_RESEND = frozenset({'EVAL'})
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis 協定（RESP2）快取
+
+    直接以 socket 實作需要的少數指令（GET / SET / DEL / EVAL），
+    不需要安裝 redis 套件；任何相容 Redis 協定的服務都可以使用。
+
+    參數：
+        host: 主機
+        port: 連接埠
+        db: 資料庫編號
+        password: 密碼（可選）
+        timeout: socket timeout（秒）
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 2.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile('rb')
+        try:
+            if self.password:
+                self._send_and_read('AUTH', self.password)
+            if self.db:
+                self._send_and_read('SELECT', str(self.db))
+        except BaseException:
+            # 未驗證或選錯資料庫的連線不可沿用，下一次 execute 重新連線
+            self._disconnect()
+            raise
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._reader = None
+
+    @staticmethod
+    def _encode(args: Tuple[Any, ...]) -> bytes:
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(parts)
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis 連線已關閉")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b'+':
+            return payload.decode('utf-8')
+        if prefix == b'-':
+            raise CacheBackendError(f"Redis 錯誤：{payload.decode('utf-8', 'replace')}")
+        if prefix == b':':
+            return int(payload)
+        if prefix == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if prefix == b'*':
+            count = int(payload)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise CacheBackendError(f"無法解析的 Redis 回應：{line!r}")
+
+    def _send_and_read(self, *args: Any) -> Any:
+        self._sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def execute(self, *args: Any) -> Any:
+        """執行一個 Redis 指令（連線中斷時重新連線一次）
+
+        指令送出後才失敗（例如讀取 timeout）時伺服器可能已經執行過，
+        EVAL（compare-and-set / compare-and-delete）不會重送，
+        否則重送的指令會看到自己先前的寫入而回報失敗。
+        """
+        with self._lock:
+            for attempt in range(2):
+                sent = False
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(self._encode(args))
+                    sent = True
+                    return self._read_reply()
+                except (OSError, ConnectionError) as e:
+                    self._disconnect()
+                    if attempt == 1 or (sent and args[0] in _REDIS_NO_RESEND):
+                        raise CacheBackendError(f"Redis 連線失敗：{e}") from e
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.execute('GET', key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if ttl is not None:
+            self.execute('SET', key, value, 'PX', max(1, int(ttl * 1000)))
+        else:
+            self.execute('SET', key, value)
+
+    def delete(self, key: str) -> None:
+        self.execute('DEL', key)
+
+    def compare_and_set(self, key: str, expected: Optional[bytes], value: bytes,
+                        ttl: Optional[float] = None) -> bool:
+        ttl_ms = max(1, int(ttl * 1000)) if ttl is not None else 0
+        result = self.execute(
+            'EVAL', _REDIS_CAS_SCRIPT, 1, key,
+            '1' if expected is None else '0', expected or b'', value, ttl_ms,
+        )
+        return result == 1
+
+    def compare_and_delete(self, key: str, expected: bytes) -> bool:
+        return self.execute('EVAL', _REDIS_CAD_SCRIPT, 1, key, expected) == 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+
+def create_cache_backend(url: str = CACHE_BACKEND_URL) -> CacheBackend:
+    """依 URL 建立快取後端
+
+    範例：
+        >>> type(create_cache_backend('memory://')).__name__
+        'MemoryCacheBackend'
+        >>> backend = create_cache_backend('redis://:secret@cache.local:6380/2')
+        >>> backend.host, backend.port, backend.db, backend.password
+        ('cache.local', 6380, 2, 'secret')
+
+    異常：
+        ValueError: 不支援的 URL scheme
+    """
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+
+    if scheme in ('', 'memory'):
+        return MemoryCacheBackend()
+    if scheme == 'sqlite':
+        # 與 SQLAlchemy 相同：sqlite:///相對路徑、sqlite:////絕對路徑
+        path = unquote(url.split(':///', 1)[1]) if ':///' in url else ''
+        if not path:
+            raise ValueError(f"SQLite 快取後端需要檔案路徑：{url}")
+        return SQLiteCacheBackend(path)
+    if scheme == 'redis':
+        db_path = parsed.path.lstrip('/')
+        return RedisCacheBackend(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 6379,
+            db=int(db_path) if db_path else 0,
+            password=unquote(parsed.password) if parsed.password else None,
+        )
+    raise ValueError(f"不支援的快取後端：{url}")
+
+
+def describe_backend(backend: CacheBackend) -> Dict[str, Any]:
+    """快取後端的簡短描述（供 /metrics 使用）"""
+    info: Dict[str, Any] = {'type': type(backend).__name__}
+    if isinstance(backend, SQLiteCacheBackend):
+        info['path'] = backend.path
+    elif isinstance(backend, RedisCacheBackend):
+        info['address'] = f"{backend.host}:{backend.port}/{backend.db}"
+    return info
+
+
+__all__: List[str] = [
+    'CacheBackend',
+    'CacheBackendError',
+    'MemoryCacheBackend',
+    'SQLiteCacheBackend',
+    'RedisCacheBackend',
+    'create_cache_backend',
+    'describe_backend',
+]
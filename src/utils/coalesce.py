@@ -0,0 +1,152 @@
+"""群組指令回覆合併
+
+熱門群組中常有多位成員在幾秒內連續輸入 /aivi，每一則都會得到相同的
+多行回覆：浪費 LINE API 額度，也洗版整個聊天室。ReplyCoalescer 以
+event.source（群組或聊天室 ID）為 key，在短時間視窗內只讓第一則指令回覆，
+其餘的事件直接確認收到、不呼叫 API。回覆失敗時以 release() 取消記錄，
+避免群組在整個視窗內都得不到回覆。
+
+一對一聊天不合併（每位使用者都應該得到自己的回覆）。
+
+設定（環境變數）：
+    REPLY_COALESCE_WINDOW: 合併視窗秒數（0 表示停用）
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from src.utils.memory_budget import deep_sizeof
+
+# 設定常數
+REPLY_COALESCE_WINDOW = float(os.getenv('REPLY_COALESCE_WINDOW', 10))  # 秒
+REPLY_COALESCE_MAX_CHATS = 10000
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+def chat_key(source) -> Optional[str]:
+    """取得群組或聊天室的 key；一對一聊天返回 None
+
+    範例：
+        >>> from types import SimpleNamespace
+        >>> chat_key(SimpleNamespace(type='group', group_id='C123'))
+        'group:C123'
+        >>> chat_key(SimpleNamespace(type='user', user_id='U123')) is None
+        True
+    """
+    if source is None:
+        return None
+    group_id = getattr(source, 'group_id', None)
+    if group_id:
+        return f"group:{group_id}"
+    room_id = getattr(source, 'room_id', None)
+    if room_id:
+        return f"room:{room_id}"
+    return None
+
+
+class ReplyCoalescer:
+    """在視窗時間內合併同一個群組 / 聊天室的相同指令回覆
+
+    參數：
+        window: 合併視窗秒數（0 表示停用）
+        max_chats: 最多追蹤幾個聊天室（超過時淘汰最久未使用的）
+
+    範例：
+        >>> coalescer = ReplyCoalescer(window=5)
+        >>> coalescer.should_reply('group:C1', '/aivi')
+        True
+        >>> coalescer.should_reply('group:C1', '/aivi')
+        False
+        >>> coalescer.should_reply(None, '/aivi')
+        True
+        >>> coalescer.stats()['suppressed']
+        1
+    """
+
+    def __init__(self, window: float = REPLY_COALESCE_WINDOW, max_chats: int = REPLY_COALESCE_MAX_CHATS):
+        self.window = window
+        self.max_chats = max_chats
+        self._entries: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._replied = 0
+        self._suppressed = 0
+
+    def should_reply(self, key: Optional[str], command: str) -> bool:
+        """判斷這則指令是否需要回覆
+
+        參數：
+            key: chat_key 的結果（None 表示一對一聊天，一律回覆）
+            command: 正規化後的指令文字
+
+        返回：
+            True 表示應該回覆；False 表示視窗內已回覆過，應直接略過
+        """
+        if key is None or self.window <= 0:
+            return True
+
+        now = time.monotonic()
+        entry = (key, command)
+        with self._lock:
+            replied_at = self._entries.get(entry)
+            if replied_at is not None and now - replied_at < self.window:
+                self._suppressed += 1
+                suppressed = self._suppressed
+            else:
+                self._entries[entry] = now
+                self._entries.move_to_end(entry)
+                while len(self._entries) > self.max_chats:
+                    self._entries.popitem(last=False)
+                self._replied += 1
+                return True
+
+        logger.info(f"{key} 在 {self.window:g} 秒內已回覆過 {command}，略過（累計合併 {suppressed} 則）")
+        return False
+
+    def release(self, key: Optional[str], command: str) -> None:
+        """取消 should_reply 的記錄（回覆失敗時呼叫），視窗內的下一則指令仍會回覆
+
+        範例：
+            >>> coalescer = ReplyCoalescer(window=5)
+            >>> coalescer.should_reply('group:C1', '/aivi')
+            True
+            >>> coalescer.release('group:C1', '/aivi')
+            >>> coalescer.should_reply('group:C1', '/aivi')
+            True
+        """
+        if key is None:
+            return
+        with self._lock:
+            if self._entries.pop((key, command), None) is not None:
+                self._replied -= 1
+
+    def stats(self) -> Dict[str, float]:
+        """合併統計：回覆（replied）、略過（suppressed）與追蹤中的聊天室數量"""
+        with self._lock:
+            return {
+                'window': self.window,
+                'replied': self._replied,
+                'suppressed': self._suppressed,
+                'size': len(self._entries),
+            }
+
+    def size_bytes(self) -> int:
+        """估算記錄佔用的記憶體"""
+        with self._lock:
+            return deep_sizeof(self._entries)
+
+    def evict(self) -> None:
+        """釋放記錄（保留統計，供記憶體預算使用）"""
+        with self._lock:
+            self._entries.clear()
+
+    def clear(self) -> None:
+        """清除記錄與統計"""
+        with self._lock:
+            self._entries.clear()
+            self._replied = self._suppressed = 0
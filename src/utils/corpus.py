@@ -0,0 +1,241 @@
+"""錄製 / 重播用的測試語料（corpus）
+
+手寫的 HTML 片段無法反映真實首頁的大小與結構。啟用錄製模式
+（設定 CORPUS_CAPTURE_DIR）時，服務會把實際抓到的頁面與收到的 webhook
+寫入語料目錄；webhook 中的使用者、群組、聊天室 ID 會以假名取代，
+reply token 與非指令的訊息內容也會遮蔽。
+
+語料目錄的格式：
+    manifest.json       {"version": 1, "pages": [...], "webhooks": [...]}
+    pages/<id>.html     頁面內容（feed 為 .xml；id 為內容雜湊，相同內容只保存一次）
+    webhooks/<id>.json  遮蔽後的 webhook 內容
+
+manifest 帶有格式版本，重播工具（src/utils/replay.py）遇到較新的版本時會拒絕讀取。
+
+設定（環境變數）：
+    CORPUS_CAPTURE_DIR: 錄製的輸出目錄（空字串表示不錄製，預設）
+    CORPUS_CAPTURE_LIMIT: 最多錄製幾筆（頁面與 webhook 合計）
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 設定常數
+CORPUS_VERSION = 1
+CORPUS_CAPTURE_DIR = os.getenv('CORPUS_CAPTURE_DIR', '')
+CORPUS_CAPTURE_LIMIT = int(os.getenv('CORPUS_CAPTURE_LIMIT', 200))
+MANIFEST_NAME = 'manifest.json'
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+# 需要以假名取代的 ID 欄位
+_ID_FIELDS = ('userId', 'groupId', 'roomId', 'destination')
+# 直接遮蔽的欄位
+_SECRET_FIELDS = ('replyToken', 'quoteToken', 'fileName')
+# 依訊息類型遮蔽的欄位（位置訊息的名稱與地址）
+_TYPED_SECRET_FIELDS = {'location': ('title', 'address')}
+# 位置訊息的座標以 0 取代（保留數值型別，重播時仍能通過 SDK 的驗證）
+_COORDINATE_FIELDS = ('latitude', 'longitude')
+REDACTED = 'REDACTED'
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def redact_payload(payload: Any, salt: bytes) -> Any:
+    """遮蔽 webhook 內容中可識別使用者的資訊
+
+    ID 以「原本的字首 + 加鹽雜湊」取代：同一次錄製中，同一個使用者 / 群組
+    對應到同一個假名（重播時仍能重現群組合併等行為），但無法反查原本的 ID。
+    指令（以 / 開頭）以外的訊息文字、位置訊息的名稱、地址與座標、
+    檔案名稱與 postback 資料一律遮蔽。
+
+    參數：
+        payload: json.loads 後的 webhook 內容
+        salt: 假名使用的鹽
+
+    範例：
+        >>> event = {'source': {'type': 'user', 'userId': 'U1234'}, 'replyToken': 'abc',
+        ...          'message': {'type': 'text', 'text': '我的電話是 0912'}}
+        >>> redacted = redact_payload(event, b'salt')
+        >>> redacted['replyToken'], redacted['message']['text']
+        ('REDACTED', 'REDACTED')
+        >>> redacted['source']['userId'][0], len(redacted['source']['userId'])
+        ('U', 33)
+        >>> redact_payload({'type': 'postback', 'postback': {'data': 'order=123'}}, b'salt')['postback']
+        {'data': 'REDACTED'}
+    """
+    if isinstance(payload, list):
+        return [redact_payload(item, salt) for item in payload]
+    if not isinstance(payload, dict):
+        return payload
+
+    redacted = {}
+    for key, value in payload.items():
+        if key in _ID_FIELDS and isinstance(value, str) and value:
+            pseudonym = hashlib.blake2b(value.encode('utf-8'), key=salt, digest_size=16).hexdigest()
+            redacted[key] = value[0] + pseudonym
+        elif key in _SECRET_FIELDS or key in _TYPED_SECRET_FIELDS.get(payload.get('type'), ()):
+            redacted[key] = REDACTED
+        elif key in _COORDINATE_FIELDS and payload.get('type') == 'location':
+            redacted[key] = 0.0
+        elif key == 'postback' and isinstance(value, dict):
+            # postback 的 data 與 params（日期時間選擇）由應用程式自訂，可能含有個人資料
+            redacted[key] = {'data': REDACTED, **({'params': {}} if 'params' in value else {})}
+        elif key == 'text' and isinstance(value, str) and payload.get('type') == 'text':
+            redacted[key] = value if value.strip().startswith('/') else REDACTED
+        else:
+            redacted[key] = redact_payload(value, salt)
+    return redacted
+
+
+class Corpus:
+    """語料目錄的讀寫
+
+    參數：
+        directory: 語料目錄
+
+    範例：
+        >>> import tempfile
+        >>> corpus = Corpus(tempfile.mkdtemp())
+        >>> corpus.add_page('https://www.aivi.fyi/', '<html></html>')
+        True
+        >>> corpus.add_page('https://www.aivi.fyi/', '<html></html>')
+        False
+        >>> [entry['url'] for entry, _ in corpus.pages()]
+        ['https://www.aivi.fyi/']
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict[str, Any]] = None
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        if self._manifest is None:
+            self._manifest = self._read_manifest()
+        return self._manifest
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        try:
+            with open(path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {'version': CORPUS_VERSION, 'pages': [], 'webhooks': []}
+        version = manifest.get('version')
+        if not isinstance(version, int) or version > CORPUS_VERSION:
+            raise ValueError(f"不支援的語料版本：{version}（目前支援到 {CORPUS_VERSION}）")
+        manifest.setdefault('pages', [])
+        manifest.setdefault('webhooks', [])
+        return manifest
+
+    def _write_manifest(self) -> None:
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.manifest['pages']) + len(self.manifest['webhooks'])
+
+    def _add(self, kind: str, suffix: str, content: str, **fields) -> bool:
+        data = content.encode('utf-8', 'surrogatepass')
+        entry_id = _digest(data)
+        with self._lock:
+            entries: List[Dict[str, Any]] = self.manifest[kind]
+            if any(entry['id'] == entry_id for entry in entries):
+                return False
+            relative = f"{kind}/{entry_id}{suffix}"
+            os.makedirs(os.path.join(self.directory, kind), exist_ok=True)
+            with open(os.path.join(self.directory, relative), 'wb') as f:
+                f.write(data)
+            entries.append({'id': entry_id, 'file': relative, 'bytes': len(data),
+                            'captured_at': int(time.time()), **fields})
+            self._write_manifest()
+        return True
+
+    def add_page(self, url: str, html: str) -> bool:
+        """加入頁面；內容已存在時返回 False"""
+        suffix = '.xml' if html.lstrip().startswith('<?xml') else '.html'
+        return self._add('pages', suffix, html, url=url)
+
+    def add_webhook(self, payload: Dict[str, Any]) -> bool:
+        """加入（已遮蔽的）webhook；內容已存在時返回 False"""
+        body = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        return self._add('webhooks', '.json', body, events=len(payload.get('events', [])))
+
+    def _read(self, entry: Dict[str, Any]) -> str:
+        with open(os.path.join(self.directory, entry['file']), encoding='utf-8') as f:
+            return f.read()
+
+    def pages(self) -> Iterator[Tuple[Dict[str, Any], str]]:
+        """依序返回 (manifest 項目, 頁面內容)"""
+        for entry in list(self.manifest['pages']):
+            yield entry, self._read(entry)
+
+    def webhooks(self) -> Iterator[Tuple[Dict[str, Any], str]]:
+        """依序返回 (manifest 項目, webhook 內容)"""
+        for entry in list(self.manifest['webhooks']):
+            yield entry, self._read(entry)
+
+
+class CorpusRecorder:
+    """錄製模式：將實際的頁面與 webhook 寫入語料目錄
+
+    未設定目錄時所有方法都不做任何事。錄製失敗只記錄日誌，不影響服務。
+
+    參數：
+        directory: 語料目錄（空字串表示停用）
+        limit: 最多錄製幾筆
+    """
+
+    def __init__(self, directory: str = CORPUS_CAPTURE_DIR, limit: int = CORPUS_CAPTURE_LIMIT):
+        self.corpus = Corpus(directory) if directory else None
+        self.limit = limit
+        # 每次錄製使用新的鹽，假名無法跨錄製或反查
+        self._salt = os.urandom(16)
+
+    @property
+    def enabled(self) -> bool:
+        return self.corpus is not None
+
+    def _full(self) -> bool:
+        if len(self.corpus) >= self.limit:
+            logger.debug("語料已達錄製上限，略過")
+            return True
+        return False
+
+    def record_page(self, url: str, html: str) -> None:
+        """錄製抓到的頁面"""
+        if self.corpus is None:
+            return
+        try:
+            if not self._full() and self.corpus.add_page(url, html):
+                logger.info(f"已錄製頁面 {url}（{len(html)} 字元）")
+        except (OSError, ValueError) as e:
+            logger.error(f"錄製頁面時發生錯誤：{e}")
+
+    def record_webhook(self, body: str) -> None:
+        """遮蔽使用者資訊後錄製 webhook"""
+        if self.corpus is None:
+            return
+        try:
+            if not self._full() and self.corpus.add_webhook(redact_payload(json.loads(body), self._salt)):
+                logger.info("已錄製 webhook")
+        except (OSError, ValueError) as e:
+            logger.error(f"錄製 webhook 時發生錯誤：{e}")
+
+
+# 全域共用的錄製器（CORPUS_CAPTURE_DIR 未設定時停用）
+corpus_recorder = CorpusRecorder()
@@ -0,0 +1,170 @@
+"""Webhook 事件去重
+
+LINE 平台在 webhook 逾時時會重新傳送事件（deliveryContext.isRedelivery），
+同一個 webhookEventId 可能被送達多次。EventDeduplicator 記錄已處理過的
+事件 ID，重複的事件直接確認收到、不再處理。
+
+記憶體中的記錄有 TTL 與 LRU 上限；另外可選擇以 SQLite 檔案保存，
+讓多個 worker 或重新啟動後仍能辨識重複事件。
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from src.utils.memory_budget import deep_sizeof
+
+# 設定常數
+DEDUP_TTL = float(os.getenv('WEBHOOK_DEDUP_TTL', 24 * 3600))  # 秒
+DEDUP_MAX_ENTRIES = int(os.getenv('WEBHOOK_DEDUP_MAX_ENTRIES', 10000))
+DEDUP_DB_PATH = os.getenv('WEBHOOK_DEDUP_DB', '')  # 空字串表示只使用記憶體
+PURGE_INTERVAL = 300  # 秒，清除 SQLite 中過期記錄的間隔
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+class EventDeduplicator:
+    """以事件 ID 判斷重複的 webhook 事件
+
+    參數：
+        ttl: 事件 ID 保留的秒數
+        max_entries: 記憶體中最多保留幾筆（超過時淘汰最久未使用的）
+        db_path: SQLite 檔案路徑（None 或空字串表示只使用記憶體）
+
+    範例：
+        >>> dedup = EventDeduplicator(ttl=60, max_entries=100)
+        >>> dedup.check_and_mark('event-1')
+        False
+        >>> dedup.check_and_mark('event-1')
+        True
+        >>> dedup.stats()['hits']
+        1
+    """
+
+    def __init__(self, ttl: float = DEDUP_TTL, max_entries: int = DEDUP_MAX_ENTRIES,
+                 db_path: Optional[str] = DEDUP_DB_PATH):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._redeliveries = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._last_purge = 0.0
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str) -> None:
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS webhook_events ("
+            "event_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+
+    def check_and_mark(self, event_id: str, is_redelivery: bool = False) -> bool:
+        """檢查事件是否已處理過，並標記為已處理
+
+        參數：
+            event_id: webhookEventId
+            is_redelivery: 是否為 LINE 標記的重新傳送（僅用於統計）
+
+        返回：
+            True 表示重複事件（應略過），False 表示第一次收到
+        """
+        now = time.time()
+        with self._lock:
+            if is_redelivery:
+                self._redeliveries += 1
+
+            duplicate = self._check_memory(event_id, now)
+            if not duplicate and self._db is not None:
+                duplicate = self._check_db(event_id, now)
+
+            self._entries[event_id] = now + self.ttl
+            self._entries.move_to_end(event_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            if duplicate:
+                self._hits += 1
+            else:
+                self._misses += 1
+            return duplicate
+
+    def _check_memory(self, event_id: str, now: float) -> bool:
+        expires_at = self._entries.get(event_id)
+        if expires_at is None:
+            return False
+        if expires_at < now:
+            del self._entries[event_id]
+            return False
+        return True
+
+    def _check_db(self, event_id: str, now: float) -> bool:
+        """以 INSERT OR IGNORE 原子性地標記；插入失敗表示其他程序已處理過"""
+        try:
+            self._db.execute(
+                "DELETE FROM webhook_events WHERE event_id = ? AND expires_at < ?", (event_id, now)
+            )
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO webhook_events (event_id, expires_at) VALUES (?, ?)",
+                (event_id, now + self.ttl),
+            )
+            if now - self._last_purge > PURGE_INTERVAL:
+                self._db.execute("DELETE FROM webhook_events WHERE expires_at < ?", (now,))
+                self._last_purge = now
+            return cursor.rowcount == 0
+        except sqlite3.Error as e:
+            logger.error(f"查詢事件去重資料庫時發生錯誤：{e}")
+            return False
+
+    def stats(self) -> Dict[str, float]:
+        """去重統計：重複（hits）、新事件（misses）、重新傳送次數與命中率"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'redeliveries': self._redeliveries,
+                'hit_rate': round(self._hits / total, 4) if total else 0.0,
+                'size': len(self._entries),
+            }
+
+    def size_bytes(self) -> int:
+        """估算記憶體中事件 ID 記錄佔用的空間"""
+        with self._lock:
+            return deep_sizeof(self._entries)
+
+    def evict(self) -> None:
+        """釋放記憶體：移除過期記錄，再淘汰最久未使用的一半（供記憶體預算使用）
+
+        保留最近的事件 ID，短時間內的重新傳送仍能辨識；統計不受影響。
+        """
+        now = time.time()
+        with self._lock:
+            for event_id in [event_id for event_id, expires_at in self._entries.items() if expires_at < now]:
+                del self._entries[event_id]
+            for _ in range(len(self._entries) // 2):
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清除記憶體中的記錄與統計"""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._redeliveries = 0
+
+    def close(self) -> None:
+        """關閉 SQLite 連線"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,133 @@
+"""啟動時的 import 耗時分析
+
+設定環境變數 AIVI_PROFILE_IMPORTS=1 後，會記錄每個模組的載入時間，
+並以類似 `python -X importtime` 的格式輸出到 stderr，
+方便找出冷啟動時最耗時的相依套件。
+
+做法是包裝 importlib._bootstrap._find_and_load（也就是 -X importtime
+計時的同一個位置），因此只在分析模式下啟用。
+"""
+
+import importlib._bootstrap as _bootstrap
+import os
+import sys
+import threading
+import time
+from typing import List, NamedTuple, Optional, TextIO
+
+# 設定常數
+PROFILE_IMPORTS_ENV = 'AIVI_PROFILE_IMPORTS'
+DEFAULT_TOP_N = 20
+
+
+class ImportRecord(NamedTuple):
+    """單一模組的載入時間（微秒）"""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+class ImportProfiler:
+    """記錄模組載入時間
+
+    範例：
+        >>> profiler = ImportProfiler()
+        >>> profiler.install()
+        >>> import json.tool
+        >>> profiler.uninstall()
+        >>> profiler.report('示範')  # doctest: +SKIP
+    """
+
+    def __init__(self):
+        self.records: List[ImportRecord] = []
+        self._reported = 0
+        self._local = threading.local()
+        self._original = None
+        self._lock = threading.Lock()
+
+    def install(self) -> None:
+        """開始記錄"""
+        if self._original is not None:
+            return
+        self._original = _bootstrap._find_and_load
+        original = self._original
+
+        def _find_and_load(name, import_):
+            stack = self._stack()
+            started = time.perf_counter()
+            stack.append(0.0)
+            try:
+                return original(name, import_)
+            finally:
+                cumulative = time.perf_counter() - started
+                children = stack.pop()
+                if stack:
+                    stack[-1] += cumulative
+                with self._lock:
+                    self.records.append(ImportRecord(
+                        name=name,
+                        self_us=int((cumulative - children) * 1_000_000),
+                        cumulative_us=int(cumulative * 1_000_000),
+                        depth=len(stack),
+                    ))
+
+        _bootstrap._find_and_load = _find_and_load
+
+    def uninstall(self) -> None:
+        """停止記錄"""
+        if self._original is not None:
+            _bootstrap._find_and_load = self._original
+            self._original = None
+
+    def _stack(self) -> List[float]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def report(self, title: str, stream: Optional[TextIO] = None, top_n: int = DEFAULT_TOP_N) -> None:
+        """輸出自上次報告以來新載入的模組
+
+        先依載入順序輸出 -X importtime 格式的明細，再列出累計耗時最高的 top_n 個模組。
+
+        參數：
+            title: 報告標題（例如「模組載入」、「第一次 webhook」）
+            stream: 輸出目標（預設 sys.stderr）
+            top_n: 摘要列出幾個模組
+        """
+        stream = stream or sys.stderr
+        with self._lock:
+            records = self.records[self._reported:]
+            self._reported = len(self.records)
+
+        total_us = sum(r.cumulative_us for r in records if r.depth == 0)
+        print(f"===== import 耗時：{title}（{len(records)} 個模組，共 {total_us / 1000:.1f} ms）=====", file=stream)
+        print("import time: self [us] | cumulative | imported package", file=stream)
+        for r in records:
+            print(f"import time: {r.self_us:>9} | {r.cumulative_us:>10} | {'  ' * r.depth}{r.name}", file=stream)
+
+        print(f"----- 累計耗時前 {top_n} 名 -----", file=stream)
+        for r in sorted(records, key=lambda r: r.cumulative_us, reverse=True)[:top_n]:
+            print(f"{r.cumulative_us / 1000:>10.1f} ms  {r.name}", file=stream)
+        stream.flush()
+
+
+# 全域分析器（僅在啟用時安裝）
+import_profiler: Optional[ImportProfiler] = None
+
+
+def install_from_env() -> Optional[ImportProfiler]:
+    """若設定了 AIVI_PROFILE_IMPORTS 則安裝全域分析器"""
+    global import_profiler
+    if os.getenv(PROFILE_IMPORTS_ENV, '').lower() in ('1', 'true', 'yes') and import_profiler is None:
+        import_profiler = ImportProfiler()
+        import_profiler.install()
+    return import_profiler
+
+
+def report(title: str) -> None:
+    """若分析器已啟用，輸出目前的 import 耗時報告"""
+    if import_profiler is not None:
+        import_profiler.report(title)
@@ -0,0 +1,83 @@
+"""跨程序的單一寫入者租約（lease）
+
+多個 worker 同時發現快取過期時，只有取得租約的程序會爬取來源網站並
+發布結果，其他程序等待並讀取共用快取。租約建立在快取後端的
+compare-and-set 上（見 src.utils.cache_backend），並帶有過期時間：
+持有者當機時，租約在 ttl 秒後自動釋放，不會永久卡住。
+
+預設的 memory:// 後端只在單一程序內有效；多個 worker 必須將
+CACHE_BACKEND_URL 設為共用的 sqlite:// 或 redis:// 後端，租約才能跨程序互斥
+（服務啟動時若 WEB_CONCURRENCY > 1 且使用 memory:// 會記錄警告）。
+"""
+
+import logging
+import os
+import uuid
+
+from src.utils.cache_backend import CacheBackend, CacheBackendError
+
+# 設定常數
+SCRAPE_LEASE_TTL = float(os.getenv('SCRAPE_LEASE_TTL', 30))  # 秒
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+class Lease:
+    """以快取後端實作的租約
+
+    參數：
+        backend: 快取後端（所有程序必須共用同一個後端才能互斥）
+        key: 租約的 key
+        ttl: 租約存活秒數
+
+    範例：
+        >>> from src.utils.cache_backend import MemoryCacheBackend
+        >>> backend = MemoryCacheBackend()
+        >>> first, second = Lease(backend, 'lease:aivi'), Lease(backend, 'lease:aivi')
+        >>> first.acquire(), second.acquire()
+        (True, False)
+        >>> first.release()
+        >>> second.locked()
+        False
+        >>> second.acquire()
+        True
+    """
+
+    def __init__(self, backend: CacheBackend, key: str, ttl: float = SCRAPE_LEASE_TTL):
+        self.backend = backend
+        self.key = key
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex.encode('ascii')
+        self.held = False
+
+    def acquire(self) -> bool:
+        """嘗試取得租約（不等待）
+
+        後端無法使用時視為取得成功：寧可多爬取一次，也不要讓指令無法回覆。
+        """
+        try:
+            self.held = self.backend.compare_and_set(self.key, None, self.token, ttl=self.ttl)
+        except CacheBackendError as e:
+            logger.error(f"取得租約 {self.key} 時發生錯誤，改為自行處理：{e}")
+            self.held = True
+        return self.held
+
+    def locked(self) -> bool:
+        """租約目前是否由任何程序持有（後端無法使用時視為持有中）"""
+        try:
+            return self.backend.get(self.key) is not None
+        except CacheBackendError as e:
+            logger.error(f"讀取租約 {self.key} 時發生錯誤：{e}")
+            return True
+
+    def release(self) -> None:
+        """釋放租約（只會刪除自己持有的租約）"""
+        if not self.held:
+            return
+        self.held = False
+        try:
+            self.backend.compare_and_delete(self.key, self.token)
+        except CacheBackendError as e:
+            logger.error(f"釋放租約 {self.key} 時發生錯誤：{e}")
+
@@ -0,0 +1,270 @@
+"""記憶體預算與快取用量統計
+
+服務會連續執行好幾天，任何快取、去重記錄或索引都可能慢慢變大。
+每個元件向 MemoryBudget 註冊「估算大小」與「釋放」兩個函式以及優先順序；
+定期檢查程序的 RSS，超過 MEMORY_BUDGET_MB 時依優先順序（數值小的先）
+釋放元件，每釋放一個就重新讀取 RSS，回到預算內即停止。
+
+快取的估計大小通常遠小於 RSS（直譯器、函式庫與配置器保留的記憶體），
+釋放後 RSS 也不一定下降，因此兩次釋放之間至少間隔 MEMORY_EVICT_COOLDOWN 秒，
+避免每次檢查都把所有快取清空。資料不在程序內的元件（例如 SQLite / Redis
+快取後端）只列入報告，不註冊釋放函式。
+
+/admin/memory 端點（見 src/app.py）列出各元件的估計大小，
+啟用 tracemalloc（MEMORY_TRACEMALLOC=1）時可以附上配置最多的前 N 個位置。
+
+設定（環境變數）：
+    MEMORY_BUDGET_MB: RSS 預算（MB，0 表示只統計、不釋放）
+    MEMORY_CHECK_INTERVAL: 檢查間隔（秒）
+    MEMORY_EVICT_COOLDOWN: 兩次釋放之間的最短間隔（秒）
+    MEMORY_TRACEMALLOC: 啟動時開始 tracemalloc 追蹤（會增加記憶體與 CPU 用量，只在除錯時開啟）
+"""
+
+import atexit
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from types import FunctionType, MethodType, ModuleType
+from typing import Any, Callable, Dict, List, Optional
+
+# 設定常數
+MEMORY_BUDGET_MB = float(os.getenv('MEMORY_BUDGET_MB', 0))
+MEMORY_CHECK_INTERVAL = float(os.getenv('MEMORY_CHECK_INTERVAL', 30))  # 秒
+MEMORY_EVICT_COOLDOWN = float(os.getenv('MEMORY_EVICT_COOLDOWN', 300))  # 秒
+MEMORY_TRACEMALLOC = os.getenv('MEMORY_TRACEMALLOC', '0').lower() in ('1', 'true', 'yes')
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+_SKIP_TYPES = (type, ModuleType, FunctionType, MethodType)
+
+
+def deep_sizeof(obj: Any) -> int:
+    """估算物件（含其中的容器與屬性）佔用的記憶體
+
+    以 sys.getsizeof 遞迴加總，共用的物件只計算一次；類別、模組與函式不計入。
+
+    範例：
+        >>> deep_sizeof({'a': 'x' * 1000}) > 1000
+        True
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _SKIP_TYPES):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        if isinstance(item, (str, bytes, int, float)):
+            continue
+        if hasattr(item, '__dict__'):
+            stack.append(vars(item))
+        for cls in type(item).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if hasattr(item, name) and name not in ('__dict__', '__weakref__'):
+                    stack.append(getattr(item, name))
+    return total
+
+
+def rss_bytes() -> Optional[int]:
+    """目前程序的常駐記憶體（RSS）；無法取得時返回 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # 非 Linux 環境只能取得峰值（macOS 單位為 bytes，其他為 KB）
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@dataclass
+class MemoryComponent:
+    """註冊到記憶體預算的元件"""
+
+    name: str
+    estimate: Callable[[], int]
+    evict: Optional[Callable[[], None]]
+    priority: int
+    evictions: int = 0
+
+    def size(self) -> int:
+        try:
+            return int(self.estimate())
+        except Exception as e:
+            logger.error(f"估算 {self.name} 的記憶體用量時發生錯誤：{e}")
+            return 0
+
+
+class MemoryBudget:
+    """集中管理各元件的記憶體用量與釋放
+
+    參數：
+        budget_bytes: RSS 預算（0 表示只統計、不釋放）
+        interval: 定期檢查的間隔（秒，0 表示不定期檢查）
+        rss: 取得 RSS 的函式
+        cooldown: 兩次釋放之間的最短間隔（秒）
+
+    範例：
+        >>> items = list(range(1000))
+        >>> budget = MemoryBudget(budget_bytes=1, rss=lambda: 10_000_000)
+        >>> budget.register('items', lambda: deep_sizeof(items), items.clear, priority=10)
+        >>> budget.enforce()
+        ['items']
+        >>> items
+        []
+    """
+
+    def __init__(self, budget_bytes: int = int(MEMORY_BUDGET_MB * 1024 * 1024),
+                 interval: float = MEMORY_CHECK_INTERVAL,
+                 rss: Callable[[], Optional[int]] = rss_bytes,
+                 cooldown: float = MEMORY_EVICT_COOLDOWN):
+        self.budget_bytes = budget_bytes
+        self.interval = interval
+        self.cooldown = cooldown
+        self._rss = rss
+        self._last_evicted: Optional[float] = None
+        self._components: Dict[str, MemoryComponent] = {}
+        self._lock = threading.Lock()
+        self._enforce_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, estimate: Callable[[], int], evict: Optional[Callable[[], None]],
+                 priority: int) -> None:
+        """註冊元件（同名元件會被取代）
+
+        參數：
+            name: 元件名稱
+            estimate: 估算目前用量（bytes）的函式
+            evict: 釋放元件內容的函式（None 表示只列入報告；資料不在程序內的元件不應釋放）
+            priority: 釋放順序，數值小的先釋放（重建成本低、影響小的元件應使用較小的數值）
+        """
+        with self._lock:
+            self._components[name] = MemoryComponent(name, estimate, evict, priority)
+
+    def _ordered(self) -> List[MemoryComponent]:
+        with self._lock:
+            return sorted(self._components.values(), key=lambda component: component.priority)
+
+    def enforce(self) -> List[str]:
+        """RSS 超過預算時依優先順序釋放元件，每釋放一個就重新讀取 RSS
+
+        估計大小為 0 或沒有釋放函式的元件不會被釋放；距離上次釋放不到
+        cooldown 秒時不做任何事。
+
+        返回：
+            被釋放的元件名稱
+        """
+        if self.budget_bytes <= 0:
+            return []
+        rss = self._rss()
+        if rss is None or rss <= self.budget_bytes:
+            return []
+
+        with self._enforce_lock:
+            now = time.monotonic()
+            if self._last_evicted is not None and now - self._last_evicted < self.cooldown:
+                logger.debug(f"距離上次釋放不到 {self.cooldown:g} 秒，暫不釋放")
+                return []
+            self._last_evicted = now
+
+            logger.warning(f"記憶體用量 {rss / 1048576:.1f}MB 超過預算 {self.budget_bytes / 1048576:.1f}MB，開始釋放快取")
+            evicted = []
+            for component in self._ordered():
+                if component.evict is None:
+                    continue
+                before = component.size()
+                if before <= 0:
+                    continue
+                try:
+                    component.evict()
+                except Exception as e:
+                    logger.error(f"釋放 {component.name} 時發生錯誤：{e}")
+                    continue
+                component.evictions += 1
+                evicted.append(component.name)
+                gc.collect()
+                rss = self._rss()
+                logger.info(f"已釋放 {component.name}（約 {before} bytes）")
+                if rss is None or rss <= self.budget_bytes:
+                    return evicted
+
+        logger.warning("已釋放所有可釋放的元件，RSS 仍超過預算（大部分記憶體不在快取中）")
+        return evicted
+
+    def report(self, top: int = 0) -> Dict[str, Any]:
+        """各元件的估計用量；top > 0 且 tracemalloc 追蹤中時附上配置最多的位置
+
+        參數：
+            top: tracemalloc 前 N 個配置位置（0 表示不附上）
+        """
+        components = [
+            {'name': component.name, 'bytes': component.size(), 'priority': component.priority,
+             'evictable': component.evict is not None, 'evictions': component.evictions}
+            for component in self._ordered()
+        ]
+        report: Dict[str, Any] = {
+            'rss_bytes': self._rss(),
+            'budget_bytes': self.budget_bytes,
+            'total_bytes': sum(item['bytes'] for item in components),
+            'components': components,
+        }
+        if top > 0:
+            report['tracemalloc'] = tracemalloc_top(top)
+        return report
+
+    def start(self) -> None:
+        """啟動定期檢查（未設定預算或間隔時不啟動）"""
+        if MEMORY_TRACEMALLOC and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            logger.info("已開始 tracemalloc 追蹤")
+        if self._thread is not None or self.budget_bytes <= 0 or self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="aivi-memory-budget", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """停止定期檢查"""
+        self._stop_event.set()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.enforce()
+            except Exception as e:
+                logger.error(f"檢查記憶體預算時發生錯誤：{e}")
+
+
+def tracemalloc_top(top: int) -> Optional[List[Dict[str, Any]]]:
+    """tracemalloc 配置最多的前 N 個位置；未追蹤時返回 None"""
+    if not tracemalloc.is_tracing():
+        return None
+    statistics = tracemalloc.take_snapshot().statistics('lineno')[:top]
+    return [
+        {'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+         'bytes': stat.size, 'count': stat.count}
+        for stat in statistics
+    ]
+
+
+# 全域共用的記憶體預算
+memory_budget = MemoryBudget()
@@ -0,0 +1,303 @@
+"""離線重播語料，量測解析與 webhook 處理的效能
+
+將語料（見 src/utils/corpus.py）中的頁面交給各來源的解析函式，
+並將 webhook 送進完整的 Flask → WebhookHandler → /aivi 指令流程，
+記錄吞吐量與 tracemalloc 量測的記憶體用量（單次呼叫的峰值與保留的記憶體）。整個過程不需要網路：
+- 文章快取以語料中的頁面預先填入，不會連線到來源網站
+- LINE API 指向本機的替身伺服器（LINE_API_HOST）
+
+計時與記憶體量測分開執行（tracemalloc 會讓程式變慢許多）。
+
+使用方式：
+    python -m src.utils.replay --iterations 50 --output report.json
+    python -m src.utils.replay --baseline report.json   # 與先前的結果比較
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from src.utils.corpus import Corpus
+
+# 設定常數
+DEFAULT_CORPUS_DIR = str(Path(__file__).resolve().parents[2] / 'tests' / 'fixtures' / 'corpus')
+DEFAULT_ITERATIONS = 20
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+def measure(name: str, fn: Callable[[], None], iterations: int, items: int = 1) -> Dict[str, Any]:
+    """量測 fn 的吞吐量與記憶體用量
+
+    先執行一次暖機（載入模組、建立連線），再分別計時與以 tracemalloc 量測。
+    tracemalloc 無法累計「總共配置過多少」，因此記憶體以兩個數值表示：
+    - peak_bytes：單次呼叫期間記憶體用量高出呼叫前的最大值（暫時配置的工作記憶體）
+    - retained_blocks / retained_bytes：所有呼叫結束後仍被保留的記憶體（快取、洩漏）
+
+    參數：
+        name: 量測項目名稱
+        fn: 要量測的函式
+        iterations: 重複次數
+        items: 每次呼叫處理的項目數（用於計算每秒處理量）
+
+    返回：
+        吞吐量（ops_per_sec）、平均耗時、單次呼叫的峰值記憶體與保留的記憶體
+
+    範例：
+        >>> result = measure('list', lambda: [0] * 1000, iterations=10)
+        >>> result['iterations'], result['ops_per_sec'] > 0, result['peak_bytes'] >= 8000
+        (10, True, True)
+    """
+    fn()
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        peak = 0
+        for _ in range(iterations):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    diff = after.compare_to(before, 'filename')
+
+    operations = iterations * items
+    return {
+        'name': name,
+        'iterations': iterations,
+        'items': items,
+        'seconds': round(elapsed, 6),
+        'ops_per_sec': round(operations / elapsed, 2) if elapsed else float('inf'),
+        'mean_ms': round(elapsed / operations * 1000, 4) if operations else 0.0,
+        'peak_bytes': peak,
+        'retained_blocks': sum(stat.count_diff for stat in diff if stat.count_diff > 0),
+        'retained_bytes': sum(stat.size_diff for stat in diff if stat.size_diff > 0),
+    }
+
+
+def replay_pages(corpus: Corpus, iterations: int = DEFAULT_ITERATIONS,
+                 max_articles: int = 5) -> List[Dict[str, Any]]:
+    """以各來源的解析函式解析語料中的頁面（不經過解析快取）"""
+    from src.scrapers.aivi_scraper import parse_articles
+    from src.scrapers import feed_scraper  # noqa: F401 -- 註冊 feed 來源
+    from src.scrapers.registry import find_source
+
+    results = []
+    for entry, html in corpus.pages():
+        source = find_source(entry['url'])
+        parser = source.parse if source is not None else parse_articles
+        result = measure(f"parse:{entry['id']}", lambda: parser(html, max_articles), iterations)
+        result.update(url=entry['url'], bytes=entry['bytes'], articles=len(parser(html, max_articles)))
+        results.append(result)
+    return results
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """LINE API 替身：接受所有請求並回應成功"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.request_count += 1
+        payload = b'{}'
+        if self.path == '/v2/bot/message/reply':
+            payload = b'{"sentMessages": [{"id": "1", "quoteToken": "replay"}]}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LineApiStandIn:
+    """在本機啟動的 LINE API 替身伺服器"""
+
+    def __init__(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _StandInHandler)
+        self._server.request_count = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, name="line-api-stand-in", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def request_count(self) -> int:
+        return self._server.request_count
+
+    def __enter__(self) -> "LineApiStandIn":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _sign(body: str, secret: str) -> str:
+    digest = hmac.new(secret.encode('utf-8'), body.encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('utf-8')
+
+
+def _seed_news_cache(corpus: Corpus) -> None:
+    """以語料中第一個解析得到文章的頁面填入 /aivi 快取，避免重播時爬取來源網站"""
+    from src.handlers.command_handler import AIVI_CACHE_KEY, format_news_message
+    from src.handlers.news_cache import news_cache
+    from src.scrapers.aivi_scraper import parse_articles
+    from src.scrapers.registry import find_source
+
+    for entry, html in corpus.pages():
+        source = find_source(entry['url'])
+        articles = (source.parse if source is not None else parse_articles)(html, 5)
+        if articles:
+            news_cache.set(AIVI_CACHE_KEY, articles, format_news_message(articles),
+                           fetched_at=time.time(), ttl=float('inf'))
+            return
+    logger.warning("語料中沒有可解析的頁面，/aivi 會回覆「沒有找到新文章」")
+
+
+def replay_webhooks(corpus: Corpus, iterations: int = DEFAULT_ITERATIONS) -> Optional[Dict[str, Any]]:
+    """將語料中的 webhook 送進完整的處理流程（LINE API 使用本機替身）"""
+    bodies = [body for _, body in corpus.webhooks()]
+    if not bodies:
+        return None
+
+    from src import app as app_module
+    from src.handlers import line_client
+
+    previous_host = os.environ.get(line_client.LINE_API_HOST_ENV)
+    with LineApiStandIn() as stand_in:
+        os.environ[line_client.LINE_API_HOST_ENV] = stand_in.url
+        line_client.close_api_client()
+        try:
+            _seed_news_cache(corpus)
+            app_module.runtime.ensure_ready()
+            # 不啟動快照與記憶體預算（不註冊 SIGTERM / atexit、不寫入快照檔）
+            client = app_module.create_app(start_services=False).test_client()
+            secret = app_module.LINE_CHANNEL_SECRET or ''
+            signed = [(body, _sign(body, secret)) for body in bodies]
+
+            def run() -> None:
+                # 每輪都視為新的事件（否則去重與群組合併會略過重播的事件）
+                app_module.event_deduplicator.clear()
+                app_module.reply_coalescer.clear()
+                for body, signature in signed:
+                    response = client.post('/webhook', data=body, headers={
+                        'X-Line-Signature': signature, 'Content-Type': 'application/json',
+                    })
+                    if response.status_code != 200:
+                        raise RuntimeError(f"webhook 重播失敗（HTTP {response.status_code}）")
+
+            result = measure('webhook', run, iterations, items=len(signed))
+            result['line_api_requests'] = stand_in.request_count
+            return result
+        finally:
+            line_client.close_api_client()
+            if previous_host is None:
+                os.environ.pop(line_client.LINE_API_HOST_ENV, None)
+            else:
+                os.environ[line_client.LINE_API_HOST_ENV] = previous_host
+
+
+def run_replay(corpus_dir: str = DEFAULT_CORPUS_DIR, iterations: int = DEFAULT_ITERATIONS) -> Dict[str, Any]:
+    """重播整個語料，返回報告"""
+    corpus = Corpus(corpus_dir)
+    return {
+        'corpus': corpus_dir,
+        'version': corpus.manifest['version'],
+        'python': sys.version.split()[0],
+        'pages': replay_pages(corpus, iterations),
+        'webhooks': replay_webhooks(corpus, iterations),
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """與先前的報告比較：吞吐量比例（>1 表示變快）與記憶體用量的差異
+
+    範例：
+        >>> old = {'pages': [{'name': 'parse:a', 'ops_per_sec': 100.0, 'peak_bytes': 5000, 'retained_bytes': 1000}],
+        ...        'webhooks': None}
+        >>> new = {'pages': [{'name': 'parse:a', 'ops_per_sec': 150.0, 'peak_bytes': 4000, 'retained_bytes': 800}],
+        ...        'webhooks': None}
+        >>> compare(new, old)
+        [{'name': 'parse:a', 'speedup': 1.5, 'peak_bytes_delta': -1000, 'retained_bytes_delta': -200}]
+    """
+    def by_name(data):
+        results = list(data.get('pages') or [])
+        if data.get('webhooks'):
+            results.append(data['webhooks'])
+        return {result['name']: result for result in results}
+
+    previous = by_name(baseline)
+    rows = []
+    for name, result in by_name(report).items():
+        old = previous.get(name)
+        if old is None:
+            continue
+        rows.append({
+            'name': name,
+            'speedup': round(result['ops_per_sec'] / old['ops_per_sec'], 3) if old['ops_per_sec'] else None,
+            'peak_bytes_delta': result['peak_bytes'] - old['peak_bytes'],
+            'retained_bytes_delta': result['retained_bytes'] - old['retained_bytes'],
+        })
+    return rows
+
+
+def _prepare_environment() -> None:
+    """離線重播用的環境：不寫入快照、不預先載入、不補充文章"""
+    os.environ.setdefault('LINE_CHANNEL_SECRET', 'replay-secret')
+    os.environ.setdefault('LINE_CHANNEL_ACCESS_TOKEN', 'replay-token')
+    os.environ.setdefault('SNAPSHOT_PATH', os.path.join(tempfile.mkdtemp(), 'snapshot.json.z'))
+    os.environ.setdefault('SNAPSHOT_INTERVAL', '0')
+    os.environ.setdefault('PRELOAD_WEBHOOK', '0')
+    os.environ.setdefault('ARTICLE_ENRICHMENT', '0')
+    os.environ.setdefault('PARSE_POOL_SIZE', '0')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="離線重播語料並量測效能")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS_DIR, help="語料目錄")
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help="每個項目重複的次數")
+    parser.add_argument('--output', help="將報告寫入 JSON 檔案")
+    parser.add_argument('--baseline', help="與先前的報告比較")
+    args = parser.parse_args(argv)
+
+    _prepare_environment()
+    logging.basicConfig(level=logging.WARNING)
+    report = run_replay(args.corpus, args.iterations)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report['comparison'] = compare(report, json.load(f))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""線上請求的效能分析
+
+每 N 個請求抽樣一個，以 cProfile 記錄函式耗時，同時以取樣執行緒
+記錄呼叫堆疊。每個被分析的請求輸出兩個檔案：
+- <id>.pstats：可用 `python -m pstats` 或 snakeviz 開啟
+- <id>.collapsed：collapsed stack 格式，可直接交給 flamegraph.pl / speedscope
+
+檔案寫入 PROFILE_DIR，總大小超過 PROFILE_MAX_BYTES 時刪除最舊的檔案。
+管理端點（見 src/app.py 的 /admin/profiles）可以列出、下載分析結果，
+並在不重新部署的情況下調整抽樣率。
+
+設定（環境變數）：
+    PROFILE_SAMPLE_RATE: 每 N 個請求分析一個（0 表示停用，預設）
+    PROFILE_DIR: 輸出目錄（預設 .cache/profiles）
+    PROFILE_MAX_BYTES: 輸出目錄的大小上限（預設 50MB）
+    PROFILE_SAMPLE_INTERVAL: 堆疊取樣間隔（秒，預設 0.005）
+"""
+
+import cProfile
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# 設定常數
+PROFILE_SAMPLE_RATE = int(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join('.cache', 'profiles'))
+PROFILE_MAX_BYTES = int(os.getenv('PROFILE_MAX_BYTES', 50 * 1024 * 1024))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005))
+PROFILE_EXTENSIONS = ('.pstats', '.collapsed')
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+# cProfile 使用整個程序共用的 profiling hook，同一時間只分析一個請求
+_profiling = threading.Lock()
+
+
+class StackSampler:
+    """定期取樣指定執行緒的呼叫堆疊，累計為 collapsed stack
+
+    參數：
+        thread_id: 要取樣的執行緒 ID
+        interval: 取樣間隔（秒）
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.stacks[';'.join(reversed(names))] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """collapsed stack 格式：每行「frame;frame;frame 次數」"""
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class RequestProfiler:
+    """抽樣分析請求並管理輸出目錄
+
+    參數：
+        directory: 輸出目錄
+        sample_rate: 每 N 個請求分析一個（0 表示只分析明確要求的請求）
+        max_bytes: 輸出目錄的大小上限
+
+    範例：
+        >>> profiler = RequestProfiler('/tmp/profiles', sample_rate=2)
+        >>> [profiler.should_profile() for _ in range(4)]
+        [False, True, False, True]
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, sample_rate: int = PROFILE_SAMPLE_RATE,
+                 max_bytes: int = PROFILE_MAX_BYTES):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def set_sample_rate(self, sample_rate: int) -> None:
+        """調整抽樣率（0 表示停用抽樣）"""
+        if sample_rate < 0:
+            raise ValueError("sample_rate 不可為負數")
+        self.sample_rate = sample_rate
+        logger.info(f"請求分析抽樣率調整為 {'停用' if sample_rate == 0 else f'1/{sample_rate}'}")
+
+    def should_profile(self, forced: bool = False) -> bool:
+        """是否分析這個請求
+
+        參數：
+            forced: 請求明確要求分析（例如帶有管理者 token 的 header）
+        """
+        if forced:
+            return True
+        rate = self.sample_rate
+        if rate <= 0:
+            return False
+        return next(self._counter) % rate == 0
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """分析 with 區塊內的執行，結束後寫入 pstats 與 collapsed stack
+
+        同一時間只能有一個 cProfile 在執行（Python 3.12 起同時啟用會拋出 ValueError），
+        其他請求正在分析或無法啟用時，這個請求照常執行、不分析。
+        """
+        if not _profiling.acquire(blocking=False):
+            logger.info(f"其他請求正在分析，{name} 不分析")
+            yield
+            return
+        try:
+            profile = cProfile.Profile()
+            started = time.time()
+            try:
+                profile.enable()
+            except ValueError as e:
+                logger.warning(f"無法啟用 cProfile，{name} 不分析：{e}")
+                yield
+                return
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+            try:
+                yield
+            finally:
+                profile.disable()
+                sampler.stop()
+                try:
+                    self._write(name, started, profile, sampler)
+                except OSError as e:
+                    logger.error(f"寫入效能分析結果時發生錯誤：{e}")
+        finally:
+            _profiling.release()
+
+    def _write(self, name: str, started: float, profile: cProfile.Profile, sampler: StackSampler) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(started))
+            base = f"{stamp}-{int(started * 1000) % 1000:03d}-{_SAFE_NAME.sub('_', name)}"
+            profile_id, suffix = base, 1
+            while os.path.exists(os.path.join(self.directory, profile_id + '.pstats')):
+                suffix += 1
+                profile_id = f"{base}-{suffix}"
+
+            profile.dump_stats(os.path.join(self.directory, profile_id + '.pstats'))
+            with open(os.path.join(self.directory, profile_id + '.collapsed'), 'w', encoding='utf-8') as f:
+                f.write(sampler.collapsed())
+            logger.info(f"已寫入效能分析結果 {profile_id}（{time.time() - started:.3f} 秒）")
+            self._rotate()
+
+    def _rotate(self) -> None:
+        """刪除最舊的檔案，直到輸出目錄不超過大小上限"""
+        files = self.list_profiles()
+        total = sum(item['size'] for item in files)
+        for item in sorted(files, key=lambda item: item['created']):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, item['name']))
+            except OSError:
+                continue
+            total -= item['size']
+
+    def list_profiles(self) -> List[Dict[str, object]]:
+        """列出輸出目錄中的分析結果（新到舊）"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        files = []
+        for name in names:
+            if not name.endswith(PROFILE_EXTENSIONS):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            files.append({'name': name, 'size': stat.st_size, 'created': stat.st_mtime})
+        return sorted(files, key=lambda item: item['created'], reverse=True)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """取得分析結果檔案的路徑；名稱不合法或不存在時返回 None"""
+        if name != os.path.basename(name) or not name.endswith(PROFILE_EXTENSIONS):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+
+# 全域共用的請求分析器
+request_profiler = RequestProfiler()
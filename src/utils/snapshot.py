@@ -0,0 +1,206 @@
+"""暖啟動快照
+
+定期將記憶體中的狀態（文章快取、HTTP validators 等）寫入磁碟，
+並在服務重新啟動後還原，讓冷啟動後的第一次回覆也能直接使用快取。
+
+快照格式為 zlib 壓縮的 JSON，寫入時先寫暫存檔再以 os.replace
+原子性地取代，避免程序中途結束時留下損毀的檔案。
+"""
+
+import atexit
+import json
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 設定常數
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', '.cache/aivi_snapshot.json.z')
+SNAPSHOT_INTERVAL = float(os.getenv('SNAPSHOT_INTERVAL', 300))  # 秒，0 表示停用定期寫入
+SNAPSHOT_VERSION = 1
+
+# 設定日誌記錄器
+logger = logging.getLogger(__name__)
+
+
+class SnapshotManager:
+    """管理快照的寫入與還原
+
+    各個模組透過 register() 註冊自己的匯出與還原函式，
+    SnapshotManager 負責序列化、原子寫入與定期排程。
+    快照中尚未註冊的區段會被保留，等到模組延遲載入並註冊時再還原，
+    寫入時也會原樣保留，不會因為模組尚未載入而遺失。
+
+    參數：
+        path: 快照檔案路徑
+        interval: 定期寫入間隔（秒），0 表示停用
+
+    範例：
+        >>> import tempfile, os
+        >>> path = os.path.join(tempfile.mkdtemp(), 'snap.z')
+        >>> state = {'n': 1}
+        >>> manager = SnapshotManager(path, interval=0)
+        >>> manager.register('demo', lambda: state, state.update)
+        >>> manager.save()
+        True
+        >>> state['n'] = 0
+        >>> manager.load()
+        True
+        >>> state['n']
+        1
+    """
+
+    def __init__(self, path: str = SNAPSHOT_PATH, interval: float = SNAPSHOT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._sections: Dict[str, Tuple[Callable[[], Any], Callable[[Any], None]]] = {}
+        self._unclaimed: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._last_payload: Optional[bytes] = None
+        self._loaded = False
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, dump: Callable[[], Any], load: Callable[[Any], None]) -> None:
+        """註冊一個快照區段
+
+        參數：
+            name: 區段名稱
+            dump: 匯出函式，返回可 JSON 序列化的資料
+            load: 還原函式，接收 dump 匯出的資料
+        """
+        with self._lock:
+            self._sections[name] = (dump, load)
+            data = self._unclaimed.pop(name, None)
+        if data is not None:
+            self._restore(name, load, data)
+
+    def save(self) -> bool:
+        """將所有區段寫入快照檔案
+
+        內容與上次寫入相同時略過寫入。若快照尚未載入（延遲載入前就關閉），
+        會先載入舊快照，避免以空狀態覆蓋。
+
+        返回：
+            是否有寫入檔案
+        """
+        self.ensure_loaded()
+        with self._lock:
+            try:
+                sections = dict(self._unclaimed)
+                sections.update({name: dump() for name, (dump, _) in self._sections.items()})
+                payload = json.dumps(sections, ensure_ascii=False, sort_keys=True).encode('utf-8')
+                if payload == self._last_payload:
+                    return False
+
+                document = json.dumps({
+                    'version': SNAPSHOT_VERSION,
+                    'saved_at': time.time(),
+                    'sections': sections,
+                }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                _atomic_write(self.path, zlib.compress(document, 6))
+                self._last_payload = payload
+                logger.info(f"已寫入快照：{self.path}")
+                return True
+
+            except Exception as e:
+                logger.error(f"寫入快照時發生錯誤：{e}")
+                return False
+
+    def ensure_loaded(self) -> None:
+        """若尚未載入過快照則載入一次"""
+        if not self._loaded:
+            self.load()
+
+    def load(self) -> bool:
+        """讀取快照檔案並還原所有已註冊的區段
+
+        返回：
+            是否成功讀取快照
+        """
+        self._loaded = True
+        try:
+            with open(self.path, 'rb') as f:
+                document = json.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            logger.info("沒有找到快照檔案，以空快取啟動")
+            return False
+        except Exception as e:
+            logger.error(f"讀取快照時發生錯誤：{e}")
+            return False
+
+        if document.get('version') != SNAPSHOT_VERSION:
+            logger.warning(f"快照版本不符（{document.get('version')}），略過還原")
+            return False
+
+        for name, data in document.get('sections', {}).items():
+            with self._lock:
+                section = self._sections.get(name)
+                if section is None:
+                    self._unclaimed[name] = data
+                    continue
+            self._restore(name, section[1], data)
+
+        age = time.time() - document.get('saved_at', time.time())
+        logger.info(f"已讀取快照（{age:.0f} 秒前寫入）")
+        return True
+
+    def _restore(self, name: str, load: Callable[[Any], None], data: Any) -> None:
+        try:
+            load(data)
+        except Exception as e:
+            logger.error(f"還原快照區段 {name} 時發生錯誤：{e}")
+
+    def start(self) -> None:
+        """啟動定期寫入，並在程序結束時寫入最後一次快照"""
+        if self._thread is not None:
+            return
+
+        atexit.register(self.stop)
+        _install_sigterm_handler()
+
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="aivi-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止定期寫入並寫入最後一次快照"""
+        self._stop_event.set()
+        self.save()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.save()
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """先寫入同目錄的暫存檔，再以 os.replace 取代目標檔案"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _install_sigterm_handler() -> None:
+    """讓 SIGTERM（容器停止）也會觸發 atexit，確保寫入最後一次快照"""
+    if threading.current_thread() is not threading.main_thread():
+        return
+    if signal.getsignal(signal.SIGTERM) is not signal.SIG_DFL:
+        return
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
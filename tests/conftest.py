@@ -0,0 +1,33 @@
+"""共用測試設定
+
+每個測試前後清除模組層級的快取狀態，避免測試之間互相影響。
+"""
+
+import os
+
+import pytest
+
+# 測試中預設不啟動解析子程序（需要時由測試自行建立 ParsePool）
+os.environ.setdefault('PARSE_POOL_SIZE', '0')
+
+from src.handlers.news_cache import news_cache
+from src.scrapers import fetcher
+from src.scrapers.enrichment import article_enricher
+from src.scrapers.parse_cache import parse_cache
+
+
+@pytest.fixture(autouse=True)
+def _reset_module_state():
+    news_cache.clear()
+    news_cache.set_loader(None)
+    fetcher.reset_http_cache()
+    fetcher.reset_latency_trackers()
+    article_enricher.clear()
+    parse_cache.clear()
+    yield
+    news_cache.clear()
+    news_cache.set_loader(None)
+    fetcher.reset_http_cache()
+    fetcher.reset_latency_trackers()
+    article_enricher.clear()
+    parse_cache.clear()
@@ -0,0 +1,222 @@
+"""共用 LINE API 客戶端單元測試
+
+測試程序共用的 ApiClient 只建立一次，且回覆時不會關閉連線池；
+載入動畫以本機的替身 API 伺服器（LINE_API_HOST）驗證實際送出的請求。
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, Mock
+
+from src.handlers import command_handler, line_client
+from src.handlers.command_handler import handle_aivi_command
+from src.scrapers.models import Article
+
+
+@pytest.fixture(autouse=True)
+def _reset_client():
+    line_client.close_api_client()
+    yield
+    line_client.close_api_client()
+
+
+class TestSharedApiClient:
+    """測試共用的 ApiClient"""
+
+    def test_single_instance_across_threads(self):
+        """測試多個執行緒取得同一個 ApiClient"""
+        clients = []
+        threads = [
+            threading.Thread(target=lambda: clients.append(line_client.get_api_client()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len({id(client) for client in clients}) == 1
+
+    def test_configuration_from_env(self, monkeypatch):
+        """測試 access token 與連線池大小來自設定"""
+        monkeypatch.setenv('LINE_CHANNEL_ACCESS_TOKEN', 'token-from-env')
+
+        configuration = line_client.create_configuration()
+
+        assert configuration.access_token == 'token-from-env'
+        assert configuration.connection_pool_maxsize == line_client.LINE_API_POOL_SIZE
+
+    def test_close_creates_new_client_next_time(self):
+        """測試關閉後再次取得會建立新的 ApiClient"""
+        first = line_client.get_api_client()
+        line_client.close_api_client()
+
+        assert line_client.get_api_client() is not first
+
+    @pytest.mark.asyncio
+    async def test_command_does_not_close_shared_client(self, mocker):
+        """測試指令處理器回覆時不進入 `with api_client:`，連線池保持開啟"""
+        mock_line_bot_api = Mock()
+        mocker.patch('src.handlers.command_handler.MessagingApi', return_value=mock_line_bot_api)
+        mocker.patch(
+            'src.handlers.command_handler.scrape_sources',
+            new_callable=AsyncMock,
+            return_value=[Article('T', 'https://www.aivi.fyi/t')],
+        )
+        api_client = MagicMock()
+        mock_event = Mock()
+        mock_event.reply_token = 'test_token'
+
+        await handle_aivi_command(mock_event, api_client)
+        await handle_aivi_command(mock_event, api_client)
+
+        api_client.__enter__.assert_not_called()
+        api_client.__exit__.assert_not_called()
+        api_client.close.assert_not_called()
+        assert mock_line_bot_api.reply_message.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_command_defaults_to_shared_client(self, mocker):
+        """測試未傳入 api_client 時使用共用的客戶端"""
+        mock_messaging_api = mocker.patch('src.handlers.command_handler.MessagingApi')
+        mocker.patch('src.handlers.command_handler.scrape_sources', new_callable=AsyncMock, return_value=[])
+        mock_event = Mock()
+        mock_event.reply_token = 'test_token'
+
+        await handle_aivi_command(mock_event)
+
+        mock_messaging_api.assert_called_once_with(line_client.get_api_client())
+
+
+class _StandInLineApi(BaseHTTPRequestHandler):
+    """記錄收到的請求並回應 200 的 LINE API 替身"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        # 模擬較慢的 API：延遲後才記錄並回應
+        time.sleep(self.server.delays.get(self.path, 0))
+        self.server.requests.append((self.path, json.loads(body or b'{}')))
+        payload = b'{}'
+        if self.path == '/v2/bot/message/reply':
+            payload = b'{"sentMessages": [{"id": "1", "quoteToken": "q"}]}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def line_api(monkeypatch):
+    """啟動本機替身伺服器，並讓共用的 ApiClient 連線到它"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StandInLineApi)
+    server.requests = []
+    server.delays = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv(line_client.LINE_API_HOST_ENV, f'http://127.0.0.1:{server.server_address[1]}')
+    monkeypatch.setenv('LINE_CHANNEL_ACCESS_TOKEN', 'test_access_token')
+    line_client.close_api_client()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+async def _wait_for_requests(server, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while len(server.requests) < count and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    return [path for path, _ in server.requests]
+
+
+def _event(source_type='user'):
+    source = SimpleNamespace(type=source_type, user_id='U0123456789abcdef0123456789abcdef')
+    if source_type == 'group':
+        source.group_id = 'C0123456789abcdef0123456789abcdef'
+    return SimpleNamespace(reply_token='test_token', source=source)
+
+
+class TestLoadingAnimation:
+    """測試爬取期間的載入動畫"""
+
+    def test_host_from_env(self, monkeypatch):
+        """測試 LINE_API_HOST 覆寫 API 位址"""
+        monkeypatch.setenv(line_client.LINE_API_HOST_ENV, 'http://127.0.0.1:9')
+
+        assert line_client.create_configuration().host == 'http://127.0.0.1:9'
+
+    @pytest.mark.asyncio
+    async def test_loading_shown_while_scraping(self, line_api, mocker):
+        """測試沒有快取時，爬取期間同時送出載入動畫請求"""
+        async def slow_scrape(names, max_articles=5):
+            # 爬取完成前載入動畫就已送出
+            assert '/v2/bot/chat/loading/start' in await _wait_for_requests(line_api, 1)
+            return [Article('T', 'https://www.aivi.fyi/t')]
+
+        mocker.patch('src.handlers.command_handler.scrape_sources', side_effect=slow_scrape)
+
+        await handle_aivi_command(_event())
+
+        paths = await _wait_for_requests(line_api, 2)
+        assert paths == ['/v2/bot/chat/loading/start', '/v2/bot/message/reply']
+        assert line_api.requests[0][1] == {
+            'chatId': 'U0123456789abcdef0123456789abcdef',
+            'loadingSeconds': command_handler.LOADING_ANIMATION_SECONDS,
+        }
+
+    @pytest.mark.asyncio
+    async def test_loading_skipped_in_groups(self, line_api, mocker):
+        """測試群組聊天不顯示載入動畫"""
+        mocker.patch('src.handlers.command_handler.scrape_sources', new_callable=AsyncMock,
+                     return_value=[Article('T', 'https://www.aivi.fyi/t')])
+
+        await handle_aivi_command(_event('group'))
+
+        assert await _wait_for_requests(line_api, 1) == ['/v2/bot/message/reply']
+
+    @pytest.mark.asyncio
+    async def test_reply_sent_after_slow_loading(self, line_api, mocker):
+        """測試載入動畫的 API 較慢時，仍在其完成後才送出回覆"""
+        line_api.delays['/v2/bot/chat/loading/start'] = 0.3
+        mocker.patch('src.handlers.command_handler.scrape_sources', new_callable=AsyncMock,
+                     return_value=[Article('T', 'https://www.aivi.fyi/t')])
+
+        await handle_aivi_command(_event())
+
+        assert await _wait_for_requests(line_api, 2) == ['/v2/bot/chat/loading/start', '/v2/bot/message/reply']
+
+    @pytest.mark.asyncio
+    async def test_loading_wait_bounded(self, line_api, mocker):
+        """測試載入動畫請求卡住時，最多等待 LOADING_ANIMATION_WAIT 秒就回覆"""
+        line_api.delays['/v2/bot/chat/loading/start'] = 1.0
+        mocker.patch.object(command_handler, 'LOADING_ANIMATION_WAIT', 0.1)
+        mocker.patch('src.handlers.command_handler.scrape_sources', new_callable=AsyncMock,
+                     return_value=[Article('T', 'https://www.aivi.fyi/t')])
+
+        started = time.monotonic()
+        await handle_aivi_command(_event())
+
+        assert time.monotonic() - started < 0.8
+        assert (await _wait_for_requests(line_api, 1))[0] == '/v2/bot/message/reply'
+
+    @pytest.mark.asyncio
+    async def test_loading_skipped_when_cached(self, line_api, mocker):
+        """測試有快取可以立即回覆時不顯示載入動畫"""
+        mocker.patch('src.handlers.command_handler.scrape_sources', new_callable=AsyncMock,
+                     return_value=[Article('T', 'https://www.aivi.fyi/t')])
+        await handle_aivi_command(_event('group'))
+        line_api.requests.clear()
+
+        await handle_aivi_command(_event())
+
+        await asyncio.sleep(0.1)
+        assert await _wait_for_requests(line_api, 1) == ['/v2/bot/message/reply']
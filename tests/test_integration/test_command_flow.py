@@ -3,11 +3,21 @@
 測試從指令接收到訊息回覆的完整流程，包含指令處理器與爬蟲模組的整合。
 """
 
+import asyncio
 import time
 import pytest
 from unittest.mock import Mock, AsyncMock
 
-from src.handlers.command_handler import handle_aivi_command, format_news_message
+from src.handlers.command_handler import (
+    BUSY_MESSAGE,
+    _refresh_aivi_cache,
+    _scrape_lease,
+    fetch_aivi_reply,
+    handle_aivi_command,
+    format_news_message,
+)
+from src.handlers.news_cache import news_cache
+from src.scrapers.models import Article
 
 
 class TestCommandIntegration:
@@ -40,12 +50,12 @@ class TestCommandIntegration:
 
         # Mock 爬蟲回傳資料
         mock_scrape = mocker.patch(
-            'src.handlers.command_handler.scrape_aivi_news',
+            'src.handlers.command_handler.scrape_sources',
             new_callable=AsyncMock
         )
         mock_scrape.return_value = [
-            {'title': 'Test Article 1', 'url': 'https://www.aivi.fyi/test-1'},
-            {'title': 'Test Article 2', 'url': 'https://www.aivi.fyi/test-2'},
+            Article('Test Article 1', 'https://www.aivi.fyi/test-1'),
+            Article('Test Article 2', 'https://www.aivi.fyi/test-2'),
         ]
 
         # Mock event
@@ -56,7 +66,7 @@ class TestCommandIntegration:
         await handle_aivi_command(mock_event, mock_api_client)
 
         # 驗證爬蟲被呼叫
-        mock_scrape.assert_called_once_with(max_articles=5)
+        mock_scrape.assert_called_once_with(('aivi_feed',), max_articles=5)
 
         # 驗證 reply_message 被呼叫
         assert mock_line_bot_api.reply_message.called
@@ -95,7 +105,7 @@ class TestCommandIntegration:
 
         # Mock 爬蟲返回空清單
         mock_scrape = mocker.patch(
-            'src.handlers.command_handler.scrape_aivi_news',
+            'src.handlers.command_handler.scrape_sources',
             new_callable=AsyncMock
         )
         mock_scrape.return_value = []
@@ -137,7 +147,7 @@ class TestCommandIntegration:
 
         # Mock 爬蟲拋出異常
         mock_scrape = mocker.patch(
-            'src.handlers.command_handler.scrape_aivi_news',
+            'src.handlers.command_handler.scrape_sources',
             new_callable=AsyncMock
         )
         mock_scrape.side_effect = Exception("Network error")
@@ -182,11 +192,11 @@ class TestCommandIntegration:
 
         # Mock 爬蟲正常返回
         mock_scrape = mocker.patch(
-            'src.handlers.command_handler.scrape_aivi_news',
+            'src.handlers.command_handler.scrape_sources',
             new_callable=AsyncMock
         )
         mock_scrape.return_value = [
-            {'title': 'Test Article', 'url': 'https://www.aivi.fyi/test'},
+            Article('Test Article', 'https://www.aivi.fyi/test'),
         ]
 
         # Mock event
@@ -200,6 +210,225 @@ class TestCommandIntegration:
         assert mock_line_bot_api.reply_message.call_count == 2
 
 
+class TestCachedReplies:
+    """快取回覆整合測試
+
+    測試指令處理器透過快取回覆，以及快取過期時的背景更新。
+    """
+
+    def _mock_line_api(self, mocker):
+        mock_api_client = Mock()
+        mock_line_bot_api = Mock()
+        mock_api_client.__enter__ = Mock(return_value=mock_api_client)
+        mock_api_client.__exit__ = Mock(return_value=False)
+        mocker.patch(
+            'src.handlers.command_handler.MessagingApi',
+            return_value=mock_line_bot_api
+        )
+        return mock_api_client, mock_line_bot_api
+
+    @pytest.mark.asyncio
+    async def test_second_command_served_from_cache(self, mocker):
+        """測試第二次指令直接使用快取，不再爬取"""
+        mock_api_client, mock_line_bot_api = self._mock_line_api(mocker)
+        mock_scrape = mocker.patch(
+            'src.handlers.command_handler.scrape_sources',
+            new_callable=AsyncMock
+        )
+        mock_scrape.return_value = [
+            Article('Cached Article', 'https://www.aivi.fyi/cached'),
+        ]
+
+        mock_event = Mock()
+        mock_event.reply_token = 'test_token'
+        await handle_aivi_command(mock_event, mock_api_client)
+        await handle_aivi_command(mock_event, mock_api_client)
+
+        assert mock_scrape.call_count == 1
+        assert mock_line_bot_api.reply_message.call_count == 2
+        message_text = mock_line_bot_api.reply_message.call_args[0][0].messages[0].text
+        assert 'Cached Article' in message_text
+
+    @pytest.mark.asyncio
+    async def test_stale_cache_replies_and_refreshes_in_background(self, mocker):
+        """測試快取過期時先回覆舊資料，並排程背景更新"""
+        mock_api_client, mock_line_bot_api = self._mock_line_api(mocker)
+        mock_scrape = mocker.patch(
+            'src.handlers.command_handler.scrape_sources',
+            new_callable=AsyncMock
+        )
+        mock_background = mocker.patch('src.handlers.command_handler.run_in_background')
+        news_cache.set('aivi', [], '📰 舊的快取', fetched_at=time.time() - news_cache.ttl - 1)
+
+        mock_event = Mock()
+        mock_event.reply_token = 'test_token'
+        await handle_aivi_command(mock_event, mock_api_client)
+
+        message_text = mock_line_bot_api.reply_message.call_args[0][0].messages[0].text
+        assert message_text == '📰 舊的快取'
+        mock_scrape.assert_not_called()
+        assert mock_background.call_count == 1
+        mock_background.call_args[0][0].close()
+
+    @pytest.mark.asyncio
+    async def test_cache_only_serves_stale_without_refresh(self, mocker):
+        """測試負載過高時只使用快取，過期也不排程背景更新"""
+        mock_api_client, mock_line_bot_api = self._mock_line_api(mocker)
+        mock_scrape = mocker.patch('src.handlers.command_handler.scrape_sources', new_callable=AsyncMock)
+        mock_background = mocker.patch('src.handlers.command_handler.run_in_background')
+        news_cache.set('aivi', [], '📰 舊的快取', fetched_at=time.time() - news_cache.ttl - 1)
+
+        mock_event = Mock()
+        mock_event.reply_token = 'test_token'
+        await handle_aivi_command(mock_event, mock_api_client, cache_only=True)
+
+        message_text = mock_line_bot_api.reply_message.call_args[0][0].messages[0].text
+        assert message_text == '📰 舊的快取'
+        mock_scrape.assert_not_called()
+        mock_background.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cache_only_miss_replies_busy(self, mocker):
+        """測試負載過高且沒有快取時回覆忙碌訊息，不爬取"""
+        mock_api_client, mock_line_bot_api = self._mock_line_api(mocker)
+        mock_scrape = mocker.patch('src.handlers.command_handler.scrape_sources', new_callable=AsyncMock)
+
+        mock_event = Mock()
+        mock_event.reply_token = 'test_token'
+        await handle_aivi_command(mock_event, mock_api_client, cache_only=True)
+
+        message_text = mock_line_bot_api.reply_message.call_args[0][0].messages[0].text
+        assert message_text == BUSY_MESSAGE
+        mock_scrape.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_empty_result_not_cached(self, mocker):
+        """測試爬取結果為空時不寫入快取"""
+        mock_api_client, _ = self._mock_line_api(mocker)
+        mock_scrape = mocker.patch(
+            'src.handlers.command_handler.scrape_sources',
+            new_callable=AsyncMock
+        )
+        mock_scrape.return_value = []
+
+        mock_event = Mock()
+        mock_event.reply_token = 'test_token'
+        await handle_aivi_command(mock_event, mock_api_client)
+
+        assert news_cache.get('aivi') is None
+
+
+class TestScrapeLease:
+    """測試多個 worker 之間只有一個會爬取來源網站"""
+
+    ARTICLES = [Article('Shared Article', 'https://www.aivi.fyi/shared')]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_scrape_once(self, mocker):
+        """測試同時發生的快取未命中只爬取一次，其他請求讀取發布的結果"""
+        mocker.patch('src.handlers.command_handler.SCRAPE_POLL_INTERVAL', 0.01)
+
+        async def slow_scrape(names, max_articles=5):
+            await asyncio.sleep(0.05)
+            return self.ARTICLES
+
+        mock_scrape = mocker.patch('src.handlers.command_handler.scrape_sources', side_effect=slow_scrape)
+
+        results = await asyncio.gather(*(fetch_aivi_reply() for _ in range(3)))
+
+        assert mock_scrape.call_count == 1
+        assert {text for _, text in results} == {results[0][1]}
+        assert 'Shared Article' in results[0][1]
+        # 完成後釋放租約
+        lease = _scrape_lease()
+        assert lease.acquire() is True
+        lease.release()
+
+    @pytest.mark.asyncio
+    async def test_wait_timeout_falls_back_to_scraping(self, mocker):
+        """測試持有租約的程序沒有發布結果時，等待逾時後自行爬取"""
+        mocker.patch('src.handlers.command_handler.SCRAPE_POLL_INTERVAL', 0.01)
+        mocker.patch('src.handlers.command_handler.SCRAPE_WAIT_TIMEOUT', 0.05)
+        mock_scrape = mocker.patch(
+            'src.handlers.command_handler.scrape_sources',
+            new_callable=AsyncMock,
+            return_value=self.ARTICLES
+        )
+        other_worker = _scrape_lease()
+        assert other_worker.acquire() is True
+
+        _, message_text = await fetch_aivi_reply()
+
+        assert mock_scrape.call_count == 1
+        assert 'Shared Article' in message_text
+        other_worker.release()
+
+    @pytest.mark.asyncio
+    async def test_holder_failure_stops_waiting(self, mocker):
+        """測試持有者沒有發布結果就釋放租約時，不等到逾時就自行爬取"""
+        mocker.patch('src.handlers.command_handler.SCRAPE_POLL_INTERVAL', 0.01)
+        mocker.patch('src.handlers.command_handler.SCRAPE_WAIT_TIMEOUT', 5)
+        mock_scrape = mocker.patch(
+            'src.handlers.command_handler.scrape_sources',
+            new_callable=AsyncMock,
+            return_value=self.ARTICLES
+        )
+        other_worker = _scrape_lease()
+        assert other_worker.acquire() is True
+
+        async def failing_holder():
+            await asyncio.sleep(0.05)
+            other_worker.release()
+
+        started = time.monotonic()
+        _, message_text = (await asyncio.gather(fetch_aivi_reply(), failing_holder()))[0]
+
+        assert time.monotonic() - started < 1
+        assert mock_scrape.call_count == 1
+        assert 'Shared Article' in message_text
+
+    @pytest.mark.asyncio
+    async def test_result_published_as_wait_ends(self, mocker):
+        """測試等待結束的同時持有者發布了結果時，不再重複爬取"""
+        mock_scrape = mocker.patch('src.handlers.command_handler.scrape_sources', new_callable=AsyncMock)
+        other_worker = _scrape_lease()
+        assert other_worker.acquire() is True
+
+        async def publish_then_time_out(since, lease):
+            news_cache.set('aivi', self.ARTICLES, '📰 剛發布')
+            other_worker.release()
+            return None
+
+        mocker.patch('src.handlers.command_handler._wait_for_published', side_effect=publish_then_time_out)
+
+        _, message_text = await fetch_aivi_reply()
+
+        mock_scrape.assert_not_called()
+        assert message_text == '📰 剛發布'
+
+    @pytest.mark.asyncio
+    async def test_refresh_skipped_while_other_worker_holds_lease(self, mocker):
+        """測試其他程序正在更新時，背景更新直接略過"""
+        mock_scrape = mocker.patch('src.handlers.command_handler.scrape_sources', new_callable=AsyncMock)
+        other_worker = _scrape_lease()
+        other_worker.acquire()
+
+        await _refresh_aivi_cache()
+
+        mock_scrape.assert_not_called()
+        other_worker.release()
+
+    @pytest.mark.asyncio
+    async def test_refresh_skipped_when_already_published(self, mocker):
+        """測試取得租約時若已有新鮮的結果，不再重複爬取"""
+        mock_scrape = mocker.patch('src.handlers.command_handler.scrape_sources', new_callable=AsyncMock)
+        news_cache.set('aivi', self.ARTICLES, '📰 剛發布')
+
+        await _refresh_aivi_cache()
+
+        mock_scrape.assert_not_called()
+
+
 class TestMessageFormatting:
     """訊息格式化測試
 
@@ -216,8 +445,8 @@ class TestMessageFormatting:
         - 格式正確
         """
         articles = [
-            {'title': 'Article 1', 'url': 'https://example.com/1'},
-            {'title': 'Article 2', 'url': 'https://example.com/2'},
+            Article('Article 1', 'https://example.com/1'),
+            Article('Article 2', 'https://example.com/2'),
         ]
         message = format_news_message(articles)
 
@@ -247,7 +476,7 @@ class TestMessageFormatting:
         - 第 6 篇以後的文章不顯示
         """
         articles = [
-            {'title': f'Article {i}', 'url': f'https://example.com/{i}'}
+            Article(f'Article {i}', f'https://example.com/{i}')
             for i in range(10)
         ]
         message = format_news_message(articles)
@@ -266,8 +495,8 @@ class TestMessageFormatting:
         - 缺少 URL 時仍正常顯示
         """
         articles = [
-            {'url': 'https://example.com/1'},  # 缺少 title
-            {'title': 'Article 2'},  # 缺少 url
+            Article('', 'https://example.com/1'),  # 缺少 title
+            Article('Article 2', ''),  # 缺少 url
         ]
         message = format_news_message(articles)
 
@@ -282,7 +511,7 @@ class TestMessageFormatting:
         - 編號從 1 開始
         """
         articles = [
-            {'title': 'Single Article', 'url': 'https://example.com/single'},
+            Article('Single Article', 'https://example.com/single'),
         ]
         message = format_news_message(articles)
 
@@ -320,11 +549,11 @@ class TestPerformance:
 
         # Mock 爬蟲返回資料
         mock_scrape = mocker.patch(
-            'src.handlers.command_handler.scrape_aivi_news',
+            'src.handlers.command_handler.scrape_sources',
             new_callable=AsyncMock
         )
         mock_scrape.return_value = [
-            {'title': f'Article {i}', 'url': f'https://example.com/{i}'}
+            Article(f'Article {i}', f'https://example.com/{i}')
             for i in range(5)
         ]
 
@@ -351,7 +580,7 @@ class TestPerformance:
         """
         # 建立 100 篇文章
         articles = [
-            {'title': f'Article {i}' * 10, 'url': f'https://example.com/{i}'}
+            Article(f'Article {i}' * 10, f'https://example.com/{i}')
             for i in range(100)
         ]
 
@@ -392,11 +621,11 @@ class TestEdgeCases:
         )
 
         mock_scrape = mocker.patch(
-            'src.handlers.command_handler.scrape_aivi_news',
+            'src.handlers.command_handler.scrape_sources',
             new_callable=AsyncMock
         )
         mock_scrape.return_value = [
-            {'title': 'Test', 'url': 'https://example.com/test'},
+            Article('Test', 'https://example.com/test'),
         ]
 
         # Mock event with None reply_token
@@ -415,9 +644,9 @@ class TestEdgeCases:
         - 換行符不影響格式
         """
         articles = [
-            {'title': 'Article with emoji 🚀', 'url': 'https://example.com/1'},
-            {'title': 'Article\nwith\nnewlines', 'url': 'https://example.com/2'},
-            {'title': 'Article with "quotes" & symbols', 'url': 'https://example.com/3'},
+            Article('Article with emoji 🚀', 'https://example.com/1'),
+            Article('Article\nwith\nnewlines', 'https://example.com/2'),
+            Article('Article with "quotes" & symbols', 'https://example.com/3'),
         ]
         message = format_news_message(articles)
 
@@ -435,7 +664,7 @@ class TestEdgeCases:
         """
         long_title = 'A' * 1000
         articles = [
-            {'title': long_title, 'url': 'https://example.com/long'},
+            Article(long_title, 'https://example.com/long'),
         ]
         message = format_news_message(articles)
 
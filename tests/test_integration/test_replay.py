@@ -0,0 +1,73 @@
+"""整合測試：離線重播語料
+
+以 tests/fixtures/corpus 重播頁面解析與 webhook 流程，
+驗證不需要網路即可產生效能報告。
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'test_channel_secret')
+os.environ.setdefault('LINE_CHANNEL_ACCESS_TOKEN', 'test_access_token')
+os.environ.setdefault('SNAPSHOT_PATH', os.path.join(tempfile.mkdtemp(), 'snapshot.json.z'))
+os.environ.setdefault('SNAPSHOT_INTERVAL', '0')
+os.environ.setdefault('PRELOAD_WEBHOOK', '0')
+
+import pytest  # noqa: E402
+
+from src.utils import replay  # noqa: E402
+from src.utils.corpus import Corpus  # noqa: E402
+
+
+@pytest.fixture
+def offline(mocker):
+    """重播期間不得連線到來源網站"""
+    for target in ('src.scrapers.registry.fetch_page', 'src.scrapers.aivi_scraper.fetch_page'):
+        mocker.patch(target, side_effect=AssertionError("不應連線"))
+
+
+class TestReplay:
+    """語料重播測試"""
+
+    def test_fixture_corpus_is_current_version(self):
+        """測試隨附的語料可以讀取，且包含頁面與 webhook"""
+        corpus = Corpus(replay.DEFAULT_CORPUS_DIR)
+
+        assert len(list(corpus.pages())) >= 2
+        assert len(list(corpus.webhooks())) >= 1
+
+    def test_replay_report(self, offline):
+        """測試重播報告包含每個頁面的解析結果與 webhook 的吞吐量"""
+        report = replay.run_replay(iterations=1)
+
+        pages = {page['url']: page for page in report['pages']}
+        assert pages['https://www.aivi.fyi/']['articles'] == 5
+        assert pages['https://www.aivi.fyi/feed.xml']['articles'] == 5
+        for result in report['pages'] + [report['webhooks']]:
+            assert result['ops_per_sec'] > 0
+            assert result['retained_blocks'] >= 0 and result['peak_bytes'] > 0
+        # 群組中的連續 /aivi 合併為一則回覆；非指令訊息不呼叫 API
+        # （暖機 + 計時 + 記憶體量測各一輪，每輪一對一與群組各回覆一次）
+        assert report['webhooks']['line_api_requests'] == 6
+
+    def test_replay_starts_no_services(self, offline, mocker):
+        """測試重播 webhook 不啟動快照、記憶體預算等背景服務"""
+        from src import app as app_module
+        mocker.patch.object(app_module, '_services_started', False)
+        snapshot_start = mocker.patch.object(app_module.snapshot_manager, 'start')
+        budget_start = mocker.patch.object(app_module.memory_budget, 'start')
+
+        replay.replay_webhooks(Corpus(replay.DEFAULT_CORPUS_DIR), iterations=1)
+
+        snapshot_start.assert_not_called()
+        budget_start.assert_not_called()
+        assert app_module._services_started is False
+
+    def test_compare_with_baseline(self, offline):
+        """測試與先前的報告比較"""
+        report = replay.run_replay(iterations=1)
+
+        rows = replay.compare(report, report)
+
+        assert {row['name'] for row in rows} == {page['name'] for page in report['pages']} | {'webhook'}
+        assert all(row['speedup'] == 1.0 and row['retained_bytes_delta'] == 0 for row in rows)
@@ -0,0 +1,138 @@
+"""整合測試：冷啟動
+
+測試服務啟動時不載入 webhook 相關的重量級模組，
+並量測從啟動到第一次健康檢查成功的時間。
+"""
+
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from src.utils.import_profiler import ImportProfiler
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _app_env(tmp_path, **extra) -> dict:
+    env = dict(os.environ)
+    env.update({
+        'LINE_CHANNEL_ACCESS_TOKEN': 'test_token',
+        'LINE_CHANNEL_SECRET': 'test_secret',
+        'SNAPSHOT_PATH': str(tmp_path / 'snapshot.json.z'),
+        'SNAPSHOT_INTERVAL': '0',
+    })
+    env.update(extra)
+    return env
+
+
+class TestLazyImports:
+    """延遲載入測試"""
+
+    def test_app_import_does_not_load_linebot(self, tmp_path):
+        """測試載入 app 模組時不載入 line-bot-sdk、httpx 與 selectolax"""
+        code = (
+            "import sys; import src.app; "
+            "print(','.join(m for m in ('linebot.v3.messaging', 'httpx', 'selectolax.parser') "
+            "if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=PROJECT_ROOT, env=_app_env(tmp_path),
+            capture_output=True, text=True, timeout=60,
+        )
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == ''
+
+    def test_worker_reimport_has_no_side_effects(self, tmp_path):
+        """測試解析子程序以 __mp_main__ 重新載入 app.py 時不啟動背景服務"""
+        code = (
+            "import runpy, signal, threading; "
+            "runpy.run_path('src/app.py', run_name='__mp_main__'); "
+            "from src.utils.memory_budget import memory_budget; "
+            "print(threading.active_count(), len(memory_budget.report()['components']), "
+            "signal.getsignal(signal.SIGTERM) is signal.SIG_DFL)"
+        )
+        env = _app_env(tmp_path, SNAPSHOT_INTERVAL='60')
+        env.pop('LINE_CHANNEL_ACCESS_TOKEN')
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=PROJECT_ROOT, env=env,
+            capture_output=True, text=True, timeout=60,
+        )
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == '1 0 True'
+        assert 'LINE_CHANNEL_ACCESS_TOKEN' not in result.stderr
+
+    def test_import_profiler_reports_new_modules(self, tmp_path, monkeypatch):
+        """測試 import 分析器以 -X importtime 格式輸出新載入的模組"""
+        (tmp_path / 'aivi_profiled_module.py').write_text('import aivi_profiled_child\n')
+        (tmp_path / 'aivi_profiled_child.py').write_text('VALUE = 1\n')
+        monkeypatch.syspath_prepend(str(tmp_path))
+
+        profiler = ImportProfiler()
+        profiler.install()
+        try:
+            import aivi_profiled_module  # noqa: F401
+        finally:
+            profiler.uninstall()
+            sys.modules.pop('aivi_profiled_module', None)
+            sys.modules.pop('aivi_profiled_child', None)
+
+        records = {r.name: r for r in profiler.records}
+        assert records['aivi_profiled_child'].depth == records['aivi_profiled_module'].depth + 1
+        assert records['aivi_profiled_module'].cumulative_us >= records['aivi_profiled_child'].cumulative_us
+
+        output = io.StringIO()
+        profiler.report('測試', stream=output)
+        assert 'import time: self [us] | cumulative | imported package' in output.getvalue()
+        assert 'aivi_profiled_child' in output.getvalue()
+
+
+class TestStartupBenchmark:
+    """冷啟動效能測試（僅 CI 執行）"""
+
+    @pytest.mark.slow
+    def test_time_to_first_health_check(self, tmp_path):
+        """測試從啟動程序到健康檢查成功的時間
+
+        驗證：
+        - 服務能在 10 秒內回應 `/`
+        """
+        port = _free_port()
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, 'src/app.py'],
+            cwd=PROJECT_ROOT, env=_app_env(tmp_path, PORT=str(port)),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            elapsed = None
+            while time.perf_counter() - started < 10:
+                try:
+                    with urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1) as response:
+                        if response.status == 200:
+                            elapsed = time.perf_counter() - started
+                            break
+                except OSError:
+                    time.sleep(0.05)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+        assert elapsed is not None, "服務未在 10 秒內通過健康檢查"
+        print(f"\n冷啟動到第一次健康檢查成功：{elapsed:.2f} 秒")
@@ -0,0 +1,342 @@
+"""整合測試：webhook 端點
+
+以 Flask test client 送出簽章正確的 webhook，驗證事件分派與去重。
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+
+import pytest
+from unittest.mock import AsyncMock
+
+CHANNEL_SECRET = 'test_channel_secret'
+
+os.environ.setdefault('LINE_CHANNEL_SECRET', CHANNEL_SECRET)
+os.environ.setdefault('LINE_CHANNEL_ACCESS_TOKEN', 'test_access_token')
+os.environ.setdefault('SNAPSHOT_PATH', os.path.join(tempfile.mkdtemp(), 'snapshot.json.z'))
+os.environ.setdefault('SNAPSHOT_INTERVAL', '0')
+os.environ.setdefault('PRELOAD_WEBHOOK', '0')
+
+from src import app as app_module  # noqa: E402
+from src.handlers.line_client import get_api_client  # noqa: E402
+
+
+def make_text_event(text='/aivi', event_id='01HTESTEVENT0000000000000', is_redelivery=False,
+                    source=None, reply_token='test_reply_token'):
+    """建立 LINE 文字訊息事件"""
+    return {
+        'type': 'message',
+        'mode': 'active',
+        'timestamp': 1700000000000,
+        'source': source or {'type': 'user', 'userId': 'U0123456789abcdef0123456789abcdef'},
+        'webhookEventId': event_id,
+        'deliveryContext': {'isRedelivery': is_redelivery},
+        'replyToken': reply_token,
+        'message': {'id': '1', 'type': 'text', 'quoteToken': 'q', 'text': text},
+    }
+
+
+def sign(body: str, secret: str = None) -> str:
+    """計算 X-Line-Signature"""
+    secret = secret or app_module.LINE_CHANNEL_SECRET or ''
+    digest = hmac.new(secret.encode('utf-8'), body.encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('utf-8')
+
+
+def post_events(client, *events, headers=None):
+    """送出簽章正確的 webhook"""
+    body = json.dumps({'destination': 'Uxxxxxxxx', 'events': list(events)})
+    return client.post('/webhook', data=body, headers={
+        'X-Line-Signature': sign(body),
+        'Content-Type': 'application/json',
+        **(headers or {}),
+    })
+
+
+@pytest.fixture
+def client():
+    app_module.event_deduplicator.clear()
+    app_module.reply_coalescer.clear()
+    return app_module.create_app().test_client()
+
+
+@pytest.fixture
+def mock_command(mocker):
+    """以 AsyncMock 取代 /aivi 指令處理器"""
+    app_module.runtime.ensure_ready()
+    mock = AsyncMock()
+    mocker.patch.object(app_module.runtime, 'handle_aivi_command', mock)
+    return mock
+
+
+class TestWebhookEndpoint:
+    """webhook 端點測試"""
+
+    def test_missing_signature(self, client):
+        """測試缺少簽章時返回 400"""
+        assert client.post('/webhook', data='{}').status_code == 400
+
+    def test_invalid_signature(self, client):
+        """測試簽章錯誤時返回 400"""
+        response = client.post('/webhook', data='{"events": []}', headers={'X-Line-Signature': 'bad'})
+        assert response.status_code == 400
+
+    def test_aivi_command_dispatched(self, client, mock_command):
+        """測試 /aivi 指令被分派給指令處理器"""
+        response = post_events(client, make_text_event('/AIVI'))
+
+        assert response.status_code == 200
+        assert mock_command.await_count == 1
+        # 使用程序共用的 LINE API 客戶端
+        assert mock_command.await_args[0][1] is get_api_client()
+
+    def test_other_message_ignored(self, client, mock_command):
+        """測試非指令訊息不處理"""
+        post_events(client, make_text_event('hello'))
+
+        mock_command.assert_not_called()
+
+
+class TestWebhookDedup:
+    """webhook 事件去重測試"""
+
+    def test_redelivered_event_processed_once(self, client, mock_command):
+        """測試重新傳送的事件只處理一次，並反映在統計中"""
+        post_events(client, make_text_event(event_id='01HEVENTA'))
+        response = post_events(client, make_text_event(event_id='01HEVENTA', is_redelivery=True))
+
+        assert response.status_code == 200
+        assert mock_command.await_count == 1
+
+        stats = client.get('/metrics').get_json()['dedup']
+        assert stats['hits'] == 1
+        assert stats['redeliveries'] == 1
+
+    def test_distinct_events_both_processed(self, client, mock_command):
+        """測試不同事件 ID 都會被處理"""
+        post_events(client, make_text_event(event_id='01HEVENTA'), make_text_event(event_id='01HEVENTB'))
+
+        assert mock_command.await_count == 2
+
+
+class TestMetrics:
+    """/metrics 端點測試"""
+
+    def test_metrics_include_parse_cache(self, client):
+        """測試 /metrics 包含解析快取的命中統計"""
+        stats = client.get('/metrics').get_json()['parse_cache']
+
+        assert set(stats) == {'hits', 'misses', 'hit_rate', 'size'}
+
+
+class TestCacheBackendCheck:
+    """啟動時的快取後端檢查"""
+
+    def test_warns_when_workers_do_not_share_cache(self, mocker, caplog):
+        """測試多個 worker 使用 memory:// 後端時記錄警告，單一程序時不警告"""
+        mocker.patch.object(app_module, 'WEB_CONCURRENCY', 4)
+        with caplog.at_level('WARNING', logger=app_module.logger.name):
+            app_module._check_cache_backend_shared()
+        assert 'CACHE_BACKEND_URL' in caplog.text
+
+        caplog.clear()
+        mocker.patch.object(app_module, 'WEB_CONCURRENCY', 1)
+        with caplog.at_level('WARNING', logger=app_module.logger.name):
+            app_module._check_cache_backend_shared()
+        assert caplog.text == ''
+
+
+class TestReplyCoalescing:
+    """群組指令回覆合併測試"""
+
+    GROUP = {'type': 'group', 'groupId': 'C0123456789abcdef0123456789abcdef',
+             'userId': 'U0123456789abcdef0123456789abcdef'}
+
+    def test_group_storm_replied_once(self, client, mock_command):
+        """測試同一群組短時間內的多則 /aivi 只處理一次，其餘直接確認收到"""
+        events = [make_text_event(event_id=f'01HSTORM{i}', source=self.GROUP, reply_token=f'r{i}')
+                  for i in range(5)]
+
+        response = post_events(client, *events)
+
+        assert response.status_code == 200
+        assert mock_command.await_count == 1
+        stats = client.get('/metrics').get_json()['coalesce']
+        assert stats['replied'] == 1
+        assert stats['suppressed'] == 4
+
+    def test_direct_chats_not_coalesced(self, client, mock_command):
+        """測試一對一聊天的指令不合併"""
+        post_events(client, make_text_event(event_id='01HDIRECTA'), make_text_event(event_id='01HDIRECTB'))
+
+        assert mock_command.await_count == 2
+
+    def test_window_expiry(self, client, mock_command, mocker):
+        """測試超過合併視窗後再次回覆"""
+        mocker.patch.object(app_module.reply_coalescer, 'window', 0.05)
+        post_events(client, make_text_event(event_id='01HWINDOWA', source=self.GROUP))
+        time.sleep(0.06)
+        post_events(client, make_text_event(event_id='01HWINDOWB', source=self.GROUP))
+
+        assert mock_command.await_count == 2
+
+    def test_shed_does_not_claim_window(self, client, mock_command, mocker):
+        """測試第一則指令因負載過高被略過時，同一群組的下一則指令仍會回覆"""
+        mocker.patch.object(app_module.admission_controller, 'evaluate',
+                            side_effect=[app_module.LoadLevel.SHED, app_module.LoadLevel.NORMAL])
+
+        post_events(client, make_text_event(event_id='01HSHEDA', source=self.GROUP, reply_token='ra'),
+                    make_text_event(event_id='01HSHEDB', source=self.GROUP, reply_token='rb'))
+
+        assert mock_command.await_count == 1
+        assert mock_command.await_args[0][0].reply_token == 'rb'
+
+    def test_failed_reply_releases_window(self, client, mock_command):
+        """測試處理失敗時取消記錄，同一群組的下一則指令仍會回覆"""
+        mock_command.side_effect = [RuntimeError('回覆失敗'), None]
+
+        first = post_events(client, make_text_event(event_id='01HFAILA', source=self.GROUP))
+        second = post_events(client, make_text_event(event_id='01HFAILB', source=self.GROUP))
+
+        assert first.status_code == 500
+        assert second.status_code == 200
+        assert mock_command.await_count == 2
+        assert client.get('/metrics').get_json()['coalesce']['replied'] == 1
+
+
+ADMIN_HEADERS = {'Authorization': 'Bearer admin-secret'}
+
+
+@pytest.fixture
+def profiler(mocker, tmp_path):
+    """啟用管理端點，並將分析結果寫到暫存目錄"""
+    mocker.patch.object(app_module, 'ADMIN_TOKEN', 'admin-secret')
+    mocker.patch.object(app_module.request_profiler, 'directory', str(tmp_path))
+    mocker.patch.object(app_module.request_profiler, 'sample_rate', 0)
+    return app_module.request_profiler
+
+
+class TestProfilingAdmin:
+    """效能分析管理端點測試"""
+
+    def test_admin_disabled_without_token(self, client, mocker):
+        """測試未設定 ADMIN_TOKEN 時管理端點不存在"""
+        mocker.patch.object(app_module, 'ADMIN_TOKEN', '')
+
+        assert client.get('/admin/profiles', headers=ADMIN_HEADERS).status_code == 404
+
+    def test_admin_requires_token(self, client, profiler):
+        """測試 token 錯誤時返回 401"""
+        response = client.get('/admin/profiles', headers={'Authorization': 'Bearer wrong'})
+
+        assert response.status_code == 401
+
+    def test_forced_profile_listed_and_downloadable(self, client, mock_command, profiler):
+        """測試帶管理者 token 與 X-Aivi-Profile 的請求被分析，結果可以列出與下載"""
+        post_events(client, make_text_event(), headers={**ADMIN_HEADERS, 'X-Aivi-Profile': '1'})
+
+        listing = client.get('/admin/profiles', headers=ADMIN_HEADERS).get_json()
+        names = [item['name'] for item in listing['profiles']]
+        assert sorted(name.rsplit('.', 1)[1] for name in names) == ['collapsed', 'pstats']
+
+        pstats_name = next(name for name in names if name.endswith('.pstats'))
+        response = client.get(f'/admin/profiles/{pstats_name}', headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        assert len(response.data) > 0
+
+    def test_profile_header_ignored_without_token(self, client, mock_command, profiler):
+        """測試沒有管理者 token 時忽略 X-Aivi-Profile"""
+        post_events(client, make_text_event(), headers={'X-Aivi-Profile': '1'})
+
+        assert profiler.list_profiles() == []
+
+    def test_update_sampling_rate(self, client, profiler):
+        """測試不重新部署即可調整抽樣率"""
+        response = client.post('/admin/profiles/sampling', json={'sample_rate': 10}, headers=ADMIN_HEADERS)
+
+        assert response.get_json() == {'sample_rate': 10}
+        assert profiler.sample_rate == 10
+        bad = client.post('/admin/profiles/sampling', json={'sample_rate': -1}, headers=ADMIN_HEADERS)
+        assert bad.status_code == 400
+
+    def test_download_rejects_unknown_names(self, client, profiler):
+        """測試只能下載輸出目錄中的分析結果"""
+        assert client.get('/admin/profiles/..%2Fapp.py', headers=ADMIN_HEADERS).status_code == 404
+        assert client.get('/admin/profiles/missing.pstats', headers=ADMIN_HEADERS).status_code == 404
+
+
+class TestMemoryAdmin:
+    """記憶體用量管理端點測試"""
+
+    def test_requires_token(self, client, profiler):
+        """測試 token 錯誤時返回 401"""
+        assert client.get('/admin/memory', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    def test_reports_registered_components(self, client, mock_command, profiler):
+        """測試列出各快取的估計用量（webhook 模組載入後包含 http_cache 與 article_enricher）"""
+        report = client.get('/admin/memory', headers=ADMIN_HEADERS).get_json()
+
+        names = {item['name'] for item in report['components']}
+        assert {'parse_cache', 'news_cache', 'event_deduplicator', 'reply_coalescer',
+                'http_cache', 'article_enricher'} <= names
+        assert report['total_bytes'] == sum(item['bytes'] for item in report['components'])
+        assert 'tracemalloc' not in report
+
+    def test_tracemalloc_top_without_tracing(self, client, profiler):
+        """測試未啟用 tracemalloc 時 top=N 返回 null"""
+        report = client.get('/admin/memory?top=5', headers=ADMIN_HEADERS).get_json()
+
+        assert report['tracemalloc'] is None
+        assert client.get('/admin/memory?top=x', headers=ADMIN_HEADERS).status_code == 400
+
+
+class TestAdmissionControl:
+    """負載控制測試"""
+
+    @pytest.fixture
+    def busy_reply(self, mocker):
+        app_module.runtime.ensure_ready()
+        mock = mocker.Mock()
+        mocker.patch.object(app_module.runtime, 'reply_busy', mock)
+        return mock
+
+    def _force_level(self, mocker, level):
+        mocker.patch.object(app_module.admission_controller, 'evaluate', return_value=level)
+
+    def test_cache_only_passed_to_command(self, client, mock_command, mocker):
+        """測試 CACHE_ONLY 時指令處理器只使用快取"""
+        self._force_level(mocker, app_module.LoadLevel.CACHE_ONLY)
+
+        post_events(client, make_text_event())
+
+        assert mock_command.await_args[1] == {'cache_only': True}
+
+    def test_busy_replies_without_running_command(self, client, mock_command, busy_reply, mocker):
+        """測試 BUSY 時回覆忙碌訊息，不執行指令"""
+        self._force_level(mocker, app_module.LoadLevel.BUSY)
+
+        post_events(client, make_text_event())
+
+        mock_command.assert_not_called()
+        assert busy_reply.call_count == 1
+
+    def test_shed_acknowledges_without_reply(self, client, mock_command, busy_reply, mocker):
+        """測試 SHED 時仍回應 200（避免 LINE 重新傳送），但不回覆也不處理"""
+        self._force_level(mocker, app_module.LoadLevel.SHED)
+
+        response = post_events(client, make_text_event())
+
+        assert response.status_code == 200
+        mock_command.assert_not_called()
+        busy_reply.assert_not_called()
+
+    def test_metrics_include_admission(self, client):
+        """測試 /metrics 包含負載等級與訊號"""
+        stats = client.get('/metrics').get_json()['admission']
+
+        assert {'level', 'inflight', 'queue_depth', 'loop_lag', 'transitions', 'decisions'} <= set(stats)
@@ -14,6 +14,7 @@ from src.scrapers.aivi_scraper import (
     AIVI_BASE_URL,
     AIVI_HOMEPAGE_URL,
 )
+from src.scrapers.models import Article, ArticleList
 
 
 class TestParseArticles:
@@ -29,12 +30,12 @@ class TestParseArticles:
         articles = parse_articles(html, max_articles=5)
 
         assert len(articles) == 3
-        assert articles[0]['title'] == 'AI 技術趨勢分析'
-        assert articles[0]['url'] == 'https://www.aivi.fyi/llms/article-1'
-        assert articles[1]['title'] == '機器學習最新發展'
-        assert articles[1]['url'] == 'https://www.aivi.fyi/news/article-2'
-        assert articles[2]['title'] == '深度學習應用案例'
-        assert articles[2]['url'] == 'https://www.aivi.fyi/tech/article-3'
+        assert articles[0].title == 'AI 技術趨勢分析'
+        assert articles[0].url == 'https://www.aivi.fyi/llms/article-1'
+        assert articles[1].title == '機器學習最新發展'
+        assert articles[1].url == 'https://www.aivi.fyi/news/article-2'
+        assert articles[2].title == '深度學習應用案例'
+        assert articles[2].url == 'https://www.aivi.fyi/tech/article-3'
 
     def test_parse_articles_empty(self):
         """測試空 HTML"""
@@ -61,9 +62,9 @@ class TestParseArticles:
 
         assert len(articles) == 2
         # 相對路徑應該被轉換為絕對路徑
-        assert articles[0]['url'] == 'https://www.aivi.fyi/article'
+        assert articles[0].url == 'https://www.aivi.fyi/article'
         # 絕對路徑應該保持不變
-        assert articles[1]['url'] == 'https://www.aivi.fyi/absolute'
+        assert articles[1].url == 'https://www.aivi.fyi/absolute'
 
     def test_parse_articles_max_limit(self):
         """測試最大文章數限制"""
@@ -79,9 +80,9 @@ class TestParseArticles:
         articles = parse_articles(html, max_articles=3)
 
         assert len(articles) == 3
-        assert articles[0]['title'] == '文章 1'
-        assert articles[1]['title'] == '文章 2'
-        assert articles[2]['title'] == '文章 3'
+        assert articles[0].title == '文章 1'
+        assert articles[1].title == '文章 2'
+        assert articles[2].title == '文章 3'
 
     def test_parse_articles_incomplete_data(self):
         """測試不完整的文章資料（缺少標題或連結）"""
@@ -94,7 +95,7 @@ class TestParseArticles:
 
         # 只應該解析到完整的文章
         assert len(articles) == 1
-        assert articles[0]['title'] == '正常文章'
+        assert articles[0].title == '正常文章'
 
     def test_parse_articles_with_whitespace(self):
         """測試標題包含空白字元的處理"""
@@ -105,7 +106,7 @@ class TestParseArticles:
 
         assert len(articles) == 1
         # 應該自動去除前後空白
-        assert articles[0]['title'] == '標題前後有空白'
+        assert articles[0].title == '標題前後有空白'
 
     def test_parse_articles_exception_handling(self, mocker):
         """測試解析時發生未預期的錯誤"""
@@ -134,6 +135,8 @@ class TestScrapeAiviNews:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.text = mock_html
+        mock_response.content = mock_html.encode('utf-8')
+        mock_response.encoding = 'utf-8'
         mock_response.raise_for_status = MagicMock()
 
         mock_get = mocker.patch('httpx.AsyncClient.get', new_callable=AsyncMock)
@@ -143,14 +146,14 @@ class TestScrapeAiviNews:
 
         # 驗證結果
         assert len(articles) == 2
-        assert articles[0]['title'] == '測試文章 1'
-        assert articles[1]['title'] == '測試文章 2'
+        assert articles[0].title == '測試文章 1'
+        assert articles[1].title == '測試文章 2'
 
         # 驗證 HTTP 請求參數
         mock_get.assert_called_once()
         call_args = mock_get.call_args
         assert call_args[0][0] == AIVI_HOMEPAGE_URL
-        assert call_args[1]['timeout'] == 5
+        assert call_args[1]['timeout'] == httpx.Timeout(5, connect=3)
         assert call_args[1]['follow_redirects'] is True
 
     @pytest.mark.asyncio
@@ -167,6 +170,7 @@ class TestScrapeAiviNews:
     @pytest.mark.asyncio
     async def test_scrape_aivi_news_timeout(self, mocker):
         """測試 timeout 錯誤處理（含重試機制）"""
+        mocker.patch('asyncio.sleep', new_callable=AsyncMock)
         mock_get = mocker.patch('httpx.AsyncClient.get', new_callable=AsyncMock)
         # 模擬三次都 timeout（初次 + 2 次重試）
         mock_get.side_effect = httpx.TimeoutException("Request timeout")
@@ -205,8 +209,11 @@ class TestScrapeAiviNews:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.text = mock_html
+        mock_response.content = mock_html.encode('utf-8')
+        mock_response.encoding = 'utf-8'
         mock_response.raise_for_status = MagicMock()
 
+        mocker.patch('asyncio.sleep', new_callable=AsyncMock)
         mock_get = mocker.patch('httpx.AsyncClient.get', new_callable=AsyncMock)
         # 第一次 timeout，第二次成功
         mock_get.side_effect = [
@@ -218,7 +225,7 @@ class TestScrapeAiviNews:
 
         # 應該成功取得文章
         assert len(articles) == 1
-        assert articles[0]['title'] == '重試成功'
+        assert articles[0].title == '重試成功'
         # 應該呼叫 2 次
         assert mock_get.call_count == 2
 
@@ -236,6 +243,8 @@ class TestScrapeAiviNews:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.text = mock_html
+        mock_response.content = mock_html.encode('utf-8')
+        mock_response.encoding = 'utf-8'
         mock_response.raise_for_status = MagicMock()
 
         mock_get = mocker.patch('httpx.AsyncClient.get', new_callable=AsyncMock)
@@ -245,8 +254,8 @@ class TestScrapeAiviNews:
         articles = await scrape_aivi_news(max_articles=2)
 
         assert len(articles) == 2
-        assert articles[0]['title'] == '文章 1'
-        assert articles[1]['title'] == '文章 2'
+        assert articles[0].title == '文章 1'
+        assert articles[1].title == '文章 2'
 
     @pytest.mark.asyncio
     async def test_scrape_aivi_news_unexpected_exception(self, mocker):
@@ -271,12 +280,11 @@ class TestSlowTests:
         articles = await scrape_aivi_news(max_articles=3)
 
         # 驗證基本結構
-        assert isinstance(articles, list)
+        assert isinstance(articles, ArticleList)
 
         # 如果有文章，驗證資料格式
         if len(articles) > 0:
-            assert all('title' in article for article in articles)
-            assert all('url' in article for article in articles)
-            assert all(article['url'].startswith('https://') for article in articles)
-            assert all(AIVI_BASE_URL in article['url'] for article in articles)
-            assert all(len(article['title']) > 0 for article in articles)
+            assert all(isinstance(article, Article) for article in articles)
+            assert all(article.url.startswith('https://') for article in articles)
+            assert all(AIVI_BASE_URL in article.url for article in articles)
+            assert all(len(article.title) > 0 for article in articles)
@@ -0,0 +1,165 @@
+"""文章補充單元測試
+
+測試內頁資料擷取、URL 快取、並行上限，以及補充不阻塞回覆。
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from src.handlers.command_handler import handle_aivi_command, format_news_message
+from src.scrapers.enrichment import ArticleEnricher, article_enricher, extract_metadata
+from src.scrapers.models import Article, ArticleList
+
+ARTICLES = ArticleList([
+    Article('文章 A', 'https://www.aivi.fyi/a'),
+    Article('文章 B', 'https://www.aivi.fyi/b'),
+])
+
+
+class TestExtractMetadata:
+    """測試內頁資料擷取"""
+
+    def test_meta_tags(self):
+        """測試從 meta 標籤擷取日期、摘要與縮圖"""
+        html = '''
+        <meta property="article:published_time" content="2024-05-01T10:00:00+08:00">
+        <meta name="description" content="一段摘要">
+        <meta property="og:image" content="https://www.aivi.fyi/cover.png">
+        '''
+        assert extract_metadata(html) == {
+            'date': '2024-05-01T10:00:00+08:00',
+            'excerpt': '一段摘要',
+            'image': 'https://www.aivi.fyi/cover.png',
+        }
+
+    def test_fallbacks_and_truncation(self):
+        """測試以 <time> 與第一段內文作為備援，並截斷過長的摘要"""
+        html = f'<time datetime="2024-06-01">6 月 1 日</time><article><p>{"長" * 200}</p></article>'
+
+        metadata = extract_metadata(html)
+
+        assert metadata['date'] == '2024-06-01'
+        assert metadata['excerpt'].endswith('…')
+        assert len(metadata['excerpt']) <= 81
+        assert 'image' not in metadata
+
+    def test_empty_page(self):
+        """測試沒有任何資料的頁面"""
+        assert extract_metadata('<html></html>') == {}
+
+
+class TestArticleEnricher:
+    """測試 ArticleEnricher"""
+
+    @pytest.mark.asyncio
+    async def test_enrich_and_apply(self, mocker):
+        """測試補充後 apply 會合併快取資料，且每個 URL 只抓一次"""
+        mock_fetch = mocker.patch('src.scrapers.enrichment.fetch_page', new_callable=AsyncMock)
+        mock_fetch.return_value = '<meta property="article:published_time" content="2024-01-02">'
+        enricher = ArticleEnricher()
+
+        await enricher.enrich_urls([a.url for a in ARTICLES])
+
+        enriched = enricher.apply(ARTICLES)
+        assert enriched[0].date == '2024-01-02'
+        assert enriched[1].title == '文章 B'
+        assert enricher.missing(ARTICLES) == []
+        assert mock_fetch.call_count == 2
+        # 內頁不使用條件式請求快取
+        assert mock_fetch.call_args[1]['conditional'] is False
+
+    @pytest.mark.asyncio
+    async def test_failed_fetch_not_cached(self, mocker):
+        """測試抓取失敗時不寫入快取，之後可以重新嘗試"""
+        mocker.patch('src.scrapers.enrichment.fetch_page', new_callable=AsyncMock, return_value=None)
+        enricher = ArticleEnricher()
+
+        await enricher.enrich_urls(['https://www.aivi.fyi/a'])
+
+        assert enricher.missing(ARTICLES[:1]) == ['https://www.aivi.fyi/a']
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded(self, mocker):
+        """測試同時抓取的內頁數量不超過上限"""
+        active = {'now': 0, 'max': 0}
+
+        async def fake_fetch(url, policy=None, conditional=True):
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+            await asyncio.sleep(0.01)
+            active['now'] -= 1
+            return '<p>內容</p>'
+
+        mocker.patch('src.scrapers.enrichment.fetch_page', side_effect=fake_fetch)
+        enricher = ArticleEnricher(concurrency=2)
+
+        await enricher.enrich_urls([f'https://www.aivi.fyi/{i}' for i in range(6)])
+
+        assert active['max'] == 2
+
+    @pytest.mark.asyncio
+    async def test_cache_bounded(self, mocker):
+        """測試補充資料超過上限時淘汰最早補充的文章"""
+        mocker.patch('src.scrapers.enrichment.fetch_page', new_callable=AsyncMock, return_value='<p>內容</p>')
+        enricher = ArticleEnricher(max_entries=2)
+
+        await enricher.enrich_urls([f'https://www.aivi.fyi/{i}' for i in range(3)])
+        enricher.load({'https://www.aivi.fyi/old': {'date': '2020-01-01'}})
+
+        assert enricher.get('https://www.aivi.fyi/0') is None
+        assert enricher.get('https://www.aivi.fyi/1') is None
+        assert enricher.get('https://www.aivi.fyi/2') is not None
+        assert enricher.get('https://www.aivi.fyi/old') is not None
+
+    def test_schedule_skips_pending_urls(self, mocker):
+        """測試已排程的 URL 不會重複排程"""
+        mock_background = mocker.patch('src.scrapers.enrichment.run_in_background')
+        enricher = ArticleEnricher()
+
+        enricher.schedule(ARTICLES)
+        enricher.schedule(ARTICLES)
+
+        assert mock_background.call_count == 1
+        mock_background.call_args[0][0].close()
+
+
+class TestEnrichedReply:
+    """測試補充資料與回覆的整合"""
+
+    def test_format_includes_date_and_excerpt(self):
+        """測試格式化訊息包含日期與摘要"""
+        message = format_news_message([
+            Article('文章 A', 'https://www.aivi.fyi/a',
+                    date='2024-05-01T10:00:00+08:00', excerpt='摘要'),
+        ])
+
+        assert '📅 2024-05-01' in message
+        assert '📝 摘要' in message
+
+    @pytest.mark.asyncio
+    async def test_reply_not_blocked_by_enrichment(self, mocker):
+        """測試回覆不等待補充：已補充的文章附上日期，其餘維持標題 + 連結"""
+        mocker.patch('src.handlers.command_handler.ENRICHMENT_ENABLED', True)
+        mock_line_bot_api = Mock()
+        mocker.patch('src.handlers.command_handler.MessagingApi', return_value=mock_line_bot_api)
+        mocker.patch('src.handlers.command_handler.scrape_sources', new_callable=AsyncMock, return_value=ARTICLES)
+        mock_background = mocker.patch('src.scrapers.enrichment.run_in_background')
+        article_enricher.load({'https://www.aivi.fyi/a': {'date': '2024-05-01'}})
+
+        mock_api_client = Mock()
+        mock_api_client.__enter__ = Mock(return_value=mock_api_client)
+        mock_api_client.__exit__ = Mock(return_value=False)
+        mock_event = Mock()
+        mock_event.reply_token = 'test_token'
+        await handle_aivi_command(mock_event, mock_api_client)
+
+        message_text = mock_line_bot_api.reply_message.call_args[0][0].messages[0].text
+        assert '📅 2024-05-01' in message_text
+        assert '文章 B' in message_text
+        assert mock_background.call_count == 1
+        # 只有尚未補充的文章被排程
+        assert article_enricher.missing(ARTICLES) == []
+        assert article_enricher.get('https://www.aivi.fyi/b') is None
+        mock_background.call_args[0][0].close()
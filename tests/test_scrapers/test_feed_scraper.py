@@ -0,0 +1,177 @@
+"""RSS / Atom feed 爬蟲單元測試
+
+測試串流解析、提早停止、日期與摘要擷取，以及 feed 失敗時改用 HTML 首頁。
+"""
+
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+
+from src.scrapers import feed_scraper
+from src.scrapers.aivi_scraper import AIVI_HOMEPAGE_URL
+from src.scrapers.feed_scraper import AIVI_FEED_SOURCE_NAME, AIVI_FEED_URL, parse_feed
+from src.scrapers.models import Article
+from src.scrapers.registry import scrape_sources
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+ATOM_FEED = '''<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>AIVI</title>
+  <entry>
+    <title type="html">第一篇 &amp; 測試</title>
+    <link href="https://www.aivi.fyi/llms/first" rel="alternate" type="text/html"/>
+    <published>2024-05-02T10:00:00+08:00</published>
+    <summary type="html">&lt;p&gt;第一篇的&lt;b&gt;摘要&lt;/b&gt;&lt;/p&gt;</summary>
+  </entry>
+  <entry>
+    <title>第二篇</title>
+    <link href="https://www.aivi.fyi/llms/second" rel="alternate"/>
+    <updated>2024-05-01T10:00:00+08:00</updated>
+    <content type="html">內文</content>
+  </entry>
+</feed>'''
+
+RSS_FEED = '''<?xml version="1.0"?>
+<rss version="2.0"><channel><title>AIVI</title>
+  <item>
+    <title>RSS 文章</title>
+    <link>https://www.aivi.fyi/rss-article</link>
+    <pubDate>Wed, 01 May 2024 02:00:00 GMT</pubDate>
+    <description>RSS 摘要</description>
+  </item>
+</channel></rss>'''
+
+HOMEPAGE_HTML = '<h2 class="archive__item-title"><a href="/from-html">HTML 文章</a></h2>'
+
+
+class TestParseFeed:
+    """測試 parse_feed"""
+
+    def test_atom(self):
+        """測試 Atom feed：標題、連結、日期與去除 HTML 的摘要"""
+        articles = parse_feed(ATOM_FEED)
+
+        assert articles == [
+            Article('第一篇 & 測試', 'https://www.aivi.fyi/llms/first',
+                    date='2024-05-02T10:00:00+08:00', excerpt='第一篇的 摘要'),
+            Article('第二篇', 'https://www.aivi.fyi/llms/second',
+                    date='2024-05-01T10:00:00+08:00', excerpt='內文'),
+        ]
+
+    def test_rss(self):
+        """測試 RSS 2.0 feed 與 RFC 822 日期轉換"""
+        assert parse_feed(RSS_FEED) == [
+            Article('RSS 文章', 'https://www.aivi.fyi/rss-article',
+                    date='2024-05-01T02:00:00+00:00', excerpt='RSS 摘要'),
+        ]
+
+    def test_stops_after_max_articles(self, mocker):
+        """測試取得足夠的文章後停止，不解析後面的內容"""
+        mocker.patch.object(feed_scraper, 'FEED_CHUNK_SIZE', 64)
+        entry = '<entry><title>T{0}</title><link href="https://x/{0}"/></entry>'
+        # 第三篇之後是不合法的 XML；若繼續解析就會失敗
+        xml = '<feed xmlns="http://www.w3.org/2005/Atom">' + ''.join(entry.format(i) for i in range(3)) + '<broken'
+
+        articles = parse_feed(xml, max_articles=2)
+
+        assert [a.title for a in articles] == ['T0', 'T1']
+
+    def test_not_a_feed(self):
+        """測試 HTML 或不合法的內容返回空清單"""
+        assert parse_feed(HOMEPAGE_HTML) == []
+        assert parse_feed('<html><body><p>hi</p></body></html>') == []
+        assert parse_feed('') == []
+
+
+    def test_non_feed_xml_with_items_rejected(self):
+        """測試根元素不是 feed 的 XML 即使含有足夠的 <item> 也不接受"""
+        items = ''.join(f'<item><title>T{i}</title><link>https://x/{i}</link></item>' for i in range(5))
+        document = f'<?xml version="1.0"?><sitemap>{items}</sitemap>'
+
+        assert parse_feed(document, max_articles=2) == []
+        assert parse_feed(document, max_articles=10) == []
+
+
+    def test_parser_does_not_import_enrichment(self):
+        """測試 feed 解析器（解析子程序會載入）不依賴文章補充模組"""
+        code = "import sys, src.scrapers.feed_scraper; print('src.scrapers.enrichment' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, timeout=60)
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == 'False'
+
+
+class TestFeedSource:
+    """測試 feed 來源與 HTML fallback"""
+
+    @pytest.mark.asyncio
+    async def test_feed_used_when_available(self, mocker):
+        """測試 feed 可用時只抓取 feed"""
+        mock_fetch = mocker.patch('src.scrapers.registry.fetch_page', new_callable=AsyncMock, return_value=ATOM_FEED)
+
+        articles = await scrape_sources([AIVI_FEED_SOURCE_NAME], max_articles=5)
+
+        assert [a.title for a in articles] == ['第一篇 & 測試', '第二篇']
+        assert [call.args[0] for call in mock_fetch.call_args_list] == [AIVI_FEED_URL]
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_html(self, mocker):
+        """測試 feed 抓取失敗時改用 HTML 首頁"""
+        async def fake_fetch(url, policy=None, raw=False):
+            if url == AIVI_FEED_URL:
+                return None
+            return HOMEPAGE_HTML
+
+        mocker.patch('src.scrapers.registry.fetch_page', side_effect=fake_fetch)
+
+        articles = await scrape_sources([AIVI_FEED_SOURCE_NAME], max_articles=5)
+
+        assert articles == [Article('HTML 文章', 'https://www.aivi.fyi/from-html')]
+
+    @pytest.mark.asyncio
+    async def test_fallback_within_budget(self, mocker):
+        """測試 feed 只嘗試一次，且 feed 與 HTML 首頁共用時間預算"""
+        policies = {}
+
+        async def fake_fetch(url, policy=None, raw=False):
+            policies[url] = policy
+            if url == AIVI_FEED_URL:
+                await asyncio.sleep(0.05)
+                return None
+            await asyncio.sleep(10)
+            return HOMEPAGE_HTML
+
+        mocker.patch('src.scrapers.registry.fetch_page', side_effect=fake_fetch)
+        mocker.patch('src.scrapers.registry.SCRAPE_BUDGET', 0.2)
+
+        started = time.monotonic()
+        articles = await scrape_sources([AIVI_FEED_SOURCE_NAME], max_articles=5)
+
+        assert time.monotonic() - started < 1
+        assert articles == []
+        assert policies[AIVI_FEED_URL].max_retries == 0
+        assert policies[AIVI_HOMEPAGE_URL].max_retries > 0
+
+    @pytest.mark.asyncio
+    async def test_html_response_falls_back(self, mocker):
+        """測試 feed 回傳 HTML（例如 404 頁面）時改用首頁"""
+        request = httpx.Request('GET', AIVI_FEED_URL)
+
+        async def fake_get(url, **kwargs):
+            if url == AIVI_FEED_URL:
+                return httpx.Response(200, text='<html>Not found</html>', request=request)
+            return httpx.Response(200, text=HOMEPAGE_HTML, request=httpx.Request('GET', AIVI_HOMEPAGE_URL))
+
+        mocker.patch('httpx.AsyncClient.get', side_effect=fake_get)
+
+        articles = await scrape_sources([AIVI_FEED_SOURCE_NAME], max_articles=5)
+
+        assert [a.title for a in articles] == ['HTML 文章']
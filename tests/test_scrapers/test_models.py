@@ -0,0 +1,75 @@
+"""文章資料型別單元測試
+
+測試 Article 的補充欄位與序列化，以及 ArticleList 的內容指紋。
+"""
+
+import sys
+
+import pytest
+
+from src.scrapers.models import Article, ArticleList
+
+
+class TestArticle:
+    """測試 Article"""
+
+    def test_immutable_and_hashable(self):
+        """測試文章不可變，且相同內容的文章相等、雜湊值相同"""
+        a = Article('A', 'https://x/a')
+        b = Article('A', 'https://x/a')
+
+        assert a == b
+        assert len({a, b}) == 1
+        with pytest.raises(AttributeError):
+            a.title = 'B'
+
+    def test_uses_slots(self):
+        """測試文章使用 __slots__，不帶 __dict__，比 dict 佔用更少記憶體"""
+        article = Article('A', 'https://x/a')
+
+        assert not hasattr(article, '__dict__')
+        assert sys.getsizeof(article) < sys.getsizeof({'title': 'A', 'url': 'https://x/a'})
+
+    def test_with_metadata_and_roundtrip(self):
+        """測試補充欄位與 dict 互轉"""
+        article = Article('A', 'https://x/a').with_metadata({'date': '2024-01-01', 'excerpt': '', 'other': 'x'})
+
+        assert article.date == '2024-01-01'
+        assert article.excerpt is None
+        assert article.to_dict() == {'title': 'A', 'url': 'https://x/a', 'date': '2024-01-01'}
+        assert Article.from_dict(article.to_dict()) == article
+
+
+class TestArticleList:
+    """測試 ArticleList"""
+
+    def test_fingerprint_tracks_content(self):
+        """測試內容相同時指紋相同，任何欄位改變時指紋不同"""
+        base = ArticleList([Article('A', 'https://x/a'), Article('B', 'https://x/b')])
+        same = ArticleList([Article('A', 'https://x/a'), Article('B', 'https://x/b')])
+        reordered = ArticleList([Article('B', 'https://x/b'), Article('A', 'https://x/a')])
+        enriched = ArticleList([Article('A', 'https://x/a', date='2024-01-01'), Article('B', 'https://x/b')])
+
+        assert base.fingerprint == same.fingerprint
+        assert base == same and hash(base) == hash(same)
+        assert base.fingerprint != reordered.fingerprint
+        assert base != enriched
+
+    def test_field_boundaries_in_fingerprint(self):
+        """測試欄位邊界不會造成指紋碰撞"""
+        assert ArticleList([Article('ab', 'c')]).fingerprint != ArticleList([Article('a', 'bc')]).fingerprint
+
+    def test_behaves_like_sequence(self):
+        """測試切片返回 ArticleList，且可以與 list 比較"""
+        articles = ArticleList([Article(str(i), f'https://x/{i}') for i in range(5)])
+
+        assert isinstance(articles[:2], ArticleList)
+        assert len(articles[:2]) == 2
+        assert ArticleList() == []
+        assert articles[:1] == [Article('0', 'https://x/0')]
+
+    def test_dicts_roundtrip(self):
+        """測試與 JSON 相容的 dict 清單互轉"""
+        articles = ArticleList([Article('A', 'https://x/a', excerpt='摘要')])
+
+        assert ArticleList.from_dicts(articles.to_dicts()) == articles
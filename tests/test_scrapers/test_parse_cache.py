@@ -0,0 +1,93 @@
+"""解析結果快取單元測試
+
+測試內容相同時略過解析、LRU 淘汰，以及首頁未變時不重新解析。
+"""
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from src.scrapers import aivi_scraper
+from src.scrapers.aivi_scraper import scrape_aivi_news
+from src.scrapers.models import Article, ArticleList
+from src.scrapers.parse_cache import ParseCache, parse_cache
+
+HTML_A = '<h2 class="archive__item-title"><a href="/a">文章 A</a></h2>'
+HTML_B = '<h2 class="archive__item-title"><a href="/b">文章 B</a></h2>'
+
+
+def _parser():
+    return Mock(side_effect=lambda html, n: ArticleList([Article(html, 'https://x/')]))
+
+
+class TestParseCache:
+    """測試 ParseCache"""
+
+    def test_identical_content_skips_parse(self):
+        """測試相同內容只解析一次，不同內容重新解析"""
+        cache = ParseCache()
+        parser = _parser()
+
+        first = cache.get_or_parse('aivi', HTML_A, 5, parser)
+        second = cache.get_or_parse('aivi', HTML_A, 5, parser)
+        cache.get_or_parse('aivi', HTML_B, 5, parser)
+
+        assert second is first
+        assert parser.call_count == 2
+        assert cache.stats() == {'hits': 1, 'misses': 2, 'hit_rate': 0.3333, 'size': 2}
+
+    def test_key_includes_source_and_limit(self):
+        """測試不同來源或不同文章數量不共用結果"""
+        cache = ParseCache()
+        parser = _parser()
+
+        cache.get_or_parse('aivi', HTML_A, 5, parser)
+        cache.get_or_parse('other', HTML_A, 5, parser)
+        cache.get_or_parse('aivi', HTML_A, 3, parser)
+
+        assert parser.call_count == 3
+
+    def test_lru_eviction(self):
+        """測試超過上限時淘汰最久未使用的結果"""
+        cache = ParseCache(max_entries=2)
+        parser = _parser()
+
+        cache.get_or_parse('aivi', 'a', 5, parser)
+        cache.get_or_parse('aivi', 'b', 5, parser)
+        cache.get_or_parse('aivi', 'a', 5, parser)  # a 變成最近使用
+        cache.get_or_parse('aivi', 'c', 5, parser)  # 淘汰 b
+        cache.get_or_parse('aivi', 'a', 5, parser)
+        cache.get_or_parse('aivi', 'b', 5, parser)
+
+        assert [call.args[0] for call in parser.call_args_list] == ['a', 'b', 'c', 'b']
+
+    def test_empty_result_not_cached(self):
+        """測試空結果（可能是暫時的解析失敗）不快取"""
+        cache = ParseCache()
+        parser = Mock(return_value=ArticleList())
+
+        cache.get_or_parse('aivi', HTML_A, 5, parser)
+        cache.get_or_parse('aivi', HTML_A, 5, parser)
+
+        assert parser.call_count == 2
+
+
+class TestUnchangedHomepage:
+    """測試首頁內容未變時（來源不支援 ETag）不重新解析"""
+
+    @pytest.mark.asyncio
+    async def test_same_body_parsed_once(self, mocker):
+        request = httpx.Request('GET', aivi_scraper.AIVI_HOMEPAGE_URL)
+        mocker.patch(
+            'httpx.AsyncClient.get',
+            new_callable=AsyncMock,
+            side_effect=lambda *args, **kwargs: httpx.Response(200, text=HTML_A, request=request),
+        )
+        spy = mocker.spy(aivi_scraper, 'parse_articles')
+
+        first = await scrape_aivi_news()
+        second = await scrape_aivi_news()
+
+        assert first == second == [Article('文章 A', 'https://www.aivi.fyi/a')]
+        assert spy.call_count == 1
+        assert parse_cache.stats()['hits'] == 1
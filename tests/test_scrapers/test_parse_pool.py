@@ -0,0 +1,156 @@
+"""解析子程序單元測試
+
+測試小文件在原程序解析、大型文件交給子程序解析，
+以及子程序無法使用時改在原程序解析。
+"""
+
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from src.scrapers.aivi_scraper import parse_articles
+from src.scrapers.models import ArticleList
+from src.scrapers.parse_cache import ParseCache
+from src.scrapers.parse_pool import ParsePool
+
+ITEM = '<h2 class="archive__item-title"><a href="/post-{i}">文章 {i}</a></h2>'
+LARGE_HTML = '<html><body>' + ''.join(ITEM.format(i=i) for i in range(200)) + '</body></html>'
+
+
+def _parse_pid(html, max_articles):
+    """回傳執行解析的程序 ID（以文章標題表示）"""
+    from src.scrapers.models import Article
+    return ArticleList([Article(str(os.getpid()), 'https://x/pid')])
+
+
+def _parse_fail(html, max_articles):
+    """只在子程序中失敗的解析函式"""
+    if os.getpid() != PARENT_PID:
+        raise ValueError('解析失敗')
+    return parse_articles(html, max_articles)
+
+
+PARENT_PID = os.getpid()
+
+
+@pytest.fixture
+def pool():
+    pool = ParsePool(size=1, threshold=1024)
+    yield pool
+    pool.shutdown()
+
+
+class TestParsePool:
+    """ParsePool 測試"""
+
+    @pytest.mark.asyncio
+    async def test_small_document_parsed_inline(self, pool):
+        """測試小於門檻的文件在原程序解析，不啟動子程序"""
+        articles = await pool.parse(_parse_pid, '<html></html>', 5)
+
+        assert articles[0].title == str(os.getpid())
+        assert pool.stats()['inline'] == 1
+        assert pool._executor is None
+
+    @pytest.mark.asyncio
+    async def test_large_document_offloaded(self, pool):
+        """測試大型文件在子程序解析，結果與原程序解析相同"""
+        for future in pool.start():
+            future.result(timeout=60)
+
+        pid_articles = await pool.parse(_parse_pid, LARGE_HTML, 5)
+        articles = await pool.parse(parse_articles, LARGE_HTML, 5)
+
+        assert pid_articles[0].title != str(os.getpid())
+        assert articles == parse_articles(LARGE_HTML, 5)
+        assert isinstance(articles, ArticleList)
+        assert articles.fingerprint == parse_articles(LARGE_HTML, 5).fingerprint
+        assert pool.stats()['offloaded'] == 2
+
+    @pytest.mark.asyncio
+    async def test_bytes_passed_to_worker(self, pool):
+        """測試 UTF-8 bytes 直接交給子程序解析，結果與字串相同"""
+        articles = await pool.parse(parse_articles, LARGE_HTML.encode('utf-8'), 5)
+
+        assert articles == parse_articles(LARGE_HTML, 5)
+        assert pool.stats()['offloaded'] == 1
+
+    @pytest.mark.asyncio
+    async def test_small_bytes_decoded_inline(self, pool):
+        """測試小於門檻的 bytes 在原程序解碼後解析"""
+        html = ITEM.format(i=1).encode('utf-8')
+
+        articles = await pool.parse(parse_articles, html, 5)
+
+        assert articles[0].title == '文章 1'
+        assert pool._executor is None
+
+    @pytest.mark.asyncio
+    async def test_parser_error_keeps_workers(self, pool):
+        """測試解析函式在子程序拋出例外時改在原程序解析，不重建子程序"""
+        for future in pool.start():
+            future.result(timeout=60)
+        executor = pool._executor
+
+        articles = await pool.parse(_parse_fail, LARGE_HTML, 3)
+
+        assert len(articles) == 3
+        assert pool._executor is executor
+
+    @pytest.mark.asyncio
+    async def test_broken_pool_resets_executor(self, pool, mocker):
+        """測試子程序異常終止時重建子程序並改在原程序解析"""
+        for future in pool.start():
+            future.result(timeout=60)
+        executor = pool._executor
+        mocker.patch.object(executor, 'submit', side_effect=BrokenProcessPool('子程序已終止'))
+
+        articles = await pool.parse(parse_articles, LARGE_HTML, 3)
+
+        assert len(articles) == 3
+        assert pool._executor is None
+
+    @pytest.mark.asyncio
+    async def test_unpicklable_parser_falls_back_inline(self, pool):
+        """測試解析函式無法傳給子程序時改在原程序解析"""
+        articles = await pool.parse(lambda html, n: parse_articles(html, n), LARGE_HTML, 3)
+
+        assert len(articles) == 3
+
+    @pytest.mark.asyncio
+    async def test_disabled_pool_never_offloads(self):
+        """測試 size=0 時全部在原程序解析"""
+        pool = ParsePool(size=0, threshold=1)
+
+        assert pool.start() == []
+        assert len(await pool.parse(parse_articles, LARGE_HTML, 5)) == 5
+        assert pool.stats()['offloaded'] == 0
+
+
+class TestParseCacheAsync:
+    """ParseCache.get_or_parse_async 測試"""
+
+    @pytest.mark.asyncio
+    async def test_cached_result_skips_pool(self, mocker):
+        """測試命中快取時不再解析"""
+        cache = ParseCache(max_entries=4)
+        parser = mocker.Mock(side_effect=parse_articles)
+
+        first = await cache.get_or_parse_async('aivi', LARGE_HTML, 5, parser)
+        second = await cache.get_or_parse_async('aivi', LARGE_HTML, 5, parser)
+
+        assert second is first
+        assert parser.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_bytes_and_text_share_entry(self, mocker):
+        """測試相同內容的 bytes 與字串命中同一筆快取"""
+        cache = ParseCache(max_entries=4)
+        parser = mocker.Mock(side_effect=parse_articles)
+
+        first = await cache.get_or_parse_async('aivi', LARGE_HTML.encode('utf-8'), 5, parser)
+        second = await cache.get_or_parse_async('aivi', LARGE_HTML, 5, parser)
+
+        assert second is first
+        assert parser.call_count == 1
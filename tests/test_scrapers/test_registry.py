@@ -0,0 +1,196 @@
+"""爬蟲來源註冊表單元測試
+
+測試來源註冊、並行抓取、合併去重與日期排序。
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.scrapers import registry
+from src.scrapers.models import Article
+from src.scrapers.registry import (
+    ScraperSource,
+    freshness_ttl,
+    get_source,
+    merge_articles,
+    register_source,
+    scrape_sources,
+)
+
+
+@pytest.fixture
+def temp_sources():
+    """在測試中註冊暫時的來源，結束後還原"""
+    saved = dict(registry._sources)
+    yield
+    registry._sources.clear()
+    registry._sources.update(saved)
+
+
+def _fake_fetch(pages, delay=0.0, active=None):
+    """建立模擬的 fetch_page：依 URL 返回內容，可模擬延遲並記錄同時進行的數量"""
+    async def fetch(url, policy=None, raw=False):
+        if active is not None:
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+        try:
+            await asyncio.sleep(delay)
+            page = pages.get(url)
+            return page.encode('utf-8') if raw and page is not None else page
+        finally:
+            if active is not None:
+                active['now'] -= 1
+    return fetch
+
+
+class TestScraperSource:
+    """測試來源設定"""
+
+    def test_requires_selector_or_parser(self):
+        """測試未提供 selector 與 parser 時拋出錯誤"""
+        with pytest.raises(ValueError):
+            ScraperSource(name='bad', url='https://example.com/')
+
+    def test_selector_parse_resolves_relative_urls(self):
+        """測試以 selector 解析並轉換相對路徑"""
+        source = ScraperSource(name='demo', url='https://example.com/blog/', selector='h2 > a')
+        html = '<h2><a href="post-1">文章 1</a></h2><h2><a href="">缺 URL</a></h2><h2><a href="/p2">文章 2</a></h2>'
+
+        assert source.parse(html, 5) == [
+            Article('文章 1', 'https://example.com/blog/post-1'),
+            Article('文章 2', 'https://example.com/p2'),
+        ]
+
+    def test_aivi_source_registered(self):
+        """測試 AIVI 來源已註冊"""
+        source = get_source('aivi')
+
+        assert source.url == 'https://www.aivi.fyi/'
+        assert source.parser is not None
+
+    def test_unknown_source(self):
+        """測試取得未註冊的來源"""
+        with pytest.raises(KeyError):
+            get_source('does-not-exist')
+
+    def test_freshness_ttl_uses_shortest(self, temp_sources):
+        """測試多個來源的新鮮期取最短者"""
+        register_source(ScraperSource(name='a', url='https://a/', selector='a', freshness_ttl=600))
+        register_source(ScraperSource(name='b', url='https://b/', selector='a', freshness_ttl=60))
+
+        assert freshness_ttl(['a', 'b']) == 60
+
+
+class TestMergeArticles:
+    """測試合併邏輯"""
+
+    def test_dedup_by_url_first_source_wins(self):
+        """測試依 URL 去除重複，先出現的來源優先"""
+        merged = merge_articles([
+            [Article('來源 A', 'https://x/1')],
+            [Article('來源 B', 'https://x/1#comments'), Article('其他', 'https://x/2')],
+        ])
+
+        assert [a.title for a in merged] == ['來源 A', '其他']
+
+    def test_sort_by_date_descending(self):
+        """測試依日期由新到舊排序，沒有日期的排在最後"""
+        merged = merge_articles([[
+            Article('無日期', 'https://x/0'),
+            Article('舊', 'https://x/1', date='2024-01-01T00:00:00Z'),
+            Article('新', 'https://x/2', date='2024-03-01T08:00:00+08:00'),
+        ]])
+
+        assert [a.title for a in merged] == ['新', '舊', '無日期']
+
+
+class TestScrapeSources:
+    """測試並行抓取"""
+
+    @pytest.mark.asyncio
+    async def test_sources_fetched_concurrently(self, mocker, temp_sources):
+        """測試多個來源並行抓取，總時間接近最慢的來源"""
+        pages = {
+            f'https://s{i}/': f'<h2><a href="/{i}">文章 {i}</a></h2>' for i in range(3)
+        }
+        for i in range(3):
+            register_source(ScraperSource(name=f's{i}', url=f'https://s{i}/', selector='h2 > a'))
+        mocker.patch('src.scrapers.registry.fetch_page', side_effect=_fake_fetch(pages, delay=0.2))
+
+        started = time.perf_counter()
+        articles = await scrape_sources(['s0', 's1', 's2'], max_articles=5)
+        elapsed = time.perf_counter() - started
+
+        assert [a.title for a in articles] == ['文章 0', '文章 1', '文章 2']
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self, mocker, temp_sources):
+        """測試同時抓取的數量不超過上限"""
+        mocker.patch.object(registry, '_fetch_slots', threading.BoundedSemaphore(2))
+        active = {'now': 0, 'max': 0}
+        for i in range(5):
+            register_source(ScraperSource(name=f'c{i}', url=f'https://c{i}/', selector='a'))
+        mocker.patch('src.scrapers.registry.fetch_page', side_effect=_fake_fetch({}, delay=0.01, active=active))
+
+        await scrape_sources([f'c{i}' for i in range(5)])
+
+        assert active['max'] == 2
+
+    def test_concurrency_cap_across_event_loops(self, mocker, temp_sources):
+        """測試上限由整個程序共用：兩個請求各自 asyncio.run 時仍不超過上限"""
+        mocker.patch.object(registry, '_fetch_slots', threading.BoundedSemaphore(1))
+        active = {'now': 0, 'max': 0}
+        for i in range(2):
+            register_source(ScraperSource(name=f'l{i}', url=f'https://l{i}/', selector='a'))
+        mocker.patch('src.scrapers.registry.fetch_page', side_effect=_fake_fetch({}, delay=0.05, active=active))
+
+        threads = [
+            threading.Thread(target=asyncio.run, args=(scrape_sources([f'l{i}']),))
+            for i in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        assert active['max'] == 1
+        assert registry._fetch_slots.acquire(blocking=False)
+
+    def test_saturated_slots_respect_deadline(self, mocker, temp_sources):
+        """測試名額用盡時等待的請求在期限到時結束，asyncio.run 不會卡在等待名額的執行緒"""
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        mocker.patch.object(registry, '_fetch_slots', slots)
+        mocker.patch.object(registry, 'SCRAPE_BUDGET', 0.2)
+        register_source(ScraperSource(name='busy', url='https://busy/', selector='a'))
+        mock_fetch = mocker.patch('src.scrapers.registry.fetch_page', side_effect=_fake_fetch({}))
+
+        started = time.monotonic()
+        articles = asyncio.run(scrape_sources(['busy']))
+
+        assert time.monotonic() - started < 1
+        assert articles == []
+        mock_fetch.assert_not_called()
+        slots.release()
+        assert slots.acquire(blocking=False)
+
+    @pytest.mark.asyncio
+    async def test_failed_source_does_not_fail_command(self, mocker, temp_sources):
+        """測試單一來源失敗或拋出異常時，其他來源的結果仍會返回"""
+        register_source(ScraperSource(name='ok', url='https://ok/', selector='a'))
+        register_source(ScraperSource(name='down', url='https://down/', selector='a'))
+
+        def broken(html, max_articles):
+            raise RuntimeError('parser bug')
+        register_source(ScraperSource(name='broken', url='https://broken/', parser=broken))
+
+        pages = {'https://ok/': '<a href="/x">正常</a>', 'https://broken/': '<html/>'}
+        mocker.patch('src.scrapers.registry.fetch_page', side_effect=_fake_fetch(pages))
+
+        articles = await scrape_sources(['down', 'broken', 'ok'])
+
+        assert [a.title for a in articles] == ['正常']
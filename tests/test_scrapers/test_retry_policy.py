@@ -0,0 +1,193 @@
+"""爬蟲重試策略單元測試
+
+測試指數退避、Retry-After 解析、5xx/429 重試與 hedged request。
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+
+from src.scrapers import aivi_scraper, fetcher
+from src.scrapers.aivi_scraper import scrape_aivi_news
+from src.scrapers.retry_policy import LatencyTracker, RetryPolicy
+
+
+def _make_response(status_code, text='', headers=None):
+    """建立模擬的 HTTP 回應"""
+    return httpx.Response(
+        status_code,
+        text=text,
+        headers=headers or {},
+        request=httpx.Request('GET', aivi_scraper.AIVI_HOMEPAGE_URL),
+    )
+
+
+class TestRetryPolicy:
+    """測試 RetryPolicy 的計算邏輯"""
+
+    def test_backoff_delay_full_jitter_bounds(self):
+        """測試退避時間介於 0 與指數上限之間，且不超過 max_delay"""
+        policy = RetryPolicy(base_delay=0.5, max_delay=3.0)
+
+        assert policy.backoff_delay(0, rand=lambda: 0.999) < 0.5
+        assert policy.backoff_delay(2, rand=lambda: 0.5) == pytest.approx(1.0)
+        assert policy.backoff_delay(10, rand=lambda: 1.0) == 3.0
+        assert policy.backoff_delay(3, rand=lambda: 0.0) == 0.0
+
+    def test_timeout_separates_connect_and_read(self):
+        """測試連線與讀取 timeout 分開設定"""
+        timeout = RetryPolicy(connect_timeout=1.5, read_timeout=4).timeout()
+
+        assert timeout.connect == 1.5
+        assert timeout.read == 4
+
+    def test_retry_after_seconds(self):
+        """測試 Retry-After 為秒數"""
+        policy = RetryPolicy(max_delay=10)
+
+        assert policy.retry_after_delay(_make_response(503, headers={'Retry-After': '2'})) == 2.0
+        # 超過 max_delay 時被限制
+        assert policy.retry_after_delay(_make_response(429, headers={'Retry-After': '120'})) == 10
+
+    def test_retry_after_http_date(self):
+        """測試 Retry-After 為 HTTP-date"""
+        policy = RetryPolicy(max_delay=60)
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+        response = _make_response(503, headers={'Retry-After': format_datetime(retry_at, usegmt=True)})
+
+        assert 25 <= policy.retry_after_delay(response) <= 30
+
+    def test_retry_after_missing_or_invalid(self):
+        """測試沒有或無法解析的 Retry-After"""
+        policy = RetryPolicy()
+
+        assert policy.retry_after_delay(_make_response(503)) is None
+        assert policy.retry_after_delay(_make_response(503, headers={'Retry-After': 'soon'})) is None
+
+    def test_hedge_defaults_from_env(self, monkeypatch):
+        """測試預設策略依 HEDGE_REQUESTS / HEDGE_QUANTILE 啟用 hedged request"""
+        monkeypatch.setenv('HEDGE_REQUESTS', '1')
+        monkeypatch.setenv('HEDGE_QUANTILE', '0.9')
+
+        policy = RetryPolicy()
+
+        assert policy.hedge is True
+        assert policy.hedge_quantile == 0.9
+        assert RetryPolicy(hedge=False).hedge is False
+
+
+class TestLatencyTracker:
+    """測試延遲分位數計算"""
+
+    def test_quantile_requires_min_samples(self):
+        """測試樣本數不足時不回傳分位數"""
+        tracker = LatencyTracker()
+        tracker.record(0.1)
+
+        assert tracker.quantile(0.95, min_samples=2) is None
+        tracker.record(0.2)
+        assert tracker.quantile(0.95, min_samples=2) == 0.2
+
+    def test_window_drops_old_samples(self):
+        """測試只保留最近的樣本"""
+        tracker = LatencyTracker(window=3)
+        for value in (10.0, 0.1, 0.2, 0.3):
+            tracker.record(value)
+
+        assert tracker.quantile(1.0) == 0.3
+
+
+class TestScrapeRetry:
+    """測試 scrape_aivi_news 的重試行為"""
+
+    @pytest.mark.asyncio
+    async def test_retry_on_503_honors_retry_after(self, mocker):
+        """測試 503 時依照 Retry-After 等待後重試"""
+        mock_sleep = mocker.patch('asyncio.sleep', new_callable=AsyncMock)
+        mock_get = mocker.patch('httpx.AsyncClient.get', new_callable=AsyncMock)
+        mock_get.side_effect = [
+            _make_response(503, headers={'Retry-After': '1'}),
+            _make_response(200, text='<h2 class="archive__item-title"><a href="/ok">成功</a></h2>'),
+        ]
+
+        articles = await scrape_aivi_news()
+
+        assert [a.title for a in articles] == ['成功']
+        assert mock_get.call_count == 2
+        mock_sleep.assert_awaited_once_with(1.0)
+
+    @pytest.mark.asyncio
+    async def test_retry_on_429_gives_up_after_max_retries(self, mocker):
+        """測試 429 持續發生時，重試到上限後放棄"""
+        mock_sleep = mocker.patch('asyncio.sleep', new_callable=AsyncMock)
+        mock_get = mocker.patch('httpx.AsyncClient.get', new_callable=AsyncMock)
+        mock_get.return_value = _make_response(429)
+
+        articles = await scrape_aivi_news(policy=RetryPolicy(max_retries=2, base_delay=0.1))
+
+        assert articles == []
+        assert mock_get.call_count == 3
+        assert mock_sleep.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_no_retry_on_404(self, mocker):
+        """測試 4xx（非 429）不重試"""
+        mock_get = mocker.patch('httpx.AsyncClient.get', new_callable=AsyncMock)
+        mock_get.return_value = _make_response(404)
+
+        assert await scrape_aivi_news() == []
+        assert mock_get.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_on_connect_error(self, mocker):
+        """測試連線錯誤也會重試"""
+        mocker.patch('asyncio.sleep', new_callable=AsyncMock)
+        mock_get = mocker.patch('httpx.AsyncClient.get', new_callable=AsyncMock)
+        mock_get.side_effect = [
+            httpx.ConnectError('connection refused'),
+            _make_response(200, text='<h2 class="archive__item-title"><a href="/ok">成功</a></h2>'),
+        ]
+
+        articles = await scrape_aivi_news()
+
+        assert len(articles) == 1
+        assert mock_get.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_wins_when_first_is_slow(self, mocker):
+        """測試第一個請求超過 p95 延遲時送出 hedged request，並採用較快的回應"""
+        for _ in range(5):
+            fetcher._get_latency_tracker(aivi_scraper.AIVI_HOMEPAGE_URL).record(0.01)
+
+        fast_html = '<h2 class="archive__item-title"><a href="/fast">快速回應</a></h2>'
+        calls = []
+
+        async def fake_get(url, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                await asyncio.sleep(5)
+                return _make_response(200, text='<h2 class="archive__item-title"><a href="/slow">慢</a></h2>')
+            return _make_response(200, text=fast_html)
+
+        mocker.patch('httpx.AsyncClient.get', side_effect=fake_get)
+
+        articles = await scrape_aivi_news(policy=RetryPolicy(hedge=True, hedge_min_samples=5))
+
+        assert [a.title for a in articles] == ['快速回應']
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_enough_samples(self, mocker):
+        """測試延遲樣本不足時不送出 hedged request"""
+        mock_get = mocker.patch('httpx.AsyncClient.get', new_callable=AsyncMock)
+        mock_get.return_value = _make_response(
+            200, text='<h2 class="archive__item-title"><a href="/a">A</a></h2>'
+        )
+
+        await scrape_aivi_news(policy=RetryPolicy(hedge=True, hedge_min_samples=5))
+
+        assert mock_get.call_count == 1
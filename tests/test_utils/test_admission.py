@@ -0,0 +1,109 @@
+"""負載控制單元測試
+
+測試門檻判斷、分段降級、等級轉換的記錄，以及背景事件迴圈的負載訊號。
+"""
+
+import logging
+import time
+from contextlib import ExitStack
+
+from src.utils.admission import AdmissionController, LoadLevel, Thresholds
+from src.utils.background import BackgroundLoop
+
+
+def make_controller(queue=0, lag=0.0):
+    signals = {'queue': queue, 'lag': lag}
+    controller = AdmissionController(
+        inflight_limits=Thresholds(2, 4, 6),
+        queue_limits=Thresholds(10, 20, 30),
+        lag_limits=Thresholds(0.5, 1.0, 2.0),
+        queue_depth=lambda: signals['queue'],
+        loop_lag=lambda: signals['lag'],
+    )
+    return controller, signals
+
+
+class TestThresholds:
+    """測試 Thresholds"""
+
+    def test_from_env(self, monkeypatch):
+        """測試從環境變數讀取，格式錯誤時使用預設值"""
+        monkeypatch.setenv('TEST_LIMITS', '1,2,3')
+        assert Thresholds.from_env('TEST_LIMITS', (4, 5, 6)) == Thresholds(1, 2, 3)
+
+        monkeypatch.setenv('TEST_LIMITS', '1,2')
+        assert Thresholds.from_env('TEST_LIMITS', (4, 5, 6)) == Thresholds(4, 5, 6)
+
+
+class TestAdmissionController:
+    """測試 AdmissionController"""
+
+    def test_stages_follow_inflight(self):
+        """測試隨正在處理的指令數量依序降級"""
+        controller, _ = make_controller()
+        levels = []
+        with ExitStack() as stack:
+            for _ in range(7):
+                levels.append(controller.admit())
+                stack.enter_context(controller.track())
+
+        assert levels == [
+            LoadLevel.NORMAL, LoadLevel.NORMAL,
+            LoadLevel.CACHE_ONLY, LoadLevel.CACHE_ONLY,
+            LoadLevel.BUSY, LoadLevel.BUSY,
+            LoadLevel.SHED,
+        ]
+        assert controller.admit() == LoadLevel.NORMAL
+
+    def test_worst_signal_wins(self):
+        """測試取三個訊號中最嚴重的等級"""
+        controller, signals = make_controller()
+
+        signals['queue'] = 20
+        assert controller.evaluate() == LoadLevel.BUSY
+
+        signals['queue'] = 0
+        signals['lag'] = 5.0
+        assert controller.evaluate() == LoadLevel.SHED
+
+    def test_transitions_logged_and_counted(self, caplog):
+        """測試等級轉換會記錄日誌並計入統計"""
+        controller, signals = make_controller()
+        caplog.set_level(logging.INFO, logger='src.utils.admission')
+
+        signals['lag'] = 0.6
+        controller.admit()
+        controller.admit()
+        signals['lag'] = 0.0
+        controller.admit()
+
+        messages = [record.getMessage() for record in caplog.records]
+        assert any('NORMAL → CACHE_ONLY' in message for message in messages)
+        assert any('CACHE_ONLY → NORMAL' in message for message in messages)
+
+        stats = controller.stats()
+        assert stats['level'] == 'NORMAL'
+        assert stats['transitions'] == 2
+        assert stats['decisions'] == {'NORMAL': 1, 'CACHE_ONLY': 2, 'BUSY': 0, 'SHED': 0}
+
+
+class TestBackgroundLoopSignals:
+    """測試背景事件迴圈的負載訊號"""
+
+    def test_pending_and_lag(self):
+        """測試尚未完成的工作數量，以及事件迴圈被阻塞時的延遲"""
+        loop = BackgroundLoop(name='test-background')
+        assert loop.lag() == 0.0
+
+        async def block(seconds):
+            time.sleep(seconds)
+
+        future = loop.submit(block(0.4))
+        assert loop.pending() == 1
+        time.sleep(0.3)
+        assert loop.lag() > 0.1
+
+        future.result(timeout=5)
+        time.sleep(0.05)
+        assert loop.pending() == 0
+        loop.stop()
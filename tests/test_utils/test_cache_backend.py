@@ -0,0 +1,276 @@
+"""快取後端單元測試
+
+以相同的測試檢查記憶體、SQLite 與 Redis 協定後端的 TTL 與
+compare-and-set 行為；Redis 以本機的簡易 RESP 伺服器代替。
+"""
+
+import socketserver
+import threading
+import time
+
+import pytest
+
+from src.handlers.news_cache import NewsCache
+from src.scrapers.models import Article
+from src.utils.cache_backend import (
+    CacheBackendError,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    SQLiteCacheBackend,
+    create_cache_backend,
+)
+from src.utils.lease import Lease
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    """只支援本專案用到的指令的 RESP 伺服器"""
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _bulk(self, value):
+        if value is None:
+            return b'$-1\r\n'
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def _get(self, key):
+        item = self.server.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self.server.data[key]
+            return None
+        return value
+
+    def _set(self, key, value, ttl_ms):
+        expires_at = time.time() + ttl_ms / 1000 if ttl_ms else None
+        self.server.data[key] = (value, expires_at)
+
+    def handle(self):
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            name = args[0].upper()
+            self.server.commands.append(name)
+            with self.server.lock:
+                if name == b'GET':
+                    reply = self._bulk(self._get(args[1]))
+                elif name == b'SET':
+                    ttl_ms = int(args[4]) if len(args) > 4 else 0
+                    self._set(args[1], args[2], ttl_ms)
+                    reply = b'+OK\r\n'
+                elif name == b'DEL':
+                    existed = self.server.data.pop(args[1], None) is not None
+                    reply = b':%d\r\n' % existed
+                elif name == b'EVAL' and len(args) == 5:
+                    # compare-and-delete：ARGV = [expected]
+                    key, expected = args[3:5]
+                    matched = self._get(key) == expected
+                    if matched:
+                        del self.server.data[key]
+                    reply = b':%d\r\n' % matched
+                elif name == b'EVAL':
+                    # compare-and-set：ARGV = [expect_absent, expected, value, ttl_ms]
+                    key, expect_absent, expected, value, ttl_ms = args[3:8]
+                    current = self._get(key)
+                    matched = current is None if expect_absent == b'1' else current == expected
+                    if matched:
+                        self._set(key, value, int(ttl_ms))
+                    reply = b':%d\r\n' % matched
+                elif name in (b'AUTH', b'SELECT'):
+                    self.server.auth_attempts += 1
+                    if self.server.auth_failures > 0:
+                        self.server.auth_failures -= 1
+                        reply = b'-WRONGPASS invalid password\r\n'
+                    else:
+                        reply = b'+OK\r\n'
+                else:
+                    reply = b'-ERR unknown command\r\n'
+                if self.server.drop_replies > 0:
+                    # 模擬指令已執行、回應卻沒有送達（例如讀取 timeout）
+                    self.server.drop_replies -= 1
+                    return
+            self.wfile.write(reply)
+
+
+@pytest.fixture
+def resp_server():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _RespHandler)
+    server.daemon_threads = True
+    server.data = {}
+    server.commands = []
+    server.drop_replies = 0
+    server.auth_failures = 0
+    server.auth_attempts = 0
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        instance = MemoryCacheBackend()
+    elif request.param == 'sqlite':
+        instance = SQLiteCacheBackend(str(tmp_path / 'cache.sqlite'))
+    else:
+        server = request.getfixturevalue('resp_server')
+        instance = RedisCacheBackend('127.0.0.1', server.server_address[1])
+    yield instance
+    instance.close()
+
+
+class TestCacheBackends:
+    """所有後端共用的行為"""
+
+    def test_get_set_delete(self, backend):
+        """測試基本讀寫與刪除"""
+        assert backend.get('k') is None
+        backend.set('k', b'\x00value')
+        assert backend.get('k') == b'\x00value'
+        backend.delete('k')
+        assert backend.get('k') is None
+
+    def test_ttl_expiry(self, backend):
+        """測試超過 TTL 的值視為不存在"""
+        backend.set('k', b'v', ttl=0.05)
+        assert backend.get('k') == b'v'
+        time.sleep(0.1)
+        assert backend.get('k') is None
+
+    def test_compare_and_set(self, backend):
+        """測試 compare-and-set：expected=None 表示 key 必須不存在"""
+        assert backend.compare_and_set('k', None, b'v1') is True
+        assert backend.compare_and_set('k', None, b'v2') is False
+        assert backend.compare_and_set('k', b'wrong', b'v2') is False
+        assert backend.compare_and_set('k', b'v1', b'v2') is True
+        assert backend.get('k') == b'v2'
+
+    def test_compare_and_delete(self, backend):
+        """測試只有值相符時才刪除"""
+        backend.set('k', b'token-a')
+        assert backend.compare_and_delete('k', b'token-b') is False
+        assert backend.get('k') == b'token-a'
+        assert backend.compare_and_delete('k', b'token-a') is True
+        assert backend.get('k') is None
+
+    def test_compare_and_set_after_expiry(self, backend):
+        """測試過期的值可以再以 expected=None 取得"""
+        backend.set('k', b'v1', ttl=0.05)
+        time.sleep(0.1)
+        assert backend.compare_and_set('k', None, b'v2', ttl=10) is True
+
+
+class TestSharedBackend:
+    """測試多個 NewsCache 共用同一個後端"""
+
+    def test_sqlite_shared_between_instances(self, tmp_path):
+        """測試兩個 worker 開啟同一個 SQLite 檔案時共用快取"""
+        path = str(tmp_path / 'cache.sqlite')
+        writer = NewsCache(backend=SQLiteCacheBackend(path))
+        reader = NewsCache(backend=SQLiteCacheBackend(path))
+
+        writer.set('aivi', [Article('T', 'https://www.aivi.fyi/t')], '📰 T')
+
+        entry = reader.get('aivi')
+        assert entry.reply_text == '📰 T'
+        assert entry.articles[0].url == 'https://www.aivi.fyi/t'
+
+    def test_redis_shared_between_instances(self, resp_server):
+        """測試兩個 replica 透過 Redis 協定共用快取，且寫入時帶有過期時間"""
+        port = resp_server.server_address[1]
+        writer = NewsCache(max_stale=3600, backend=RedisCacheBackend('127.0.0.1', port))
+        reader = NewsCache(max_stale=3600, backend=RedisCacheBackend('127.0.0.1', port))
+
+        writer.set('aivi', [], '📰 共用')
+
+        assert reader.get('aivi').reply_text == '📰 共用'
+        _, expires_at = resp_server.data[b'news:aivi']
+        assert expires_at is not None
+
+    def test_backend_failure_is_a_miss(self):
+        """測試後端無法連線時視為快取未命中，不影響回覆"""
+        cache = NewsCache(backend=RedisCacheBackend('127.0.0.1', 1, timeout=0.2))
+
+        cache.set('aivi', [], '📰 T')
+
+        assert cache.get('aivi') is None
+
+
+class TestCreateCacheBackend:
+    """測試依 URL 建立後端"""
+
+    def test_memory(self):
+        assert isinstance(create_cache_backend('memory://'), MemoryCacheBackend)
+
+    def test_sqlite_relative_and_absolute(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        relative = create_cache_backend('sqlite:///data/cache.sqlite')
+        absolute = create_cache_backend(f'sqlite:///{tmp_path}/abs.sqlite')
+
+        assert relative.path == 'data/cache.sqlite'
+        assert absolute.path == f'{tmp_path}/abs.sqlite'
+        relative.close()
+        absolute.close()
+
+    def test_redis(self):
+        backend = create_cache_backend('redis://:p%40ss@cache.local:6380/3')
+
+        assert (backend.host, backend.port, backend.db, backend.password) == ('cache.local', 6380, 3, 'p@ss')
+
+    def test_unsupported_scheme(self):
+        with pytest.raises(ValueError):
+            create_cache_backend('memcached://localhost')
+
+    def test_redis_error_reply(self, resp_server):
+        backend = RedisCacheBackend('127.0.0.1', resp_server.server_address[1])
+
+        with pytest.raises(CacheBackendError):
+            backend.execute('FLUSHALL')
+
+    def test_redis_resends_read_after_lost_reply(self, resp_server):
+        """測試回應遺失時重新連線並重送讀取指令"""
+        backend = RedisCacheBackend('127.0.0.1', resp_server.server_address[1])
+        backend.set('k', b'v')
+        resp_server.drop_replies = 1
+
+        assert backend.get('k') == b'v'
+        assert resp_server.commands.count(b'GET') == 2
+
+    def test_redis_does_not_resend_eval_after_lost_reply(self, resp_server):
+        """測試 compare-and-set 已執行但回應遺失時不重送，租約仍由自己持有"""
+        backend = RedisCacheBackend('127.0.0.1', resp_server.server_address[1])
+        lease = Lease(backend, 'lease:aivi')
+        resp_server.drop_replies = 1
+
+        assert lease.acquire() is True
+        assert resp_server.commands.count(b'EVAL') == 1
+
+        lease.release()
+        assert backend.get('lease:aivi') is None
+
+    def test_redis_failed_auth_not_reused(self, resp_server):
+        """測試 AUTH 失敗的連線不會被沿用，下一次指令重新連線並驗證"""
+        backend = RedisCacheBackend('127.0.0.1', resp_server.server_address[1], password='secret')
+        resp_server.auth_failures = 1
+
+        with pytest.raises(CacheBackendError):
+            backend.get('k')
+        assert backend._sock is None
+
+        backend.set('k', b'v')
+        assert backend.get('k') == b'v'
+        assert resp_server.auth_attempts == 2
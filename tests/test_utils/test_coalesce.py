@@ -0,0 +1,79 @@
+"""群組指令回覆合併單元測試
+
+測試聊天室 key、視窗內合併、視窗過期與停用。
+"""
+
+from types import SimpleNamespace
+
+from src.utils.coalesce import ReplyCoalescer, chat_key
+
+
+class TestChatKey:
+    """測試 chat_key"""
+
+    def test_group_and_room(self):
+        """測試群組與聊天室以各自的 ID 為 key"""
+        assert chat_key(SimpleNamespace(type='group', group_id='C1', user_id='U1')) == 'group:C1'
+        assert chat_key(SimpleNamespace(type='room', room_id='R1', user_id='U1')) == 'room:R1'
+
+    def test_direct_chat(self):
+        """測試一對一聊天不合併"""
+        assert chat_key(SimpleNamespace(type='user', user_id='U1')) is None
+        assert chat_key(None) is None
+
+
+class TestReplyCoalescer:
+    """測試 ReplyCoalescer"""
+
+    def test_suppressed_within_window(self):
+        """測試視窗內同一聊天室的相同指令只回覆一次"""
+        coalescer = ReplyCoalescer(window=10)
+
+        results = [coalescer.should_reply('group:C1', '/aivi') for _ in range(4)]
+
+        assert results == [True, False, False, False]
+        assert coalescer.stats()['suppressed'] == 3
+
+    def test_chats_and_commands_independent(self):
+        """測試不同聊天室、不同指令各自計算"""
+        coalescer = ReplyCoalescer(window=10)
+
+        assert coalescer.should_reply('group:C1', '/aivi') is True
+        assert coalescer.should_reply('group:C2', '/aivi') is True
+        assert coalescer.should_reply('group:C1', '/help') is True
+
+    def test_window_expiry(self, mocker):
+        """測試超過視窗後再次回覆"""
+        coalescer = ReplyCoalescer(window=10)
+        mock_time = mocker.patch('src.utils.coalesce.time.monotonic', return_value=100.0)
+
+        coalescer.should_reply('room:R1', '/aivi')
+        mock_time.return_value = 111.0
+
+        assert coalescer.should_reply('room:R1', '/aivi') is True
+
+    def test_disabled(self):
+        """測試 window=0 時不合併"""
+        coalescer = ReplyCoalescer(window=0)
+
+        assert all(coalescer.should_reply('group:C1', '/aivi') for _ in range(3))
+
+    def test_max_chats(self):
+        """測試超過上限時淘汰最久未使用的聊天室"""
+        coalescer = ReplyCoalescer(window=10, max_chats=2)
+
+        for key in ('group:A', 'group:B', 'group:C'):
+            coalescer.should_reply(key, '/aivi')
+
+        assert coalescer.stats()['size'] == 2
+        assert coalescer.should_reply('group:A', '/aivi') is True
+
+    def test_release(self):
+        """測試取消記錄後，視窗內的下一則指令仍會回覆"""
+        coalescer = ReplyCoalescer(window=10)
+        coalescer.should_reply('group:C1', '/aivi')
+
+        coalescer.release('group:C1', '/aivi')
+
+        assert coalescer.stats()['replied'] == 0
+        assert coalescer.should_reply('group:C1', '/aivi') is True
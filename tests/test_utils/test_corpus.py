@@ -0,0 +1,145 @@
+"""錄製語料單元測試
+
+測試 webhook 遮蔽、語料讀寫、版本檢查與錄製上限。
+"""
+
+import json
+
+import pytest
+
+from src.utils.corpus import CORPUS_VERSION, REDACTED, Corpus, CorpusRecorder, redact_payload
+
+USER_ID = 'U0123456789abcdef0123456789abcdef'
+GROUP_ID = 'C0123456789abcdef0123456789abcdef'
+
+
+def _webhook(text, source):
+    return {
+        'destination': 'Uffffffffffffffffffffffffffffffff',
+        'events': [{
+            'type': 'message', 'replyToken': 'reply-token', 'source': source,
+            'message': {'id': '1', 'type': 'text', 'quoteToken': 'quote', 'text': text},
+        }],
+    }
+
+
+class TestRedaction:
+    """測試 webhook 遮蔽"""
+
+    def test_ids_replaced_with_stable_pseudonyms(self):
+        """測試 ID 以假名取代，同一次錄製中同一個 ID 對應同一個假名"""
+        payload = _webhook('/aivi', {'type': 'group', 'groupId': GROUP_ID, 'userId': USER_ID})
+
+        first = redact_payload(payload, b'salt')
+        second = redact_payload(payload, b'salt')
+
+        source = first['events'][0]['source']
+        assert source['groupId'].startswith('C') and source['groupId'] != GROUP_ID
+        assert source['userId'].startswith('U') and source['userId'] != USER_ID
+        assert first == second
+        assert redact_payload(payload, b'other')['events'][0]['source'] != source
+        assert USER_ID not in json.dumps(first)
+
+    def test_tokens_and_free_text_redacted(self):
+        """測試 reply token 與非指令訊息被遮蔽，指令保留"""
+        chat = redact_payload(_webhook('我的電話是 0912345678', {'type': 'user', 'userId': USER_ID}), b's')
+        command = redact_payload(_webhook('/AIVI', {'type': 'user', 'userId': USER_ID}), b's')
+
+        assert chat['events'][0]['replyToken'] == REDACTED
+        assert chat['events'][0]['message']['quoteToken'] == REDACTED
+        assert chat['events'][0]['message']['text'] == REDACTED
+        assert command['events'][0]['message']['text'] == '/AIVI'
+
+    def test_location_file_and_postback_redacted(self):
+        """測試位置訊息、檔案名稱與 postback 資料被遮蔽"""
+        payload = {'events': [
+            {'type': 'message', 'message': {'id': '1', 'type': 'location', 'title': '我家',
+                                            'address': '台北市信義區', 'latitude': 25.03, 'longitude': 121.56}},
+            {'type': 'message', 'message': {'id': '2', 'type': 'file', 'fileName': '病歷.pdf', 'fileSize': 10}},
+            {'type': 'postback', 'postback': {'data': 'user=U1234&order=9',
+                                              'params': {'datetime': '2024-01-01T10:00'}}},
+        ]}
+
+        location, file, postback = redact_payload(payload, b'salt')['events']
+
+        assert location['message'] == {'id': '1', 'type': 'location', 'title': 'REDACTED',
+                                       'address': 'REDACTED', 'latitude': 0.0, 'longitude': 0.0}
+        assert file['message']['fileName'] == 'REDACTED'
+        assert file['message']['fileSize'] == 10
+        assert postback['postback'] == {'data': 'REDACTED', 'params': {}}
+        text = json.dumps(redact_payload(payload, b'salt'), ensure_ascii=False)
+        assert '病歷' not in text and '台北' not in text and 'order' not in text
+
+
+class TestCorpus:
+    """測試語料讀寫"""
+
+    def test_roundtrip(self, tmp_path):
+        """測試寫入的頁面與 webhook 可以從新的 Corpus 讀回"""
+        corpus = Corpus(str(tmp_path))
+        corpus.add_page('https://www.aivi.fyi/', '<html>首頁</html>')
+        corpus.add_page('https://www.aivi.fyi/feed.xml', '<?xml version="1.0"?><feed/>')
+        corpus.add_webhook({'events': [{'type': 'message'}]})
+
+        reloaded = Corpus(str(tmp_path))
+
+        assert reloaded.manifest['version'] == CORPUS_VERSION
+        assert [(entry['url'], html) for entry, html in reloaded.pages()] == [
+            ('https://www.aivi.fyi/', '<html>首頁</html>'),
+            ('https://www.aivi.fyi/feed.xml', '<?xml version="1.0"?><feed/>'),
+        ]
+        assert reloaded.manifest['pages'][1]['file'].endswith('.xml')
+        assert [json.loads(body) for _, body in reloaded.webhooks()] == [{'events': [{'type': 'message'}]}]
+
+    def test_duplicate_content_stored_once(self, tmp_path):
+        """測試相同內容只保存一次"""
+        corpus = Corpus(str(tmp_path))
+
+        assert corpus.add_page('https://a/', '<html></html>') is True
+        assert corpus.add_page('https://a/', '<html></html>') is False
+        assert len(corpus) == 1
+
+    def test_newer_version_rejected(self, tmp_path):
+        """測試拒絕讀取較新版本的語料"""
+        (tmp_path / 'manifest.json').write_text(json.dumps({'version': CORPUS_VERSION + 1}))
+
+        with pytest.raises(ValueError):
+            Corpus(str(tmp_path)).manifest
+
+
+class TestCorpusRecorder:
+    """測試錄製模式"""
+
+    def test_disabled_without_directory(self):
+        """測試未設定目錄時不錄製"""
+        recorder = CorpusRecorder(directory='')
+
+        recorder.record_page('https://a/', '<html></html>')
+        recorder.record_webhook('{}')
+
+        assert recorder.enabled is False
+
+    def test_webhook_recorded_redacted(self, tmp_path):
+        """測試錄製的 webhook 已遮蔽使用者 ID"""
+        recorder = CorpusRecorder(directory=str(tmp_path))
+
+        recorder.record_webhook(json.dumps(_webhook('/aivi', {'type': 'user', 'userId': USER_ID})))
+
+        (_, body), = Corpus(str(tmp_path)).webhooks()
+        assert USER_ID not in body
+        assert json.loads(body)['events'][0]['message']['text'] == '/aivi'
+
+    def test_limit(self, tmp_path):
+        """測試超過錄製上限後不再錄製"""
+        recorder = CorpusRecorder(directory=str(tmp_path), limit=2)
+
+        for i in range(5):
+            recorder.record_page(f'https://a/{i}', f'<html>{i}</html>')
+
+        assert len(Corpus(str(tmp_path))) == 2
+
+    def test_invalid_webhook_ignored(self, tmp_path):
+        """測試無法解析的 webhook 只記錄日誌，不拋出例外"""
+        CorpusRecorder(directory=str(tmp_path)).record_webhook('not json')
+
+        assert len(Corpus(str(tmp_path))) == 0
@@ -0,0 +1,91 @@
+"""Webhook 事件去重單元測試
+
+測試 TTL、LRU 淘汰、SQLite 跨程序去重與統計。
+"""
+
+import time
+
+from src.utils.dedup import EventDeduplicator
+
+
+class TestEventDeduplicator:
+    """測試 EventDeduplicator"""
+
+    def test_duplicate_detected(self):
+        """測試相同事件 ID 第二次出現時判定為重複"""
+        dedup = EventDeduplicator(db_path=None)
+
+        assert dedup.check_and_mark('e1') is False
+        assert dedup.check_and_mark('e1', is_redelivery=True) is True
+        assert dedup.check_and_mark('e2') is False
+
+        stats = dedup.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+        assert stats['redeliveries'] == 1
+        assert stats['hit_rate'] == round(1 / 3, 4)
+
+    def test_ttl_expiry(self, mocker):
+        """測試超過 TTL 的事件 ID 不再視為重複"""
+        dedup = EventDeduplicator(ttl=10, db_path=None)
+        now = time.time()
+        mock_time = mocker.patch('src.utils.dedup.time.time', return_value=now)
+
+        dedup.check_and_mark('e1')
+        mock_time.return_value = now + 11
+
+        assert dedup.check_and_mark('e1') is False
+
+    def test_lru_eviction(self):
+        """測試超過上限時淘汰最久未使用的事件 ID"""
+        dedup = EventDeduplicator(max_entries=2, db_path=None)
+        dedup.check_and_mark('e1')
+        dedup.check_and_mark('e2')
+        dedup.check_and_mark('e1')  # e1 變成最近使用
+        dedup.check_and_mark('e3')  # 淘汰 e2
+
+        assert dedup.stats()['size'] == 2
+        assert dedup.check_and_mark('e1') is True
+        assert dedup.check_and_mark('e2') is False
+
+    def test_evict_keeps_recent_events(self, mocker):
+        """測試記憶體預算釋放時移除過期記錄並只淘汰最久未使用的一半"""
+        dedup = EventDeduplicator(ttl=60, db_path=None)
+        mock_time = mocker.patch('src.utils.dedup.time.time', return_value=1000.0)
+        dedup.check_and_mark('expired')
+        mock_time.return_value = 1100.0
+        for i in range(4):
+            dedup.check_and_mark(f'e{i}')
+
+        dedup.evict()
+
+        assert dedup.stats()['size'] == 2
+        assert dedup.check_and_mark('e3') is True
+        assert dedup.check_and_mark('e0') is False
+
+    def test_sqlite_shared_between_instances(self, tmp_path):
+        """測試 SQLite 讓不同 worker（實例）共用去重記錄"""
+        db_path = str(tmp_path / 'dedup.sqlite')
+        worker_a = EventDeduplicator(db_path=db_path)
+        worker_b = EventDeduplicator(db_path=db_path)
+
+        assert worker_a.check_and_mark('e1') is False
+        assert worker_b.check_and_mark('e1') is True
+
+        worker_a.close()
+        worker_b.close()
+
+    def test_sqlite_expired_rows_reusable(self, tmp_path, mocker):
+        """測試 SQLite 中過期的記錄不再視為重複"""
+        db_path = str(tmp_path / 'dedup.sqlite')
+        now = time.time()
+        mock_time = mocker.patch('src.utils.dedup.time.time', return_value=now)
+        worker_a = EventDeduplicator(ttl=10, db_path=db_path)
+        worker_b = EventDeduplicator(ttl=10, db_path=db_path)
+
+        worker_a.check_and_mark('e1')
+        mock_time.return_value = now + 11
+
+        assert worker_b.check_and_mark('e1') is False
+        worker_a.close()
+        worker_b.close()
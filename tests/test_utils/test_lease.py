@@ -0,0 +1,61 @@
+"""跨程序租約單元測試
+
+以兩個開啟同一個 SQLite 檔案的後端模擬兩個 worker 程序。
+"""
+
+import time
+
+import pytest
+
+from src.utils.cache_backend import RedisCacheBackend, SQLiteCacheBackend
+from src.utils.lease import Lease
+
+
+@pytest.fixture
+def shared_path(tmp_path):
+    return str(tmp_path / 'cache.sqlite')
+
+
+class TestLease:
+    """測試 Lease"""
+
+    def test_only_one_worker_acquires(self, shared_path):
+        """測試同一時間只有一個 worker 取得租約"""
+        worker_a = Lease(SQLiteCacheBackend(shared_path), 'lease:aivi')
+        worker_b = Lease(SQLiteCacheBackend(shared_path), 'lease:aivi')
+
+        assert worker_a.acquire() is True
+        assert worker_b.acquire() is False
+
+        worker_a.release()
+        assert worker_b.acquire() is True
+
+    def test_lease_expires(self, shared_path):
+        """測試持有者沒有釋放（例如當機）時，租約在 ttl 後自動失效"""
+        crashed = Lease(SQLiteCacheBackend(shared_path), 'lease:aivi', ttl=0.05)
+        survivor = Lease(SQLiteCacheBackend(shared_path), 'lease:aivi', ttl=0.05)
+        assert crashed.acquire() is True
+
+        time.sleep(0.1)
+
+        assert survivor.acquire() is True
+
+    def test_release_does_not_drop_other_holder(self, shared_path):
+        """測試過期後才釋放的舊持有者不會刪除新持有者的租約"""
+        backend = SQLiteCacheBackend(shared_path)
+        old = Lease(backend, 'lease:aivi', ttl=0.05)
+        new = Lease(backend, 'lease:aivi', ttl=10)
+        old.acquire()
+        time.sleep(0.1)
+        new.acquire()
+
+        old.release()
+
+        assert Lease(backend, 'lease:aivi').acquire() is False
+
+    def test_backend_failure_acquires(self):
+        """測試後端無法使用時改為自行處理（視為取得租約）"""
+        lease = Lease(RedisCacheBackend('127.0.0.1', 1, timeout=0.2), 'lease:aivi')
+
+        assert lease.acquire() is True
+        lease.release()
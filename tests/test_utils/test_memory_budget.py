@@ -0,0 +1,146 @@
+"""記憶體預算單元測試
+
+測試大小估算、依優先順序釋放、RSS 回到預算內即停止、釋放間隔，以及用量報告。
+"""
+
+import tracemalloc
+
+from src.scrapers.models import Article, ArticleList
+from src.scrapers.parse_cache import ParseCache
+from src.utils.memory_budget import MemoryBudget, deep_sizeof
+
+
+class _Store:
+    """測試用的元件：固定大小，釋放時記錄順序"""
+
+    def __init__(self, name, size, log):
+        self.name = name
+        self.size = size
+        self.log = log
+
+    def evict(self):
+        self.log.append(self.name)
+        self.size = 0
+
+
+def _budget(rss, stores, budget_bytes=1000, cooldown=0):
+    """rss 可以是固定值，或依目前狀態計算 RSS 的函式"""
+    budget = MemoryBudget(budget_bytes=budget_bytes, interval=0,
+                          rss=rss if callable(rss) else lambda: rss, cooldown=cooldown)
+    for priority, store in enumerate(stores):
+        budget.register(store.name, lambda store=store: store.size, store.evict, priority=priority * 10)
+    return budget
+
+
+class TestDeepSizeof:
+    """測試 deep_sizeof"""
+
+    def test_counts_nested_containers_and_slots(self):
+        """測試巢狀容器與 slots dataclass 都被計入"""
+        articles = ArticleList([Article('標題' * 100, 'https://www.aivi.fyi/' + 'x' * 500)])
+
+        assert deep_sizeof({'key': articles}) > deep_sizeof({'key': ArticleList()}) + 500
+
+    def test_shared_objects_counted_once(self):
+        """測試共用的物件只計算一次"""
+        value = 'x' * 10000
+
+        assert deep_sizeof([value, value]) < 2 * len(value)
+
+    def test_parse_cache_estimate(self):
+        """測試解析快取的大小隨內容增加，evict 後歸零但保留統計"""
+        cache = ParseCache()
+        empty = cache.size_bytes()
+        cache.get_or_parse('aivi', '<html>A</html>', 5, lambda html, n: ArticleList([Article('A' * 1000, 'u')]))
+
+        assert cache.size_bytes() > empty + 1000
+        cache.evict()
+        assert cache.size_bytes() == empty
+        assert cache.stats()['misses'] == 1
+
+
+class TestMemoryBudget:
+    """測試 MemoryBudget"""
+
+    def test_under_budget_evicts_nothing(self):
+        """測試 RSS 未超過預算時不釋放"""
+        log = []
+        budget = _budget(500, [_Store('a', 100, log)])
+
+        assert budget.enforce() == []
+        assert log == []
+
+    def test_evicts_in_priority_order_until_rss_under_budget(self):
+        """測試依優先順序釋放，每次釋放後重新讀取 RSS，回到預算內即停止"""
+        log = []
+        stores = [_Store('cheap', 300, log), _Store('medium', 500, log), _Store('critical', 10000, log)]
+        budget = _budget(lambda: 200 + sum(store.size for store in stores), stores, budget_bytes=10300)
+
+        assert budget.enforce() == ['cheap', 'medium']
+        assert log == ['cheap', 'medium']
+        assert stores[2].size == 10000
+
+    def test_rss_far_above_cache_sizes(self):
+        """測試 RSS 遠大於快取估計時，釋放後有冷卻時間，不會每次檢查都清空所有元件"""
+        log = []
+        stores = [_Store('cheap', 300, log), _Store('empty', 0, log), _Store('critical', 500, log)]
+        budget = _budget(10 ** 9, stores, cooldown=60)
+        budget.register('shared', lambda: 0, None, priority=5)
+
+        assert budget.enforce() == ['cheap', 'critical']
+        stores[0].size = stores[2].size = 100
+        assert [budget.enforce() for _ in range(5)] == [[]] * 5
+        assert log == ['cheap', 'critical']
+
+    def test_failing_evict_skipped(self):
+        """測試釋放失敗的元件被略過，繼續釋放下一個"""
+        log = []
+
+        def broken():
+            raise RuntimeError("boom")
+
+        budget = _budget(2000, [_Store('next', 5000, log)])
+        budget.register('broken', lambda: 5000, broken, priority=-1)
+
+        assert budget.enforce() == ['next']
+
+    def test_disabled_budget(self):
+        """測試未設定預算時只統計、不釋放"""
+        log = []
+        budget = _budget(10 ** 12, [_Store('a', 100, log)], budget_bytes=0)
+
+        assert budget.enforce() == []
+
+    def test_report(self):
+        """測試報告包含各元件用量、優先順序、是否可釋放與釋放次數"""
+        log = []
+        stores = [_Store('a', 600, log), _Store('b', 400, log)]
+        budget = _budget(lambda: 500 + sum(store.size for store in stores), stores)
+        budget.register('shared', lambda: 0, None, priority=20)
+        budget.enforce()
+
+        report = budget.report()
+
+        assert report['rss_bytes'] == 900
+        assert report['budget_bytes'] == 1000
+        assert [(item['name'], item['priority'], item['evictable'], item['evictions'])
+                for item in report['components']] == [
+            ('a', 0, True, 1), ('b', 10, True, 0), ('shared', 20, False, 0),
+        ]
+        assert report['total_bytes'] == 400
+        assert 'tracemalloc' not in report
+
+    def test_report_tracemalloc_top(self):
+        """測試 tracemalloc 追蹤中時附上前 N 個配置位置，未追蹤時為 None"""
+        budget = _budget(0, [])
+
+        assert budget.report(top=3)['tracemalloc'] is None
+        tracemalloc.start()
+        try:
+            data = [bytearray(1024) for _ in range(100)]  # noqa: F841
+            top = budget.report(top=3)['tracemalloc']
+        finally:
+            tracemalloc.stop()
+
+        assert 0 < len(top) <= 3
+        assert {'location', 'bytes', 'count'} == set(top[0])
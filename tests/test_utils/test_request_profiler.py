@@ -0,0 +1,113 @@
+"""請求效能分析單元測試
+
+測試抽樣、輸出檔案格式與輸出目錄的大小上限。
+"""
+
+import cProfile
+import os
+import pstats
+import threading
+import time
+
+from src.utils import request_profiler
+from src.utils.request_profiler import RequestProfiler
+
+
+def _busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+class TestRequestProfiler:
+    """測試 RequestProfiler"""
+
+    def test_sampling(self, tmp_path):
+        """測試每 N 個請求分析一個，停用時只分析明確要求的請求"""
+        profiler = RequestProfiler(str(tmp_path), sample_rate=3)
+        assert [profiler.should_profile() for _ in range(6)] == [False, False, True, False, False, True]
+
+        profiler.set_sample_rate(0)
+        assert profiler.should_profile() is False
+        assert profiler.should_profile(forced=True) is True
+
+    def test_writes_pstats_and_collapsed_stacks(self, tmp_path):
+        """測試輸出可讀取的 pstats 與 collapsed stack"""
+        profiler = RequestProfiler(str(tmp_path))
+
+        with profiler.profile('webhook'):
+            _busy(0.05)
+
+        names = sorted(os.listdir(tmp_path))
+        assert [name.rsplit('.', 1)[1] for name in names] == ['collapsed', 'pstats']
+
+        stats = pstats.Stats(str(tmp_path / names[1]))
+        assert any(func[2] == '_busy' for func in stats.stats)
+
+        lines = (tmp_path / names[0]).read_text(encoding='utf-8').splitlines()
+        assert lines
+        assert any('_busy' in line for line in lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        assert int(count) > 0 and ';' in stack
+
+    def test_concurrent_forced_profiles(self, tmp_path):
+        """測試兩個請求同時要求分析時只分析一個，另一個照常完成"""
+        profiler = RequestProfiler(str(tmp_path))
+        inside = threading.Barrier(2, timeout=5)
+        errors = []
+
+        def request():
+            try:
+                with profiler.profile('webhook'):
+                    inside.wait()
+                    _busy(0.02)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=request) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        assert errors == []
+        assert len([name for name in os.listdir(tmp_path) if name.endswith('.pstats')]) == 1
+        assert not any(thread.name == 'stack-sampler' for thread in threading.enumerate())
+
+    def test_enable_failure_runs_unprofiled(self, tmp_path, mocker):
+        """測試無法啟用 cProfile 時照常執行、不啟動取樣執行緒"""
+        class BusyProfile(cProfile.Profile):
+            def enable(self, *args, **kwargs):
+                raise ValueError("Another profiling tool is already active")
+
+        mocker.patch.object(request_profiler.cProfile, 'Profile', BusyProfile)
+        sampler_start = mocker.spy(request_profiler.StackSampler, 'start')
+        profiler = RequestProfiler(str(tmp_path))
+
+        with profiler.profile('webhook'):
+            _busy(0.01)
+
+        sampler_start.assert_not_called()
+        assert os.listdir(tmp_path) == []
+        assert not request_profiler._profiling.locked()
+
+    def test_rotation_keeps_directory_under_cap(self, tmp_path):
+        """測試超過大小上限時刪除最舊的分析結果"""
+        profiler = RequestProfiler(str(tmp_path), max_bytes=1)
+
+        with profiler.profile('first'):
+            _busy(0.01)
+        time.sleep(0.01)
+        with profiler.profile('second'):
+            _busy(0.01)
+
+        assert all('first' not in item['name'] for item in profiler.list_profiles())
+
+    def test_resolve_rejects_paths(self, tmp_path):
+        """測試只能取得輸出目錄中的分析結果"""
+        profiler = RequestProfiler(str(tmp_path))
+        (tmp_path / 'a.pstats').write_bytes(b'x')
+
+        assert profiler.resolve('a.pstats') == str(tmp_path / 'a.pstats')
+        assert profiler.resolve('../a.pstats') is None
+        assert profiler.resolve('a.txt') is None
@@ -0,0 +1,189 @@
+"""暖啟動快照單元測試
+
+測試快照的原子寫入、還原、延遲載入，以及條件式請求 validators 的保存。
+"""
+
+import os
+import time
+import zlib
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+
+from src.handlers.news_cache import NewsCache
+from src.scrapers import aivi_scraper, fetcher
+from src.scrapers.aivi_scraper import scrape_aivi_news
+from src.scrapers.models import Article
+from src.utils.snapshot import SnapshotManager
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / 'snapshot' / 'aivi.json.z')
+
+
+class TestSnapshotManager:
+    """測試 SnapshotManager 的寫入與還原"""
+
+    def test_save_and_load_roundtrip(self, snapshot_path):
+        """測試快取內容寫入後可以在新的程序狀態中還原"""
+        cache = NewsCache(max_stale=float('inf'))
+        cache.set('aivi', [Article('T', 'https://www.aivi.fyi/t')], '📰 T', fetched_at=1000.0)
+        manager = SnapshotManager(snapshot_path, interval=0)
+        manager.register('news', cache.dump, cache.load)
+
+        assert manager.save() is True
+
+        restored = NewsCache(max_stale=float('inf'))
+        loader = SnapshotManager(snapshot_path, interval=0)
+        loader.register('news', restored.dump, restored.load)
+        assert loader.load() is True
+
+        entry = restored.get('aivi')
+        assert entry.reply_text == '📰 T'
+        assert entry.fetched_at == 1000.0
+
+    def test_save_is_compressed_and_skips_unchanged(self, snapshot_path):
+        """測試快照經過壓縮，且內容未變更時不重複寫入"""
+        state = {'value': 'x' * 1000}
+        manager = SnapshotManager(snapshot_path, interval=0)
+        manager.register('demo', lambda: state, state.update)
+
+        assert manager.save() is True
+        assert os.path.getsize(snapshot_path) < 1000
+        assert zlib.decompress(open(snapshot_path, 'rb').read())
+        assert manager.save() is False
+
+        state['value'] = 'y'
+        assert manager.save() is True
+
+    def test_save_leaves_no_temp_files(self, snapshot_path):
+        """測試原子寫入後不留下暫存檔"""
+        manager = SnapshotManager(snapshot_path, interval=0)
+        manager.register('demo', lambda: {'a': 1}, lambda data: None)
+        manager.save()
+
+        assert os.listdir(os.path.dirname(snapshot_path)) == ['aivi.json.z']
+
+    def test_save_before_lazy_load_keeps_previous_snapshot(self, snapshot_path):
+        """測試尚未延遲載入就寫入時，不會以空狀態覆蓋舊快照"""
+        previous = NewsCache()
+        previous.set('aivi', [], '📰 舊快照', fetched_at=time.time())
+        writer = SnapshotManager(snapshot_path, interval=0)
+        writer.register('news', previous.dump, previous.load)
+        writer.save()
+
+        cache = NewsCache()
+        manager = SnapshotManager(snapshot_path, interval=0)
+        manager.register('news', cache.dump, cache.load)
+        manager.save()
+
+        assert cache.get('aivi').reply_text == '📰 舊快照'
+
+    def test_unregistered_section_preserved_until_registered(self, snapshot_path):
+        """測試延遲註冊的區段：尚未註冊時保留在快照中，註冊時才還原"""
+        writer = SnapshotManager(snapshot_path, interval=0)
+        writer.register('http', lambda: {'etag': '"v1"'}, lambda data: None)
+        writer.save()
+
+        manager = SnapshotManager(snapshot_path, interval=0)
+        manager.register('news', lambda: {}, lambda data: None)
+        manager.load()
+        manager.save()
+
+        restored = {}
+        manager.register('http', lambda: restored, restored.update)
+        assert restored == {'etag': '"v1"'}
+
+    def test_load_missing_or_corrupt_file(self, snapshot_path):
+        """測試快照不存在或損毀時不拋出異常"""
+        manager = SnapshotManager(snapshot_path, interval=0)
+        assert manager.load() is False
+
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        with open(snapshot_path, 'wb') as f:
+            f.write(b'not a snapshot')
+        assert manager.load() is False
+
+
+class TestNewsCacheLazyLoad:
+    """測試快取的延遲載入與過期判斷"""
+
+    def test_loader_runs_once_on_first_get(self):
+        """測試延遲載入函式只在第一次讀取時執行一次"""
+        cache = NewsCache()
+        calls = []
+        cache.set_loader(lambda: calls.append(1))
+
+        cache.get('aivi')
+        cache.get('aivi')
+
+        assert calls == [1]
+
+    def test_stale_and_expired_entries(self):
+        """測試新鮮、過期與超過 max_stale 的項目"""
+        cache = NewsCache(ttl=60, max_stale=3600)
+        cache.set('fresh', [], 'a')
+        cache.set('stale', [], 'b', fetched_at=time.time() - 120)
+        cache.set('expired', [], 'c', fetched_at=time.time() - 7200)
+
+        assert cache.is_fresh(cache.get('fresh'))
+        assert not cache.is_fresh(cache.get('stale'))
+        assert cache.get('expired') is None
+
+    def test_load_keeps_newer_memory_entry(self):
+        """測試還原快照時不覆蓋記憶體中較新的項目"""
+        cache = NewsCache()
+        cache.set('aivi', [], 'new')
+        cache.load({'aivi': {'articles': [], 'reply_text': 'old', 'fetched_at': 1.0}})
+
+        assert cache.get('aivi').reply_text == 'new'
+
+
+class TestConditionalRequests:
+    """測試 ETag / Last-Modified 條件式請求"""
+
+    @pytest.mark.asyncio
+    async def test_not_modified_reuses_cached_body(self, mocker):
+        """測試收到 304 時沿用上次的內容"""
+        html = '<h2 class="archive__item-title"><a href="/a">文章 A</a></h2>'
+        request = httpx.Request('GET', aivi_scraper.AIVI_HOMEPAGE_URL)
+        mock_get = mocker.patch('httpx.AsyncClient.get', new_callable=AsyncMock)
+        mock_get.side_effect = [
+            httpx.Response(200, text=html, headers={'ETag': '"v1"'}, request=request),
+            httpx.Response(304, request=request),
+        ]
+
+        first = await scrape_aivi_news()
+        second = await scrape_aivi_news()
+
+        assert first == second
+        assert mock_get.call_args_list[1][1]['headers'] == {'If-None-Match': '"v1"'}
+
+    @pytest.mark.asyncio
+    async def test_raw_body_returned_as_bytes(self, mocker):
+        """測試 raw=True 時返回 UTF-8 bytes（304 時同樣沿用上次的內容）"""
+        html = '<h2 class="archive__item-title"><a href="/a">文章 A</a></h2>'
+        request = httpx.Request('GET', aivi_scraper.AIVI_HOMEPAGE_URL)
+        mock_get = mocker.patch('httpx.AsyncClient.get', new_callable=AsyncMock)
+        mock_get.side_effect = [
+            httpx.Response(200, content=html.encode('big5'), request=request,
+                           headers={'ETag': '"v1"', 'Content-Type': 'text/html; charset=big5'}),
+            httpx.Response(304, request=request),
+        ]
+
+        first = await fetcher.fetch_page(aivi_scraper.AIVI_HOMEPAGE_URL, raw=True)
+        second = await fetcher.fetch_page(aivi_scraper.AIVI_HOMEPAGE_URL, raw=True)
+
+        assert first == second == html.encode('utf-8')
+        assert fetcher.export_http_cache()[aivi_scraper.AIVI_HOMEPAGE_URL]['body'] == html
+
+    def test_http_cache_export_import(self):
+        """測試 validators 可以匯出並還原"""
+        fetcher.import_http_cache({
+            aivi_scraper.AIVI_HOMEPAGE_URL: {'etag': '"v2"', 'last_modified': '', 'body': '<html/>'}
+        })
+
+        assert fetcher.export_http_cache()[aivi_scraper.AIVI_HOMEPAGE_URL]['etag'] == '"v2"'
+        assert fetcher._conditional_headers(aivi_scraper.AIVI_HOMEPAGE_URL) == {'If-None-Match': '"v2"'}